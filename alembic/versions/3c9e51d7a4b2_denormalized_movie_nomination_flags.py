@@ -0,0 +1,52 @@
+"""Denormalized movie nomination flags
+
+Revision ID: 3c9e51d7a4b2
+Revises: ae2999b59058
+Create Date: 2026-10-18 06:40:12.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e51d7a4b2'
+down_revision: Union[str, None] = 'ae2999b59058'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_short', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('is_multinom', sa.Boolean(), server_default=sa.text('0'), nullable=False))
+        batch_op.add_column(sa.Column('num_noms', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+    # * Backfill from the nominations table (same logic as mu.refresh_movie_flags)
+    op.execute(
+        """
+        UPDATE movies SET
+            num_noms = (
+                SELECT COUNT(*) FROM nominations
+                WHERE nominations.movie_id = movies.movie_id
+            ),
+            is_multinom = (
+                SELECT COUNT(*) > 1 FROM nominations
+                WHERE nominations.movie_id = movies.movie_id
+            ),
+            is_short = (
+                SELECT MAX(categories.is_short) FROM nominations
+                JOIN categories ON nominations.category_id = categories.category_id
+                WHERE nominations.movie_id = movies.movie_id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.drop_column('num_noms')
+        batch_op.drop_column('is_multinom')
+        batch_op.drop_column('is_short')
@@ -0,0 +1,32 @@
+"""TMDB response cache
+
+Revision ID: 4b9d7e1a6c30
+Revises: c71f3a9e2d54
+Create Date: 2026-10-18 14:21:47.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9d7e1a6c30'
+down_revision: Union[str, None] = 'c71f3a9e2d54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tmdb_responses',
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('part', sa.String(), nullable=False),
+    sa.Column('body', sa.LargeBinary(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('path', 'part')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('tmdb_responses')
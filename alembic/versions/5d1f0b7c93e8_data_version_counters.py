@@ -0,0 +1,31 @@
+"""Data version counters
+
+Revision ID: 5d1f0b7c93e8
+Revises: 3c9e51d7a4b2
+Create Date: 2026-10-18 11:02:47.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1f0b7c93e8'
+down_revision: Union[str, None] = '3c9e51d7a4b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('data_versions',
+    sa.Column('dataset', sa.String(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('dataset', 'year')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('data_versions')
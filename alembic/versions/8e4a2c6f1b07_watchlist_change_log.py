@@ -0,0 +1,38 @@
+"""Watchlist change log
+
+Revision ID: 8e4a2c6f1b07
+Revises: 5d1f0b7c93e8
+Create Date: 2026-10-18 12:14:05.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4a2c6f1b07'
+down_revision: Union[str, None] = '5d1f0b7c93e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('watchlist_changes',
+    sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('movie_id', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    with op.batch_alter_table('watchlist_changes', schema=None) as batch_op:
+        batch_op.create_index('idx_watchlist_changes_year_seq', ['year', 'seq'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('watchlist_changes', schema=None) as batch_op:
+        batch_op.drop_index('idx_watchlist_changes_year_seq')
+
+    op.drop_table('watchlist_changes')
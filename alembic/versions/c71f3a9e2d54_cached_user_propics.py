@@ -0,0 +1,31 @@
+"""Cached user propics
+
+Revision ID: c71f3a9e2d54
+Revises: 8e4a2c6f1b07
+Create Date: 2026-10-18 13:02:31.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71f3a9e2d54'
+down_revision: Union[str, None] = '8e4a2c6f1b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # * Left empty; the refresh job fills them in on its first run
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('propic', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('propic_checked_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('propic_checked_at')
+        batch_op.drop_column('propic')
@@ -0,0 +1,31 @@
+"""RSS feed validators
+
+Revision ID: d3a8f05b7e12
+Revises: 4b9d7e1a6c30
+Create Date: 2026-10-18 15:36:12.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f05b7e12'
+down_revision: Union[str, None] = '4b9d7e1a6c30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # * Left empty; the next RSS sync fetches every feed in full and fills them in
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rss_etag', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('rss_last_modified', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('rss_last_modified')
+        batch_op.drop_column('rss_etag')
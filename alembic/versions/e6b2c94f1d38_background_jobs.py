@@ -0,0 +1,50 @@
+"""Background jobs
+
+Revision ID: e6b2c94f1d38
+Revises: d3a8f05b7e12
+Create Date: 2026-10-18 17:02:41.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b2c94f1d38'
+down_revision: Union[str, None] = 'd3a8f05b7e12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('jobs',
+    sa.Column('job_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('params', sa.LargeBinary(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('progress_done', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('progress_total', sa.Integer(), nullable=True),
+    sa.Column('progress_note', sa.String(), nullable=True),
+    sa.Column('cancel_requested', sa.Boolean(), server_default=sa.text('0'), nullable=False),
+    sa.Column('result', sa.LargeBinary(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('idx_jobs_status_run_after', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('idx_jobs_status_run_after')
+
+    op.drop_table('jobs')
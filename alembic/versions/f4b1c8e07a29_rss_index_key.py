@@ -0,0 +1,29 @@
+"""RSS index key
+
+Revision ID: f4b1c8e07a29
+Revises: e6b2c94f1d38
+Create Date: 2026-10-18 19:02:41.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b1c8e07a29'
+down_revision: Union[str, None] = 'e6b2c94f1d38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # * Left empty, so the next RSS sync reads every feed in full
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rss_index_key', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('rss_index_key')
@@ -1,23 +1,19 @@
 import logging
 import re
 
-import httpx
 from bs4 import BeautifulSoup
 from bs4.element import Tag
 
-import backend.utils.env_reader as env
+from backend.access_external.http_clients import http_clients
 from backend.routing_lib.error_handling import externalAPIError
 
-movie_db_key = env.TMDB_API_KEY
-
 
 async def get_justwatch(tmdb_id: int) -> tuple[str, int]:
     """
     Get the JustWatch URL for a given TMDB ID.
     """
     url = f"{movie_db_url(tmdb_id)}/watch"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
+    response = await http_clients.get("tmdb_web").get(url)
     soup = BeautifulSoup(response.text, "html.parser")
     ott_div = soup.find("div", class_="ott_title")
     if ott_div is None or type(ott_div) != Tag:
@@ -55,12 +51,8 @@ async def get_Imdb(movie_db_id: int) -> str:
     """
     Get the IMDB URL for a given TMDB ID.
     """
-    url = "https://api.themoviedb.org/3/"
-    headers = {"Authorization": f"Bearer {movie_db_key}",
-               "accept": "application/json"}
-    endpoint = f"{url}movie/{movie_db_id}/external_ids"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(endpoint, headers=headers)
+    endpoint = f"/movie/{movie_db_id}/external_ids"
+    response = await http_clients.get("tmdb").get(endpoint)
     data = response.json()
     if "imdb_id" not in data:
         raise externalAPIError(
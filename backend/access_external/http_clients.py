@@ -0,0 +1,254 @@
+"""
+One pooled httpx.AsyncClient per outside service, shared by everything that
+calls out.
+
+Opening a client per request meant a fresh TCP and TLS handshake every time,
+and keep-alive connections that were thrown away right after. Here each
+service gets one client for the life of the app: devserver's lifespan
+calls start() and close(), and everything else just asks for
+http_clients.get("tmdb") (or "letterboxd", ...). Don't close what you get!
+
+Each service has its own connection limits, timeout, base URL and default
+headers (TMDB's API key lives here). HTTP/2 is used where the service speaks
+it and the h2 package is installed.
+
+A service can also have a rate limit (TMDB allows about 50 requests a
+second): requests over it wait their turn in a token bucket instead of
+getting 429s.
+
+Every request is timed, per host, and failures are counted; see stats()
+and /api/admin/http-stats.
+
+Outside the server (scripts, benchmarks), clients are opened on first use.
+A client belongs to the event loop that opened it, so a get() from a
+different loop (e.g. a second asyncio.run()) opens a new one.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import httpx
+
+import backend.utils.env_reader as env
+
+type Service = Literal["tmdb", "tmdb_web", "letterboxd"]
+
+TMDB_API_BASE = "https://api.themoviedb.org/3"
+TMDB_HEADERS = {
+    "Authorization": f"Bearer {env.TMDB_API_KEY}",
+    "accept": "application/json",
+}
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# * Latencies kept per host for the percentiles in stats()
+LATENCY_WINDOW = 512
+
+
+@dataclass(frozen=True)
+class _ServiceConfig:
+    base_url: str
+    headers: dict[str, str] = field(default_factory=dict)
+    max_connections: int = env.HTTP_MAX_CONNECTIONS_PER_HOST
+    http2: bool = False
+    # * Requests per second
+    rate: float | None = None
+
+
+SERVICES: dict[Service, _ServiceConfig] = {
+    "tmdb": _ServiceConfig(TMDB_API_BASE, TMDB_HEADERS, http2=True, rate=env.TMDB_RATE_LIMIT),
+    "tmdb_web": _ServiceConfig("https://www.themoviedb.org"),
+    # * Letterboxd rate-limits scrapers, so go easy on it
+    "letterboxd": _ServiceConfig("https://letterboxd.com", max_connections=4, http2=True),
+}
+
+
+def _percentile_ms(seconds: deque[float], pct: float) -> float | None:
+    if not seconds:
+        return None
+    ordered = sorted(seconds)
+    return 1000 * ordered[round(pct / 100 * (len(ordered) - 1))]
+
+
+class TokenBucket:
+    """
+    Lets `rate` acquisitions through per second, with bursts of up to `burst`.
+    Callers over the limit take tokens on credit and sleep until they'd have
+    been refilled, so waiters go in order and nobody polls. Works across
+    event loops and threads.
+
+    The default burst is a quarter second's worth, so no one-second window
+    ever sees more than 1.25 * rate (a full second's burst on top of the
+    steady rate would double it, and earn 429s from a server counting per
+    second).
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate / 4)
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> float:
+        """Waits for a token. Returns how long that took, in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class _HostStats:
+    __slots__ = (
+        "requests", "errors", "failures", "total_seconds", "recent",
+        "throttled", "throttled_seconds",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        # * Answers with a 4xx/5xx status
+        self.errors = 0
+        # * No answer at all (timeouts, refused connections, ...)
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.recent: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        # * Requests that waited for the rate limit, and for how long in all
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+
+class _TimedTransport(httpx.AsyncBaseTransport):
+    """Wraps a client's transport to time every request it sends (up to the response headers)."""
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        registry: "HttpClients",
+        bucket: TokenBucket | None,
+    ):
+        self._inner = inner
+        self._registry = registry
+        self._bucket = bucket
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self._bucket is not None and (waited := await self._bucket.acquire()):
+            self._registry._record_throttle(request.url.host, waited)
+        start = time.perf_counter()
+        try:
+            response = await self._inner.handle_async_request(request)
+        except Exception:
+            self._registry._record(request.url.host, time.perf_counter() - start, None)
+            raise
+        self._registry._record(
+            request.url.host, time.perf_counter() - start, response.status_code
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class HttpClients:
+    def __init__(self, timeout: float = env.HTTP_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._clients: dict[Service, httpx.AsyncClient] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._hosts: defaultdict[str, _HostStats] = defaultdict(_HostStats)
+        # * Per service, not per client, so a new event loop doesn't reset the limit
+        self._buckets: dict[Service, TokenBucket] = {}
+
+    def start(self) -> None:
+        """Opens every client on the running loop (from the app's lifespan)."""
+        for service in SERVICES:
+            _ = self.get(service)
+        logging.info(
+            f"Opened HTTP clients for {', '.join(SERVICES)} "
+            f"(HTTP/2 {'on' if HTTP2_AVAILABLE else 'off: h2 is not installed'})"
+        )
+
+    def get(self, service: Service) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                # * The old clients' connections belong to a loop that's gone (or
+                # * busy elsewhere), so they can't be closed from here; drop them
+                self._clients = {}
+                self._loop = loop
+            client = self._clients.get(service)
+            if client is None or client.is_closed:
+                config = SERVICES[service]
+                if config.rate is not None and service not in self._buckets:
+                    self._buckets[service] = TokenBucket(config.rate)
+                client = self._clients[service] = self._open(config, self._buckets.get(service))
+        return client
+
+    async def close(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients = {}
+            self._loop = None
+        _ = await asyncio.gather(*(client.aclose() for client in clients))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hosts = {
+                host: {
+                    "requests": s.requests,
+                    "errors": s.errors,
+                    "failures": s.failures,
+                    "mean_ms": 1000 * s.total_seconds / (s.requests or 1),
+                    "p50_ms": _percentile_ms(s.recent, 50),
+                    "p95_ms": _percentile_ms(s.recent, 95),
+                    "throttled": s.throttled,
+                    "throttled_seconds": s.throttled_seconds,
+                }
+                for host, s in self._hosts.items()
+            }
+            open_clients = [service for service, c in self._clients.items() if not c.is_closed]
+        return {"clients": open_clients, "http2": HTTP2_AVAILABLE, "hosts": hosts}
+
+    def _open(self, config: _ServiceConfig, bucket: TokenBucket | None = None) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_connections,
+        )
+        http2 = config.http2 and HTTP2_AVAILABLE
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+        return httpx.AsyncClient(
+            base_url=config.base_url,
+            headers=config.headers,
+            timeout=self.timeout,
+            transport=_TimedTransport(transport, self, bucket),
+        )
+
+    def _record_throttle(self, host: str, seconds: float) -> None:
+        with self._lock:
+            s = self._hosts[host]
+            s.throttled += 1
+            s.throttled_seconds += seconds
+
+    def _record(self, host: str, seconds: float, status: int | None) -> None:
+        with self._lock:
+            s = self._hosts[host]
+            s.requests += 1
+            s.total_seconds += seconds
+            s.recent.append(seconds)
+            if status is None:
+                s.failures += 1
+            elif status >= 400:
+                s.errors += 1
+
+
+http_clients = HttpClients()
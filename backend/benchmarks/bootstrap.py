@@ -0,0 +1,62 @@
+"""
+Compares the first page load's fan-out of separate requests with one /bootstrap.
+Caches are cleared before every round, so both sides really hit SQLite.
+Sizes are what goes over the wire (the separate routes aren't compressed).
+
+    python -m backend.benchmarks.bootstrap [--iterations 20] [--year 2024]
+"""
+
+import argparse
+
+from fastapi.testclient import TestClient
+
+import backend.data.queries as qu
+from backend.benchmarks.common import quiet_logging, summarize, timed
+from backend.data.cache import reference_cache
+from backend.devserver import app
+
+FAN_OUT = [
+    "/api/years/default",
+    "/api/movies?year={year}",
+    "/api/nominations?year={year}",
+    "/api/categories?year={year}",
+    "/api/users",
+    "/api/watchlist?year={year}",
+    "/api/by_user?year={year}",
+    "/api/by_category?year={year}",
+    "/api/next_key_date",
+]
+
+
+def _wire_bytes(client: TestClient, url: str) -> int:
+    with client.stream("GET", url) as response:
+        _ = response.raise_for_status()
+        return sum(len(chunk) for chunk in response.iter_raw())
+
+
+def run(year: int, iterations: int) -> None:
+    with TestClient(app) as client:
+        fan_out: list[float] = []
+        bootstrap: list[float] = []
+        for _ in range(iterations):
+            reference_cache.invalidate()
+            with timed(fan_out):
+                for route in FAN_OUT:
+                    _ = client.get(route.format(year=year)).raise_for_status()
+            reference_cache.invalidate()
+            with timed(bootstrap):
+                _ = client.get(f"/api/bootstrap?year={year}").raise_for_status()
+        fan_out_bytes = sum(_wire_bytes(client, route.format(year=year)) for route in FAN_OUT)
+        bootstrap_bytes = _wire_bytes(client, f"/api/bootstrap?year={year}")
+    print(f"{len(FAN_OUT)} requests  {summarize(fan_out)} {fan_out_bytes / 1024:7.1f}KiB")
+    print(f"/bootstrap    {summarize(bootstrap)} {bootstrap_bytes / 1024:7.1f}KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    run(year, args.iterations)
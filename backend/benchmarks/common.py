@@ -0,0 +1,56 @@
+"""
+Helpers shared by the benchmark scripts in this package.
+Run any of them with `python -m backend.benchmarks.<name> --help`.
+They use whatever DATABASE_PATH points at, so aim it at a copy of the real database!
+"""
+
+import logging
+import statistics
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+
+
+def quiet_logging() -> None:
+    """The app logs every request at INFO/DEBUG, which drowns out the results."""
+    logging.getLogger().setLevel(logging.WARNING)
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.WARNING)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> str:
+    """Formats a list of durations (in seconds) as milliseconds."""
+    if not samples:
+        return "no samples"
+    return (
+        f"n={len(samples):<5} "
+        f"mean={1000 * statistics.fmean(samples):8.2f}ms "
+        f"p50={1000 * percentile(samples, 50):8.2f}ms "
+        f"p95={1000 * percentile(samples, 95):8.2f}ms "
+        f"p99={1000 * percentile(samples, 99):8.2f}ms"
+    )
+
+
+@contextmanager
+def timed(samples: list[float]):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.append(time.perf_counter() - start)
+
+
+def time_calls(func: Callable[[], object], iterations: int) -> list[float]:
+    samples: list[float] = []
+    for _ in range(iterations):
+        with timed(samples):
+            _ = func()
+    return samples
@@ -0,0 +1,49 @@
+"""
+Compares a full GET with a revalidation that comes back 304 (If-None-Match
+with the current ETag) on each year-scoped route.
+
+    python -m backend.benchmarks.conditional_get [--iterations 50] [--year 2024]
+"""
+
+import argparse
+
+from fastapi.testclient import TestClient
+
+import backend.data.queries as qu
+from backend.benchmarks.common import quiet_logging, summarize, time_calls
+from backend.devserver import app
+
+ROUTES = [
+    "/api/movies?year={year}",
+    "/api/nominations?year={year}",
+    "/api/categories?year={year}",
+    "/api/watchlist?year={year}",
+    "/api/by_user?year={year}",
+    "/api/by_category?year={year}",
+]
+
+
+def run(year: int, iterations: int) -> None:
+    with TestClient(app) as client:
+        for route in ROUTES:
+            url = route.format(year=year)
+            first = client.get(url)
+            etag = first.headers["ETag"]
+            full = time_calls(lambda: client.get(url).raise_for_status(), iterations)
+            revalidated = time_calls(
+                lambda: client.get(url, headers={"If-None-Match": etag}), iterations
+            )
+            assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+            print(f"{url}")
+            print(f"  200  {summarize(full)}  {len(first.content) / 1024:7.1f}KiB")
+            print(f"  304  {summarize(revalidated)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    run(year, args.iterations)
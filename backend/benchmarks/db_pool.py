@@ -0,0 +1,71 @@
+"""
+Compares the pooled engine (DB_POOL_MODE=queue) with NullPool on the read routes.
+The in-process caches are cleared before every request so each one really
+hits SQLite.
+
+    python -m backend.benchmarks.db_pool [--iterations 50] [--year 2024]
+"""
+
+import argparse
+from collections import Counter
+
+import sqlalchemy as sa
+from fastapi.testclient import TestClient
+
+import backend.data.queries as qu
+from backend.benchmarks.common import quiet_logging, summarize, timed
+from backend.data.cache import reference_cache
+from backend.data.db_connections import Session, create_db_engine
+from backend.data.user_stats import user_stats
+from backend.devserver import app
+
+ROUTES = [
+    "/api/years",
+    "/api/movies?year={year}",
+    "/api/nominations?year={year}",
+    "/api/categories?year={year}",
+    "/api/watchlist?year={year}",
+    "/api/by_user?year={year}",
+    "/api/by_category?year={year}",
+]
+
+
+def run(pool_mode: str, year: int, iterations: int) -> None:
+    engine = create_db_engine(pool_mode)
+    connects: Counter[str] = Counter()
+
+    @sa.event.listens_for(engine, "connect")
+    def _count_connect(dbapi_connection, connection_record):
+        connects["total"] += 1
+
+    Session.configure(bind=engine)
+    client = TestClient(app)
+    samples: dict[str, list[float]] = {route: [] for route in ROUTES}
+    for i in range(iterations + 1):
+        for route in ROUTES:
+            reference_cache.invalidate()
+            user_stats.invalidate()
+            url = route.format(year=year)
+            if i == 0:
+                # * Warm-up round
+                _ = client.get(url).raise_for_status()
+                continue
+            with timed(samples[route]):
+                _ = client.get(url).raise_for_status()
+    print(f"\n== pool mode: {pool_mode} ==")
+    for route, route_samples in samples.items():
+        print(f"{route.format(year=year):32} {summarize(route_samples)}")
+    requests = iterations * len(ROUTES) + len(ROUTES)
+    print(f"connections opened: {connects['total']} for {requests} requests")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    for mode in ("null", "queue"):
+        run(mode, year, args.iterations)
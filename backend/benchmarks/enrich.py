@@ -0,0 +1,171 @@
+"""
+Times an enrich_year job (search + hydrate), submitted through
+POST /api/admin/intake/enrich and polled until it finishes, against a local
+stand-in for TMDB, which answers after --latency ms, allows --tmdb-rate
+requests per second (429 with Retry-After past that, like the real one) and
+fails --fail-rate of detail requests with a 500.
+
+Runs once per --concurrency level, on --movies throwaway movies in year
+--year (created first and deleted again at the end; this writes to the
+database!). --no-limiter turns off the client-side rate limit, to show the
+429 retries doing the work instead.
+
+    python -m backend.benchmarks.enrich [--movies 100] [--concurrency 1 8] [--latency 80]
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import replace
+from urllib.parse import parse_qs
+
+import orjson
+import sqlalchemy as sa
+import sqlalchemy.orm as orm
+import uvicorn
+from fastapi.testclient import TestClient
+
+import backend.access_external.http_clients as http_clients
+import backend.utils.env_reader as env
+from backend.benchmarks.common import quiet_logging
+from backend.data.db_schema import DataVersion, Movie
+from backend.data.utils import reserve_movie_ids
+from backend.data.writer import writer
+from backend.devserver import app
+
+stand_in_calls: Counter[str] = Counter()
+
+
+def _stand_in(latency: float, rate: float, fail_rate: float):
+    window: list[float] = []
+    rng = random.Random(0)
+
+    async def app(scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        now = time.monotonic()
+        window[:] = [t for t in window if t > now - 1]
+        if len(window) >= rate:
+            stand_in_calls["429"] += 1
+            await send({"type": "http.response.start", "status": 429,
+                        "headers": [(b"retry-after", b"1")]})
+            await send({"type": "http.response.body", "body": b"{}"})
+            return
+        window.append(now)
+        await asyncio.sleep(latency)
+        path: str = scope["path"]
+        status, body = 200, {}
+        if path.endswith("/search/movie"):
+            stand_in_calls["search"] += 1
+            query = parse_qs(scope["query_string"].decode())
+            title, year = query["query"][0], query["year"][0]
+            body = {"results": [{
+                "id": 80_000_000 + abs(hash(title)) % 1_000_000,
+                "title": title,
+                "release_date": f"{year}-06-01",
+            }]}
+        else:
+            stand_in_calls["details"] += 1
+            if rng.random() < fail_rate:
+                status, body = 500, {"status_message": "stand-in failure"}
+            else:
+                tmdb_id = int(path.rsplit("/", 1)[1])
+                body = {"id": tmdb_id, "imdb_id": f"tt{tmdb_id}", "runtime": 100,
+                        "poster_path": f"/{tmdb_id}.jpg"}
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": orjson.dumps(body)})
+    return app
+
+
+def _start_stand_in(latency: float, rate: float, fail_rate: float) -> tuple[uvicorn.Server, int]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        _stand_in(latency, rate, fail_rate), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def _create_movies(year: int, count: int) -> None:
+    def work(session: orm.Session) -> None:
+        ids = reserve_movie_ids(session, year, count)
+        _ = session.execute(sa.insert(Movie), [
+            {"movie_id": movie_id, "year": year, "title": f"Benchmark Picture {i}"}
+            for i, movie_id in enumerate(ids)
+        ])
+    _ = asyncio.run(writer.write(work))
+
+
+def _delete_movies(year: int) -> None:
+    def work(session: orm.Session) -> None:
+        _ = session.execute(sa.delete(Movie).where(Movie.year == year))
+        _ = session.execute(sa.delete(DataVersion).where(DataVersion.year == year))
+    _ = asyncio.run(writer.write(work))
+
+
+def run(
+    year: int, movies: int, levels: list[int], latency_ms: float,
+    tmdb_rate: float, fail_rate: float, limiter: bool,
+) -> None:
+    server, port = _start_stand_in(latency_ms / 1000, tmdb_rate, fail_rate)
+    tmdb = http_clients.SERVICES["tmdb"]
+    http_clients.SERVICES["tmdb"] = replace(
+        tmdb, base_url=f"http://127.0.0.1:{port}/3", http2=False,
+        headers={**tmdb.headers, "Authorization": "Bearer stand-in"},
+        rate=tmdb.rate if limiter else None,
+    )
+    _delete_movies(year)
+    _create_movies(year, movies)
+    try:
+        with TestClient(app) as client:
+            for concurrency in levels:
+                env.TMDB_ENRICH_CONCURRENCY = concurrency
+                stand_in_calls.clear()
+                start = time.perf_counter()
+                job = client.post("/api/admin/intake/enrich", json={
+                    "year": year, "force_search": True, "force_hydrate": True,
+                }).raise_for_status().json()
+                submitted = time.perf_counter() - start
+                while job["status"] in ("queued", "running"):
+                    time.sleep(0.05)
+                    job = client.get(f"/api/admin/jobs/{job['job_id']}").json()
+                elapsed = time.perf_counter() - start
+                if job["status"] != "succeeded":
+                    raise RuntimeError(f"Enrichment job {job['status']}: {job['error']}")
+                result = job["result"]
+                print(
+                    f"concurrency={concurrency:<3} {elapsed:7.2f}s (submit {1000 * submitted:.0f}ms)  "
+                    f"found={result['search_found']} search_errors={result['search_errors']} "
+                    f"hydrated={result['hydrate_success']} hydrate_errors={result['hydrate_errors']}  "
+                    f"stand-in: {dict(stand_in_calls)}"
+                )
+            print(client.get("/api/admin/http-stats").json()["hosts"])
+    finally:
+        _delete_movies(year)
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--latency", type=float, default=80, help="stand-in TMDB latency (ms)")
+    parser.add_argument("--tmdb-rate", type=float, default=50, help="stand-in requests/second")
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--no-limiter", action="store_true")
+    parser.add_argument("--year", type=int, default=2099)
+    args = parser.parse_args()
+    quiet_logging()
+    run(
+        args.year, args.movies, args.concurrency, args.latency,
+        args.tmdb_rate, args.fail_rate, not args.no_limiter,
+    )
@@ -0,0 +1,112 @@
+"""
+Measures how much slow database work holds up a cheap route.
+While background clients keep the server busy, we time /years, once with
+database work running on the event loop (DB_EXECUTOR_WORKERS=0, the old
+behaviour) and once with it on the database executor.
+
+Scenarios:
+    by_category   clients keep requesting /by_category (mostly CPU-bound Python)
+    locked        clients keep editing a watchlist while another connection
+                  repeatedly holds the write lock, so their writes wait in
+                  SQLite's busy handler (this one writes to the database!)
+
+    python -m backend.benchmarks.event_loop [--scenario by_category] [--samples 200] [--load 4] [--workers 5] [--year 2024]
+"""
+
+import argparse
+import asyncio
+import sqlite3
+import threading
+import time
+
+import httpx
+
+import backend.data.queries as qu
+from backend.benchmarks.common import quiet_logging, summarize
+from backend.data.db_connections import configure_db_executor
+from backend.data.db_schema import DB_PATH
+from backend.devserver import app
+
+INTERVAL = 0.01  # seconds between /years requests
+LOCK_HOLD = 0.2  # seconds the "other writer" holds the lock in the locked scenario
+LOCK_GAP = 0.05
+
+
+async def _hammer(client: httpx.AsyncClient, scenario: str, year: int, stop: asyncio.Event, count: list[int]):
+    movie_id = qu.get_movies(year)[0].movie_id
+    user_id = qu.get_users()[0]["id"]
+    status = "seen"
+    while not stop.is_set():
+        if scenario == "by_category":
+            _ = (await client.get(f"/api/by_category?year={year}")).raise_for_status()
+        else:
+            status = "todo" if status == "seen" else "seen"
+            _ = (await client.put(
+                "/api/watchlist",
+                json={"year": year, "movieIds": [movie_id], "status": status},
+                headers={"Cookie": f"activeUserId={user_id}"},
+            )).raise_for_status()
+        count[0] += 1
+
+
+def _hold_write_lock(stop: threading.Event) -> None:
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    while not stop.is_set():
+        _ = conn.execute("BEGIN IMMEDIATE")
+        time.sleep(LOCK_HOLD)
+        _ = conn.execute("COMMIT")
+        time.sleep(LOCK_GAP)
+    conn.close()
+
+
+async def run(scenario: str, workers: int, year: int, samples: int, load: int) -> None:
+    configure_db_executor(workers)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        _ = (await client.get("/api/years")).raise_for_status()
+        stop = asyncio.Event()
+        stop_locker = threading.Event()
+        if scenario == "locked":
+            threading.Thread(target=_hold_write_lock, args=(stop_locker,), daemon=True).start()
+        background_requests = [0]
+        hammers = [
+            asyncio.create_task(_hammer(client, scenario, year, stop, background_requests))
+            for _ in range(load)
+        ]
+        # * Let the load get going before measuring
+        await asyncio.sleep(0.2)
+        # * Each /years request is its own task, started on a fixed clock and timed
+        # * from when it was *due*, so time spent waiting for a blocked loop counts too
+        loop = asyncio.get_running_loop()
+        latencies: list[float] = []
+
+        async def probe(due: float):
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            _ = (await client.get("/api/years")).raise_for_status()
+            latencies.append(loop.time() - due)
+
+        start = loop.time()
+        await asyncio.gather(*(probe(start + i * INTERVAL) for i in range(samples)))
+        stop.set()
+        stop_locker.set()
+        await asyncio.gather(*hammers)
+    label = "on the event loop" if workers == 0 else f"executor, {workers} workers"
+    print(f"\n== {scenario}: {label} ==")
+    print(f"/years under load  {summarize(latencies)}")
+    print(f"background requests served meanwhile: {background_requests[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenario", choices=["by_category", "locked"], default="by_category")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--load", type=int, default=4,
+                        help="concurrent background clients")
+    parser.add_argument("--workers", type=int, default=5)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    for workers in (0, args.workers):
+        asyncio.run(run(args.scenario, workers, year, args.samples, args.load))
+    configure_db_executor()
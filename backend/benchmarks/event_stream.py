@@ -0,0 +1,115 @@
+"""
+Load-tests the live-update stream (GET /api/events/stream) with many idle
+subscribers on a real server (uvicorn on a spare local port; the in-process
+transports buffer whole responses, so they can't stream).
+
+Reports how long the subscribers take to connect, what they cost the server
+while idle, and the delay from a watchlist write returning to the event
+reaching the last subscriber. The writes toggle one movie for the first user
+(this writes to the database!).
+
+    python -m backend.benchmarks.event_stream [--subscribers 500] [--writes 20] [--year 2024]
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+
+import backend.data.mutations as mu
+import backend.data.queries as qu
+from backend.benchmarks.common import quiet_logging, summarize
+from backend.data.event_hub import event_hub
+from backend.devserver import app
+from backend.types.my_types import WatchStatus
+
+IDLE_SECONDS = 5.0
+
+
+def _start_server() -> tuple[uvicorn.Server, int]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+async def _subscriber(
+    client: httpx.AsyncClient, url: str, received: dict[int, list[float]]
+) -> None:
+    async with client.stream("GET", url) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("data:") and '"cursor"' in line:
+                cursor = int(line.rsplit('"cursor":', 1)[1].rstrip("}"))
+                received.setdefault(cursor, []).append(time.perf_counter())
+
+
+async def run(year: int, subscribers: int, writes: int) -> None:
+    server, port = _start_server()
+    url = f"http://127.0.0.1:{port}/api/events/stream"
+    movie_id = qu.get_movies(year)[0].movie_id
+    user_id = qu.get_users()[0]["id"]
+    # * Start from TODO, so the first SEEN below is a real change
+    _ = await mu.set_watchlist_entries(year, user_id, [(movie_id, WatchStatus.TODO)])
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    received: dict[int, list[float]] = {}
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        start = time.perf_counter()
+        tasks = [
+            asyncio.create_task(_subscriber(client, url, received))
+            for _ in range(subscribers)
+        ]
+        while event_hub.stats()["subscribers"] < subscribers:
+            await asyncio.sleep(0.01)
+        print(f"{subscribers} subscribers connected in {time.perf_counter() - start:.2f}s")
+
+        # * Server and clients share this process, so this is an upper bound
+        cpu_before = time.process_time()
+        await asyncio.sleep(IDLE_SECONDS)
+        idle_cpu = (time.process_time() - cpu_before) / IDLE_SECONDS
+        print(f"idle: {100 * idle_cpu:.1f}% of a core")
+
+        write_times: list[float] = []
+        fan_out: list[float] = []
+        for i in range(writes):
+            # * Alternate statuses so every write really changes something
+            status = WatchStatus.SEEN if i % 2 == 0 else WatchStatus.TODO
+            previous = max(received, default=0)
+            before = time.perf_counter()
+            _ = await mu.set_watchlist_entries(year, user_id, [(movie_id, status)])
+            committed = time.perf_counter()
+            write_times.append(committed - before)
+            deadline = committed + 10
+            while time.perf_counter() < deadline:
+                newest = max(received, default=0)
+                if newest > previous and len(received[newest]) >= subscribers:
+                    fan_out.append(max(received[newest]) - committed)
+                    break
+                await asyncio.sleep(0.001)
+        for task in tasks:
+            _ = task.cancel()
+        _ = await asyncio.gather(*tasks, return_exceptions=True)
+    server.should_exit = True
+    print(f"write        {summarize(write_times)}")
+    print(f"to last sub  {summarize(fan_out)}")
+    print(event_hub.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    asyncio.run(run(year, args.subscribers, args.writes))
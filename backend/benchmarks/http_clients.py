@@ -0,0 +1,92 @@
+"""
+Compares a new httpx.AsyncClient per request (what the TMDB and Letterboxd
+calls used to do) with the shared pooled client, against a small local
+server on a spare port. Loopback has no TLS and next to no latency, so this
+only shows the connection setup a fresh client pays; against a real HTTPS
+host the gap is a handshake round trip or three per request.
+
+    python -m backend.benchmarks.http_clients [--requests 200] [--concurrency 1 8]
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from backend.access_external.http_clients import HttpClients, _ServiceConfig
+from backend.benchmarks.common import quiet_logging, summarize, timed
+
+
+async def _app(scope, receive, send) -> None:
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"ok": true}'})
+
+
+def _start_server() -> tuple[uvicorn.Server, int]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(_app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+async def _fresh(url: str, samples: list[float]) -> None:
+    with timed(samples):
+        async with httpx.AsyncClient() as client:
+            _ = (await client.get(url)).raise_for_status()
+
+
+async def _pooled(client: httpx.AsyncClient, url: str, samples: list[float]) -> None:
+    with timed(samples):
+        _ = (await client.get(url)).raise_for_status()
+
+
+async def run(requests: int, concurrency_levels: list[int]) -> None:
+    server, port = _start_server()
+    url = f"http://127.0.0.1:{port}/"
+    registry = HttpClients()
+    # * Configured like the real services, just pointed at the local server
+    client = registry._open(_ServiceConfig(url))
+    for concurrency in concurrency_levels:
+        limit = asyncio.Semaphore(concurrency)
+        for label in ("fresh", "pooled"):
+            samples: list[float] = []
+
+            async def one() -> None:
+                async with limit:
+                    if label == "fresh":
+                        await _fresh(url, samples)
+                    else:
+                        await _pooled(client, url, samples)
+
+            start = time.perf_counter()
+            _ = await asyncio.gather(*(one() for _ in range(requests)))
+            elapsed = time.perf_counter() - start
+            print(
+                f"concurrency={concurrency:<3} {label:6} {summarize(samples)} "
+                f"{requests / elapsed:8.0f} req/s"
+            )
+    await client.aclose()
+    print(registry.stats()["hosts"])
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+    quiet_logging()
+    asyncio.run(run(args.requests, args.concurrency))
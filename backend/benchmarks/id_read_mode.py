@@ -0,0 +1,49 @@
+"""
+Times get_watchlist and get_movies under each DB_ID_READ_MODE.
+The mode is fixed once SQLAlchemy has built its result processors, so every
+mode runs in its own child process.
+
+    python -m backend.benchmarks.id_read_mode [--iterations 50] [--year 2024]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+import backend.data.queries as qu
+import backend.utils.env_reader as env
+from backend.benchmarks.common import quiet_logging, summarize, time_calls
+
+MODES = ["validate", "sample", "trusted"]
+
+
+def run(year: int, iterations: int) -> None:
+    rows = len(qu.get_watchlist(year))
+    _ = qu.get_movies(year)  # warm up the connection and statement cache
+    print(f"\n== DB_ID_READ_MODE={env.DB_ID_READ_MODE} ({rows} watchlist rows) ==")
+    for name, func in [
+        ("get_watchlist", lambda: qu.get_watchlist(year)),
+        ("get_movies", lambda: qu.get_movies(year)),
+    ]:
+        print(f"{name:14} {summarize(time_calls(func, iterations))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--year", type=int, default=None)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    if args.child:
+        run(year, args.iterations)
+    else:
+        for mode in MODES:
+            _ = subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.id_read_mode",
+                 "--child", "--iterations", str(args.iterations), "--year", str(year)],
+                env={**os.environ, "DB_ID_READ_MODE": mode},
+                check=True,
+            )
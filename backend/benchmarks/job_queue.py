@@ -0,0 +1,144 @@
+"""
+Exercises the background job queue (scheduled_tasks/job_queue.py) through
+its admin routes, with a stand-in job kind that sleeps for --seconds in ten
+steps (reporting progress) and fails its first attempt one time in --fail-every.
+
+    submit     POST /api/admin/jobs for --jobs jobs: how long the request takes
+    drain      until every job has finished, retries included, with
+               JOB_WORKERS=--workers; compared with running them one at a time
+    cancel     a queued job and a running one, through DELETE /api/admin/jobs/{id}
+    shutdown   a job still running when the app stops goes back in the queue
+               with its attempt refunded, and runs after the next start
+
+The benchmark's jobs are deleted at the end. This writes to the database!
+
+    python -m backend.benchmarks.job_queue [--jobs 40] [--workers 4] [--seconds 0.5]
+"""
+
+import argparse
+import asyncio
+import time
+
+import sqlalchemy as sa
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+import backend.utils.env_reader as env
+from backend.benchmarks.common import quiet_logging, summarize, timed
+from backend.data.db_connections import Session
+from backend.data.db_schema import Job
+from backend.devserver import app
+from backend.scheduled_tasks.job_kinds import JOB_KINDS
+from backend.scheduled_tasks.job_queue import JobKind, Progress
+
+KIND = "benchmark_sleep"
+
+
+class SleepParams(BaseModel):
+    n: int
+    seconds: float
+    fail_first: bool = False
+
+
+async def sleep(params: SleepParams, progress: Progress) -> dict[str, int]:
+    for step in range(10):
+        progress.set(step, 10)
+        await asyncio.sleep(params.seconds / 10)
+        if params.fail_first and step == 4 and not _failed.get(params.n):
+            _failed[params.n] = True
+            raise RuntimeError("stand-in failure")
+    progress.set(10, 10)
+    return {"n": params.n}
+
+
+_failed: dict[int, bool] = {}
+
+
+def _submit(client: TestClient, n: int, seconds: float, fail_first: bool = False) -> int:
+    response = client.post("/api/admin/jobs", json={
+        "kind": KIND, "params": {"n": n, "seconds": seconds, "fail_first": fail_first},
+    })
+    return response.raise_for_status().json()["job_id"]
+
+
+def _wait(client: TestClient, job_ids: list[int], timeout: float = 300) -> dict[int, dict]:
+    start = time.perf_counter()
+    while True:
+        jobs = {job_id: client.get(f"/api/admin/jobs/{job_id}").json() for job_id in job_ids}
+        if all(job["status"] not in ("queued", "running") for job in jobs.values()):
+            return jobs
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"Jobs still unfinished: {[j for j in jobs.values() if j['status'] in ('queued', 'running')]}")
+        time.sleep(0.05)
+
+
+def _delete_benchmark_jobs() -> None:
+    with Session() as session:
+        _ = session.execute(sa.delete(Job).where(Job.kind == KIND))
+        session.commit()
+
+
+def run(jobs: int, workers: int, seconds: float, fail_every: int) -> None:
+    JOB_KINDS[KIND] = JobKind(SleepParams, sleep)
+    env.JOB_WORKERS = workers
+    env.JOB_RETRY_BASE_SECONDS = 0
+    env.JOB_HEARTBEAT_SECONDS = 1
+    _delete_benchmark_jobs()
+    try:
+        with TestClient(app) as client:
+            samples: list[float] = []
+            start = time.perf_counter()
+            job_ids: list[int] = []
+            for n in range(jobs):
+                with timed(samples):
+                    job_ids.append(_submit(client, n, seconds, fail_first=n % fail_every == 0))
+            print(f"submit   {summarize(samples)}")
+            finished = _wait(client, job_ids)
+            drained = time.perf_counter() - start
+            statuses = [job["status"] for job in finished.values()]
+            retried = sum(job["attempts"] > 1 for job in finished.values())
+            serial = jobs * seconds + retried * seconds / 2
+            print(
+                f"drain    {drained:6.2f}s with {workers} workers (one at a time: ~{serial:.2f}s)  "
+                f"succeeded={statuses.count('succeeded')}/{jobs} retried={retried}"
+            )
+
+            # * A long job for every worker, and one that has to wait
+            running = [_submit(client, jobs + i, 10 * seconds) for i in range(workers)]
+            waiting = _submit(client, jobs + workers, seconds)
+            time.sleep(seconds)
+            samples = []
+            with timed(samples):
+                cancelled_queued = client.delete(f"/api/admin/jobs/{waiting}").json()
+                cancelled_running = client.delete(f"/api/admin/jobs/{running[0]}").json()
+            after = _wait(client, [waiting, running[0]])
+            print(
+                f"cancel   {summarize(samples)}  queued -> {cancelled_queued['status']}, "
+                f"running -> {after[running[0]]['status']} at step {after[running[0]]['progress']['done']}/10"
+            )
+            _ = _wait(client, running[1:])
+
+            interrupted = _submit(client, jobs + workers + 1, 20 * seconds)
+            time.sleep(seconds)
+            print(client.get("/api/admin/job-stats").json())
+        # * The app has shut down, with `interrupted` still running
+        with Session() as session:
+            job = session.get(Job, interrupted)
+            assert job is not None
+            print(f"shutdown job {interrupted}: {job.status}, attempts={job.attempts}, at step {job.progress_done}/10")
+        with TestClient(app) as client:
+            job = _wait(client, [interrupted])[interrupted]
+            print(f"restart  job {interrupted}: {job['status']}, attempts={job['attempts']}")
+    finally:
+        _delete_benchmark_jobs()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=0.5, help="how long each stand-in job takes")
+    parser.add_argument("--fail-every", type=int, default=5)
+    args = parser.parse_args()
+    quiet_logging()
+    run(args.jobs, args.workers, args.seconds, args.fail_every)
@@ -0,0 +1,62 @@
+"""
+Compares ways of matching RSS feed items (TMDB IDs) to a year's movies, for
+--users feeds of fyi/rss_debug.xml's size (IDs drawn from the year's movies
+and from outside it):
+    orm_scan   qu.get_movies(year) per feed, `int(movie_db_id) in list` per movie
+               (what get_movie_list_from_rss used to do)
+    index      qu.get_tmdb_index(year) once, a dict lookup per item
+               (cold: built from the database; warm: from the reference cache)
+Read-only.
+
+    python -m backend.benchmarks.rss_match [--users 60] [--items 50] [--year 2024]
+"""
+
+import argparse
+import random
+import time
+
+import backend.data.queries as qu
+from backend.benchmarks.common import quiet_logging
+from backend.data.cache import reference_cache
+
+
+def run(year: int, users: int, items: int) -> None:
+    tmdb_ids = [int(m.movie_db_id) for m in qu.get_movies(year) if m.movie_db_id is not None]
+    rng = random.Random(0)
+    feeds = [
+        [rng.choice(tmdb_ids) if rng.random() < 0.3 else rng.randrange(10**6) for _ in range(items)]
+        for _ in range(users)
+    ]
+
+    start = time.perf_counter()
+    matched_scan = 0
+    for feed in feeds:
+        movies = qu.get_movies(year)
+        matched_scan += sum(
+            1 for movie in movies
+            if movie.movie_db_id is not None and int(movie.movie_db_id) in feed
+        )
+    scan = time.perf_counter() - start
+
+    for label in ("cold", "warm"):
+        if label == "cold":
+            reference_cache.invalidate(year)
+        start = time.perf_counter()
+        index = qu.get_tmdb_index(year)
+        matched_index = sum(
+            len({index[tmdb_id] for tmdb_id in feed if tmdb_id in index}) for feed in feeds
+        )
+        elapsed = time.perf_counter() - start
+        print(f"index ({label})  {1000 * elapsed:9.2f}ms  matched={matched_index}")
+    print(f"orm_scan      {1000 * scan:9.2f}ms  matched={matched_scan}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=60)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    run(year, args.users, args.items)
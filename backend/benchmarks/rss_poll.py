@@ -0,0 +1,165 @@
+"""
+Runs the scheduled Letterboxd RSS sync (check_rss.poll_all_users) against a
+local stand-in for letterboxd.com, which serves the sample feed in
+fyi/rss_debug.xml after --latency ms, with an ETag, and answers 304 when
+the client already has it. Each feed's TMDB IDs are swapped for those of
+random movies from --year, so there's something to match. One account in
+ten gets a 404, and one in twenty never answers inside the timeout, so the
+failure path is exercised too.
+
+Creates --users throwaway users with handles and polls only them, three
+times:
+    first      no validators or last check yet: every feed in full
+    unchanged  nothing changed: 304s
+    some new   a quarter of the feeds got two new items at the top
+The users and their entries are removed at the end. This writes to the
+database!
+
+    python -m backend.benchmarks.rss_poll [--users 40] [--concurrency 4] [--politeness 0]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import replace
+from datetime import UTC, datetime
+from email.utils import format_datetime
+from pathlib import Path
+
+import uvicorn
+
+import backend.access_external.http_clients as http_clients
+import backend.data.mutations as mu
+import backend.data.queries as qu
+import backend.utils.env_reader as env
+from backend.benchmarks.common import quiet_logging
+from backend.scheduled_tasks.check_rss import poll_all_users
+from backend.types.my_types import WatchStatus
+
+SAMPLE_FEED = Path(__file__).parents[2] / "fyi" / "rss_debug.xml"
+TMDB_ID = re.compile(r"<tmdb:movieId>\d+</tmdb:movieId>")
+FIRST_ITEM = "<item>"
+
+stand_in_statuses: dict[int, int] = {}
+
+
+def _new_item(tmdb_id: int) -> str:
+    published = format_datetime(datetime.now(UTC))
+    return (
+        f"<item> <title>New, 2024</title> <pubDate>{published}</pubDate> "
+        f"<tmdb:movieId>{tmdb_id}</tmdb:movieId> </item>\n"
+    )
+
+
+def _stand_in(latency: float, tmdb_ids: list[int], hang: float):
+    template = SAMPLE_FEED.read_text(encoding="utf-8")
+    # * account number -> its feed, as it stands
+    feeds: dict[int, str] = {}
+
+    def feed(n: int) -> str:
+        if n not in feeds:
+            rng = random.Random(n)
+            feeds[n] = TMDB_ID.sub(
+                lambda _: f"<tmdb:movieId>{rng.choice(tmdb_ids)}</tmdb:movieId>", template
+            )
+        return feeds[n]
+
+    def add_items(n: int, count: int) -> None:
+        rng = random.Random()
+        new = "".join(_new_item(rng.choice(tmdb_ids)) for _ in range(count))
+        feeds[n] = feed(n).replace(FIRST_ITEM, new + FIRST_ITEM, 1)
+
+    async def app(scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        account = scope["path"].strip("/").split("/")[0]
+        n = int(account.rsplit("-", 1)[1])
+        await asyncio.sleep(hang if n % 20 == 19 else latency)
+        if n % 10 == 9:
+            status, headers, body = 404, [], b"Not found"
+        else:
+            body = feed(n).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'.encode()
+            if dict(scope["headers"]).get(b"if-none-match") == etag:
+                status, headers, body = 304, [(b"etag", etag)], b""
+            else:
+                status = 200
+                headers = [(b"content-type", b"application/rss+xml"), (b"etag", etag)]
+        stand_in_statuses[status] = stand_in_statuses.get(status, 0) + 1
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+    return app, add_items
+
+
+def _start_stand_in(latency: float, tmdb_ids: list[int], hang: float):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    app, add_items = _stand_in(latency, tmdb_ids, hang)
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port, add_items
+
+
+async def run(year: int, users: int, concurrency: int, latency_ms: float, politeness_ms: int) -> None:
+    movies = qu.get_movies(year)
+    tmdb_ids = [int(m.movie_db_id) for m in movies if m.movie_db_id is not None]
+    # * Longer than the timeout below, so those feeds fail
+    server, port, add_items = _start_stand_in(latency_ms / 1000, tmdb_ids, hang=3)
+    letterboxd = http_clients.SERVICES["letterboxd"]
+    http_clients.SERVICES["letterboxd"] = replace(
+        letterboxd, base_url=f"http://127.0.0.1:{port}", http2=False, max_connections=32
+    )
+    env.RSS_POLITENESS_MS = politeness_ms
+    env.RSS_TIMEOUT_SECONDS = 1
+    env.RSS_POLL_CONCURRENCY = concurrency
+    user_ids = [
+        await mu.add_user(f"benchmark-rss-{i}", letterboxd=f"benchmark-rss-{i}")
+        for i in range(users)
+    ]
+    try:
+        for label in ("first", "unchanged", "some new"):
+            if label == "some new":
+                for n in range(0, users, 4):
+                    add_items(n, 2)
+            stand_in_statuses.clear()
+            cpu_before = time.process_time()
+            summary = await poll_all_users(user_ids, year)
+            cpu = time.process_time() - cpu_before
+            print(
+                f"{label:10} {summary['seconds']:6.2f}s cpu={1000 * cpu:7.1f}ms  "
+                f"checked={summary['checked']}/{summary['users']} "
+                f"unchanged={summary['unchanged']} new_entries={summary['new_entries']} "
+                f"failures={summary['failures']}  stand-in: {dict(sorted(stand_in_statuses.items()))}"
+            )
+    finally:
+        movie_ids = [m.movie_id for m in movies]
+        for user_id in user_ids:
+            _ = await mu.set_watchlist_entries(
+                year, user_id, [(movie_id, WatchStatus.BLANK) for movie_id in movie_ids]
+            )
+            await mu.delete_user(user_id)
+        await http_clients.http_clients.close()
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=150, help="stand-in latency (ms)")
+    parser.add_argument("--politeness", type=int, default=0, help="RSS_POLITENESS_MS for the run")
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    asyncio.run(run(year, args.users, args.concurrency, args.latency, args.politeness))
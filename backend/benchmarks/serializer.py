@@ -0,0 +1,56 @@
+"""
+Compares ways of turning the watchlist into a JSON response body:
+    response_model    dicts from result_to_dict, validated against api_WatchNotice,
+                      then jsonable_encoder + json.dumps (what FastAPI does for
+                      a route that returns a list of dicts)
+    orjson rows       tuples straight to orjson (routing_lib.fast_json, shape=rows)
+    orjson columnar   the same, shape=columnar
+The database read is timed separately, so the numbers are just the encoding.
+
+    python -m backend.benchmarks.serializer [--iterations 50] [--year 2024]
+"""
+
+import argparse
+import json
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+import backend.data.queries as qu
+from backend.benchmarks.common import quiet_logging, summarize, time_calls
+from backend.routing_lib.fast_json import tuples_response
+from backend.types.api_schemas import api_WatchNotice
+
+_watchlist_adapter = TypeAdapter(list[api_WatchNotice])
+
+
+def _response_model(dicts) -> bytes:
+    validated = _watchlist_adapter.validate_python(dicts)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def run(year: int, iterations: int) -> None:
+    dicts = qu.get_watchlist(year)
+    rows = qu.get_watchlist_rows(year)
+    print(f"{len(rows)} watchlist rows for {year}\n")
+    print(f"{'read (dicts)':18} {summarize(time_calls(lambda: qu.get_watchlist(year), iterations))}")
+    print(f"{'read (tuples)':18} {summarize(time_calls(lambda: qu.get_watchlist_rows(year), iterations))}")
+    print()
+    cases = {
+        "response_model": lambda: _response_model(dicts),
+        "orjson rows": lambda: tuples_response(qu.WATCHLIST_COLUMNS, rows).body,
+        "orjson columnar": lambda: tuples_response(qu.WATCHLIST_COLUMNS, rows, "columnar").body,
+    }
+    for name, func in cases.items():
+        size = len(func())
+        print(f"{name:18} {summarize(time_calls(func, iterations))} {size / 1024:7.1f}KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    run(year, args.iterations)
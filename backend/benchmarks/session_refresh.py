@@ -0,0 +1,138 @@
+"""
+How long the first request of a session takes, now that the watchlist
+refresh it triggers runs in the background (refresh_queue) instead of in
+SessionMiddleware, against a local stand-in for letterboxd.com that serves
+fyi/rss_debug.xml after --latency ms.
+
+    inline     what the middleware used to do before answering: a full
+               check_rss.poll_all_users([user]) per session start
+    queued     GET /api/years with a fresh session for each user, timed
+               until the response; then how long the queue took to drain
+    repeat     the same users again, within the cooldown: nothing is queued
+
+Creates 2 * --users throwaway users with handles (half for each of the first
+two passes) and removes them and their entries at the end. This writes to
+the database!
+
+    python -m backend.benchmarks.session_refresh [--users 20] [--latency 400]
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+
+import uvicorn
+from fastapi.testclient import TestClient
+
+import backend.access_external.http_clients as http_clients
+import backend.data.mutations as mu
+import backend.data.queries as qu
+import backend.utils.env_reader as env
+from backend.benchmarks.common import quiet_logging, summarize, timed
+from backend.devserver import app
+from backend.routing_lib.user_session import UserSession
+from backend.scheduled_tasks.check_rss import poll_all_users
+from backend.scheduled_tasks.refresh_queue import refresh_queue
+from backend.types.my_types import WatchStatus
+
+SAMPLE_FEED = Path(__file__).parents[2] / "fyi" / "rss_debug.xml"
+
+
+def _start_stand_in(latency: float) -> tuple[uvicorn.Server, int]:
+    body = SAMPLE_FEED.read_bytes()
+
+    async def stand_in(scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        await asyncio.sleep(latency)
+        found = scope["path"].endswith("/rss/")
+        await send({"type": "http.response.start", "status": 200 if found else 404,
+                    "headers": [(b"content-type", b"application/rss+xml")]})
+        await send({"type": "http.response.body", "body": body if found else b""})
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(stand_in, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def _wait_for_queue(timeout: float = 120) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        stats = refresh_queue.stats()
+        if stats["waiting"] == 0 and stats["running"] == 0:
+            break
+        time.sleep(0.01)
+    return time.perf_counter() - start
+
+
+def run(year: int, users: int, latency_ms: float) -> None:
+    server, port = _start_stand_in(latency_ms / 1000)
+    letterboxd = http_clients.SERVICES["letterboxd"]
+    http_clients.SERVICES["letterboxd"] = replace(
+        letterboxd, base_url=f"http://127.0.0.1:{port}", http2=False
+    )
+    env.RSS_POLITENESS_MS = 0
+    user_ids = [
+        asyncio.run(mu.add_user(f"benchmark-session-{i}", letterboxd=f"benchmark-session-{i}"))
+        for i in range(2 * users)
+    ]
+    inline_users, queued_users = user_ids[:users], user_ids[users:]
+    try:
+        with TestClient(app) as client:
+            assert client.portal is not None
+            samples: list[float] = []
+            for user_id in inline_users:
+                with timed(samples):
+                    _ = client.portal.call(poll_all_users, [user_id])
+            print(f"inline  {summarize(samples)}")
+
+            # * Every request counts as coming back after the 20 minutes, so
+            # * each one asks for a refresh
+            UserSession.delta_minutes_inactive = -1
+            samples = []
+            for user_id in queued_users:
+                client.cookies.clear()
+                client.cookies.set("activeUserId", user_id)
+                with timed(samples):
+                    _ = client.get("/api/years").raise_for_status()
+            drained = _wait_for_queue()
+            print(f"queued  {summarize(samples)}  queue drained {1000 * drained:.0f}ms later")
+
+            samples = []
+            for user_id in queued_users:
+                client.cookies.clear()
+                client.cookies.set("activeUserId", user_id)
+                with timed(samples):
+                    _ = client.get("/api/years").raise_for_status()
+            print(f"repeat  {summarize(samples)}")
+            print(client.get("/api/admin/refresh-queue-stats").json())
+    finally:
+        UserSession.delta_minutes_inactive = 20
+        movie_ids = [m.movie_id for m in qu.get_movies(year)]
+        for user_id in user_ids:
+            _ = asyncio.run(mu.set_watchlist_entries(
+                year, user_id, [(movie_id, WatchStatus.BLANK) for movie_id in movie_ids]
+            ))
+            asyncio.run(mu.delete_user(user_id))
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=400, help="stand-in Letterboxd latency (ms)")
+    args = parser.parse_args()
+    quiet_logging()
+    run(datetime.now().year - 1, args.users, args.latency)
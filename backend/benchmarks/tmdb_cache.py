@@ -0,0 +1,125 @@
+"""
+Measures the TMDB response cache behind GET /api/forward/tmdb/movie/{id},
+against a local stand-in for TMDB (on a spare port, answering after
+--latency ms) so nothing goes out to the real API.
+
+Three passes over the same --movies movies, --requests each:
+    cold       empty cache: the first request per movie waits for "TMDB"
+    warm       every part fresh
+    stale      watch providers backdated past their TTL: served from the cache
+               while each movie is refreshed in the background
+Prints latencies, how many requests reached the stand-in, and the cache stats.
+Cached rows for the stand-in's movie IDs are purged before and after.
+
+    python -m backend.benchmarks.tmdb_cache [--movies 50] [--requests 1000] [--latency 120]
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import orjson
+import sqlalchemy as sa
+import uvicorn
+from fastapi.testclient import TestClient
+
+import backend.access_external.http_clients as http_clients
+from backend.benchmarks.common import quiet_logging, summarize, timed
+from backend.data.db_connections import Session
+from backend.data.db_schema import TmdbResponse
+from backend.data.tmdb_cache import TTLS, tmdb_cache
+from backend.devserver import app
+
+# * Well clear of real TMDB IDs that might already be cached
+FIRST_ID = 90_000_000
+
+upstream_calls: Counter[str] = Counter()
+
+
+def _stand_in(latency: float):
+    async def app(scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        upstream_calls[scope["path"]] += 1
+        await asyncio.sleep(latency)
+        tmdb_id = int(scope["path"].rsplit("/", 1)[1])
+        query = scope["query_string"].decode()
+        body: dict = {"id": tmdb_id, "title": f"Movie {tmdb_id}", "overview": "x" * 600}
+        if "credits" in query:
+            body["credits"] = {"cast": [{"name": f"Actor {i}"} for i in range(40)]}
+        if "providers" in query:
+            body["watch/providers"] = {"results": {"US": {"flatrate": [{"provider_name": "Stand-in"}]}}}
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": orjson.dumps(body)})
+    return app
+
+
+def _start_stand_in(latency: float) -> tuple[uvicorn.Server, int]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(_stand_in(latency), host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def _purge(client: TestClient, movies: int) -> None:
+    for tmdb_id in range(FIRST_ID, FIRST_ID + movies):
+        _ = client.delete(f"/api/admin/tmdb-cache?tmdbId={tmdb_id}")
+
+
+def _backdate_providers(movies: int) -> None:
+    long_ago = datetime.now() - 2 * TTLS["watch/providers"]
+    with Session() as session:
+        _ = session.execute(
+            sa.update(TmdbResponse)
+            .where(TmdbResponse.part == "watch/providers")
+            .where(TmdbResponse.path.in_(
+                [f"/movie/{tmdb_id}" for tmdb_id in range(FIRST_ID, FIRST_ID + movies)]
+            ))
+            .values(fetched_at=long_ago)
+        )
+        session.commit()
+
+
+def run(movies: int, requests: int, latency_ms: float) -> None:
+    server, port = _start_stand_in(latency_ms / 1000)
+    http_clients.SERVICES["tmdb"] = http_clients._ServiceConfig(f"http://127.0.0.1:{port}/3")
+    rng = random.Random(0)
+    # * A few nominees get most of the traffic
+    weights = [1 / (rank + 1) for rank in range(movies)]
+    with TestClient(app) as client:
+        _purge(client, movies)
+        for label in ("cold", "warm", "stale"):
+            if label == "stale":
+                _backdate_providers(movies)
+            upstream_calls.clear()
+            samples: list[float] = []
+            for tmdb_id in rng.choices(range(FIRST_ID, FIRST_ID + movies), weights, k=requests):
+                with timed(samples):
+                    _ = client.get(f"/api/forward/tmdb/movie/{tmdb_id}").raise_for_status()
+            time.sleep(2 * latency_ms / 1000)  # * Let background refreshes land
+            print(f"{label:6} {summarize(samples)} upstream={sum(upstream_calls.values())}")
+        print(client.get("/api/admin/tmdb-cache-stats").json())
+        _purge(client, movies)
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=120, help="stand-in TMDB latency (ms)")
+    args = parser.parse_args()
+    quiet_logging()
+    run(args.movies, args.requests, args.latency)
@@ -0,0 +1,60 @@
+"""
+Compares marking N movies on a watchlist one call at a time (a transaction and a
+commit per movie, as the PUT route used to) with one mu.set_watchlist_entries call.
+Writes go to a throwaway user, which is removed again at the end.
+
+    python -m backend.benchmarks.watchlist_bulk [--sizes 1 10 50 200] [--rounds 5] [--year 2024]
+"""
+
+import argparse
+import asyncio
+
+import backend.data.mutations as mu
+import backend.data.queries as qu
+from backend.benchmarks.common import quiet_logging, summarize, timed
+from backend.data.writer import writer
+from backend.types.my_types import WatchStatus
+
+
+async def run(year: int, sizes: list[int], rounds: int) -> None:
+    movie_ids = [movie.movie_id for movie in qu.get_movies(year)]
+    user_id = await mu.add_user("benchmark-watchlist-bulk")
+    try:
+        for size in sizes:
+            if size > len(movie_ids):
+                print(f"skipping size {size}: {year} only has {len(movie_ids)} movies")
+                continue
+            chosen = movie_ids[:size]
+            for label in ("one-by-one", "bulk"):
+                samples: list[float] = []
+                batches_before = writer.stats()["batches"]
+                for i in range(rounds):
+                    # * Alternate statuses so every round really changes every row
+                    status = WatchStatus.SEEN if i % 2 == 0 else WatchStatus.TODO
+                    with timed(samples):
+                        if label == "bulk":
+                            _ = await mu.set_watchlist_entries(
+                                year, user_id, [(m, status) for m in chosen])
+                        else:
+                            for m in chosen:
+                                _ = await mu.add_watchlist_entry(year, user_id, m, status)
+                commits = writer.stats()["batches"] - batches_before
+                print(
+                    f"size={size:<4} {label:10} {summarize(samples)} "
+                    f"commits/round={commits / rounds:.0f}"
+                )
+            _ = await mu.set_watchlist_entries(
+                year, user_id, [(m, WatchStatus.BLANK) for m in chosen])
+    finally:
+        await mu.delete_user(user_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    asyncio.run(run(year, args.sizes, args.rounds))
@@ -0,0 +1,68 @@
+"""
+Compares what a client downloads to stay in sync after a watchlist change:
+    full       PUT, then the whole year's watchlist again (what the PUT used to return)
+    delta      PUT with the client's cursor, which answers with just the changes
+Writes go to a throwaway user, which is removed again at the end.
+
+    python -m backend.benchmarks.watchlist_delta [--sizes 1 10 50] [--rounds 10] [--year 2024]
+"""
+
+import argparse
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import backend.data.mutations as mu
+import backend.data.queries as qu
+import backend.data.watchlist_changes as watchlist_changes
+from backend.benchmarks.common import quiet_logging, summarize, timed
+from backend.devserver import app
+from backend.types.my_types import WatchStatus
+
+
+def run(year: int, sizes: list[int], rounds: int) -> None:
+    movie_ids = [movie.movie_id for movie in qu.get_movies(year)]
+    user_id = asyncio.run(mu.add_user("benchmark-watchlist-delta"))
+    try:
+        with TestClient(app, cookies={"activeUserId": user_id}) as client:
+            for size in sizes:
+                chosen = movie_ids[:size]
+                for label in ("full", "delta"):
+                    samples: list[float] = []
+                    received = 0
+                    for i in range(rounds):
+                        # * Alternate statuses so every round really changes every row
+                        status = WatchStatus.SEEN if i % 2 == 0 else WatchStatus.TODO
+                        cursor = watchlist_changes.latest_cursor()
+                        body = {"year": year, "movieIds": chosen, "status": status.value}
+                        with timed(samples):
+                            if label == "delta":
+                                response = client.put(
+                                    "/api/watchlist", json=body | {"since": cursor}
+                                )
+                                received += len(response.content)
+                            else:
+                                _ = client.put("/api/watchlist", json=body)
+                                response = client.get(f"/api/watchlist?year={year}")
+                                received += len(response.content)
+                    print(
+                        f"size={size:<4} {label:6} {summarize(samples)} "
+                        f"{received / rounds / 1024:8.1f}KiB/round"
+                    )
+                _ = client.put(
+                    "/api/watchlist",
+                    json={"year": year, "movieIds": chosen, "status": WatchStatus.BLANK.value},
+                )
+    finally:
+        asyncio.run(mu.delete_user(user_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    run(year, args.sizes, args.rounds)
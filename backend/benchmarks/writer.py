@@ -0,0 +1,74 @@
+"""
+Finds the write throughput ceiling of the single writer.
+A number of concurrent clients each flip single watchlist entries as fast as
+they can (throwaway users, cleaned up at the end). Runs once with batching
+turned off (max_batch=1, one commit per write) and once with WRITER_MAX_BATCH.
+
+    python -m backend.benchmarks.writer [--clients 1 8 32] [--writes 50] [--year 2024]
+"""
+
+import argparse
+import asyncio
+import time
+
+import backend.data.mutations as mu
+import backend.data.queries as qu
+import backend.utils.env_reader as env
+from backend.benchmarks.common import quiet_logging, summarize, timed
+from backend.data.writer import writer
+from backend.types.api_schemas import MovieID, UserID
+from backend.types.my_types import WatchStatus
+
+
+async def _client(user_id: UserID, year: int, movie_ids: list[MovieID], writes: int, samples: list[float]):
+    for i in range(writes):
+        movie_id = movie_ids[i % len(movie_ids)]
+        status = WatchStatus.SEEN if (i // len(movie_ids)) % 2 == 0 else WatchStatus.TODO
+        with timed(samples):
+            _ = await mu.add_watchlist_entry(year, user_id, movie_id, status)
+
+
+async def run(year: int, client_counts: list[int], writes: int) -> None:
+    movie_ids = [movie.movie_id for movie in qu.get_movies(year)]
+    user_ids = [
+        await mu.add_user(f"benchmark-writer-{i}") for i in range(max(client_counts))
+    ]
+    try:
+        for max_batch in (1, env.WRITER_MAX_BATCH):
+            writer.max_batch = max_batch
+            print(f"\n== max_batch={max_batch} ==")
+            for clients in client_counts:
+                samples: list[float] = []
+                before = writer.stats()
+                start = time.perf_counter()
+                await asyncio.gather(*(
+                    _client(user_ids[i], year, movie_ids, writes, samples)
+                    for i in range(clients)
+                ))
+                elapsed = time.perf_counter() - start
+                after = writer.stats()
+                jobs = after["jobs"] - before["jobs"]
+                batches = after["batches"] - before["batches"]
+                print(
+                    f"clients={clients:<3} {jobs / elapsed:8.0f} writes/s  "
+                    f"commits={batches:<5} mean batch={jobs / max(batches, 1):5.1f}  "
+                    f"latency {summarize(samples)}"
+                )
+    finally:
+        writer.max_batch = env.WRITER_MAX_BATCH
+        for user_id in user_ids:
+            _ = await mu.set_watchlist_entries(
+                year, user_id, [(m, WatchStatus.BLANK) for m in movie_ids])
+            await mu.delete_user(user_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--writes", type=int, default=50,
+                        help="writes per client")
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    year = args.year or max(qu.get_years())
+    asyncio.run(run(year, args.clients, args.writes))
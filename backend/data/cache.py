@@ -0,0 +1,77 @@
+import logging
+import threading
+from collections import Counter
+from collections.abc import Callable
+from typing import Any, Literal, TypeVar
+
+type CachedDataset = Literal["movies", "nominations", "categories", "years", "tmdb_index"]
+
+_T = TypeVar("_T")
+
+
+class ReferenceCache:
+    """
+    In-process cache for the per-year reference data (movies, nominations,
+    categories, the list of years, and the TMDB ID index the RSS sync matches
+    feeds against).
+    Values are stored exactly as the API hands them out, so a hit never touches
+    the database. Treat anything returned from here as read-only!
+
+    Entries are keyed by (dataset, year). Datasets that aren't year-scoped
+    (e.g. "years") use year=None.
+    Write paths call invalidate() after they commit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[CachedDataset, int | None], Any] = {}
+        # * Bumped on every invalidation, so a compute that raced with a write
+        # * doesn't store its (possibly stale) result
+        self._generation = 0
+        self.hits: Counter[CachedDataset] = Counter()
+        self.misses: Counter[CachedDataset] = Counter()
+
+    def get_or_compute(
+        self, dataset: CachedDataset, year: int | None, compute: Callable[[], _T]
+    ) -> _T:
+        key = (dataset, year)
+        with self._lock:
+            if key in self._entries:
+                self.hits[dataset] += 1
+                return self._entries[key]
+            self.misses[dataset] += 1
+            generation = self._generation
+        value = compute()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = value
+        return value
+
+    def invalidate(self, year: int | None = None) -> None:
+        """
+        Drops every cached dataset for `year` (or for all years, if year is None).
+        The list of years is always dropped, since a write can add a new year.
+        """
+        with self._lock:
+            self._generation += 1
+            if year is None:
+                self._entries.clear()
+            else:
+                for key in list(self._entries):
+                    if key[1] == year or key[1] is None:
+                        del self._entries[key]
+        logging.debug(f"Reference cache invalidated for year {year}")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "entries": [
+                    {"dataset": dataset, "year": year}
+                    for dataset, year in self._entries
+                ],
+            }
+
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,145 @@
+"""
+Category completion engine for the 'by category' view.
+
+Instead of asking SQLite for a COUNT(DISTINCT) per category per user
+(with a User x Movie cartesian product for the totals), we load the year's
+nomination incidence once and give every movie a bit position.
+Each category, each grouping, and each user's seen/todo list then becomes an
+integer mask, and every count is a popcount of two masks ANDed together.
+"""
+
+from collections.abc import Iterable
+from typing import Any
+
+import sqlalchemy as sa
+import sqlalchemy.orm as orm
+
+from backend.data.db_connections import Session
+from backend.data.db_schema import Category, Movie, Nomination, User, Watchnotice
+from backend.types.api_schemas import (
+    CategoryCompletionKey,
+    CategoryID,
+    MovieID,
+    UserID,
+    countTypes,
+)
+from backend.types.my_types import Grouping, WatchStatus
+
+type CategoryCompletionDict = dict[
+    UserID, dict[CategoryCompletionKey, dict[countTypes, int]]
+]
+
+
+class NominationIncidence:
+    """
+    Which movies are nominated in which categories (and groupings) in a year,
+    as bitmasks over the year's nominees.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[tuple[MovieID, CategoryID, str | None, bool | None]],
+        has_movies: bool = True,
+    ):
+        """
+        rows are (movie_id, category_id, grouping, movie_is_from_this_year),
+        one per nomination.
+        has_movies says whether the year has any movies at all; if it doesn't,
+        users get no keys (not even the groupings).
+        """
+        self.has_movies = has_movies
+        self.movie_bits: dict[MovieID, int] = {}
+        self.category_masks: dict[CategoryID, int] = {}
+        self.grouping_masks: dict[str, int] = {g.value: 0 for g in Grouping}
+        # * Movies that count towards the totals (Movie.year matches the nomination year)
+        self.total_mask = 0
+        for movie_id, category_id, grouping, in_year in rows:
+            bit = self.movie_bits.setdefault(movie_id, 1 << len(self.movie_bits))
+            self.category_masks[category_id] = self.category_masks.get(category_id, 0) | bit
+            if grouping in self.grouping_masks:
+                self.grouping_masks[grouping] |= bit
+            if in_year:
+                self.total_mask |= bit
+
+
+def load_incidence(session: orm.Session, year: int) -> NominationIncidence:
+    result = session.execute(
+        sa.select(
+            Nomination.movie_id,
+            Nomination.category_id,
+            Category.grouping,
+            Movie.year == year,
+        )
+        .select_from(Nomination)
+        .join(Category, Nomination.category_id == Category.category_id)
+        .outerjoin(Movie, Nomination.movie_id == Movie.movie_id)
+        .where(Nomination.year == year)
+    )
+    has_movies = session.execute(
+        sa.select(sa.exists().where(Movie.year == year))
+    ).scalar_one()
+    return NominationIncidence(result.tuples(), has_movies)
+
+
+def load_watchlist_masks(
+    session: orm.Session, year: int, incidence: NominationIncidence
+) -> dict[UserID, dict[WatchStatus, int]]:
+    result = session.execute(
+        sa.select(Watchnotice.user_id, Watchnotice.movie_id, Watchnotice.status)
+        .where(Watchnotice.year == year)
+    )
+    return watchlist_masks(result.tuples(), incidence)
+
+
+def watchlist_masks(
+    watchlist: Iterable[tuple[UserID, MovieID, WatchStatus]],
+    incidence: NominationIncidence,
+) -> dict[UserID, dict[WatchStatus, int]]:
+    masks: dict[UserID, dict[WatchStatus, int]] = {}
+    for user_id, movie_id, status in watchlist:
+        user_masks = masks.setdefault(
+            user_id, {WatchStatus.SEEN: 0, WatchStatus.TODO: 0})
+        if status in user_masks:
+            user_masks[status] |= incidence.movie_bits.get(movie_id, 0)
+    return masks
+
+
+def compute_category_completion(
+    incidence: NominationIncidence,
+    user_ids: Iterable[UserID],
+    masks: dict[UserID, dict[WatchStatus, int]],
+) -> CategoryCompletionDict:
+    """
+    Every user gets every category with a nomination this year, plus every grouping.
+    Users missing from `masks` have seen nothing.
+    """
+    keyed_masks: list[tuple[Any, int]] = [
+        *incidence.category_masks.items(),
+        *incidence.grouping_masks.items(),
+    ] if incidence.has_movies else []
+    totals = [
+        (key, mask, (mask & incidence.total_mask).bit_count())
+        for key, mask in keyed_masks
+    ]
+    output: CategoryCompletionDict = {}
+    for user_id in user_ids:
+        user_masks = masks.get(user_id, {})
+        seen = user_masks.get(WatchStatus.SEEN, 0)
+        todo = user_masks.get(WatchStatus.TODO, 0)
+        output[user_id] = {
+            key: {
+                "seen": (seen & mask).bit_count(),
+                "todo": (todo & mask).bit_count(),
+                "total": total,
+            }
+            for key, mask, total in totals
+        }
+    return output
+
+
+def get_category_completion_dict(year: int) -> CategoryCompletionDict:
+    with Session() as session:
+        incidence = load_incidence(session, year)
+        user_ids = session.execute(sa.select(User.user_id)).scalars().all()
+        masks = load_watchlist_masks(session, year, incidence)
+    return compute_category_completion(incidence, user_ids, masks)
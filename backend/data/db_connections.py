@@ -1,11 +1,88 @@
+import asyncio
+import functools
 import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal, ParamSpec, TypeVar
 
 import sqlalchemy as sa
 import sqlalchemy.orm as sa_orm
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
 
+import backend.utils.env_reader as env
 from backend.data.db_schema import DB_PATH, Base
 
+type PoolMode = Literal["queue", "null"]
+
+_P = ParamSpec("_P")
+_T = TypeVar("_T")
+
+_SYNCHRONOUS_VALUES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORE_VALUES = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def sqlite_pragmas() -> list[tuple[str, str | int]]:
+    """
+    The PRAGMA profile applied to every new connection, as configured in .env.
+    PRAGMA values can't be bound as parameters, so the string ones are checked here.
+    """
+    synchronous = env.SQLITE_SYNCHRONOUS.upper()
+    temp_store = env.SQLITE_TEMP_STORE.upper()
+    if synchronous not in _SYNCHRONOUS_VALUES:
+        raise ValueError(
+            f"SQLITE_SYNCHRONOUS must be one of {_SYNCHRONOUS_VALUES}, got {synchronous}")
+    if temp_store not in _TEMP_STORE_VALUES:
+        raise ValueError(
+            f"SQLITE_TEMP_STORE must be one of {_TEMP_STORE_VALUES}, got {temp_store}")
+    return [
+        ("synchronous", synchronous),
+        ("cache_size", int(env.SQLITE_CACHE_SIZE)),
+        ("mmap_size", int(env.SQLITE_MMAP_SIZE)),
+        ("temp_store", temp_store),
+        ("busy_timeout", int(env.SQLITE_BUSY_TIMEOUT)),
+        ("foreign_keys", "ON" if env.SQLITE_FOREIGN_KEYS else "OFF"),
+    ]
+
+
+def create_db_engine(
+    pool_mode: PoolMode | str = env.DB_POOL_MODE,
+    pool_size: int = env.DB_POOL_SIZE,
+    max_overflow: int = env.DB_MAX_OVERFLOW,
+) -> sa.Engine:
+    """
+    "queue" keeps up to pool_size (+ max_overflow) connections open and reuses them,
+    "null" opens a fresh connection for every session (the old behaviour).
+    Either way, every new connection gets the PRAGMA profile.
+    """
+    pool_args: dict[str, Any]
+    if pool_mode == "queue":
+        pool_args = {
+            "poolclass": QueuePool,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+        }
+    elif pool_mode == "null":
+        pool_args = {"poolclass": NullPool}
+    else:
+        raise ValueError(f"DB_POOL_MODE must be 'queue' or 'null', got {pool_mode}")
+    new_engine = sa.create_engine(
+        f"sqlite:///{DB_PATH}",
+        connect_args={"check_same_thread": False,
+                      "timeout": env.SQLITE_BUSY_TIMEOUT / 1000},
+        **pool_args,
+    )
+    pragmas = sqlite_pragmas()
+
+    @sa.event.listens_for(new_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            _ = cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return new_engine
+
+
 try:
     if DB_PATH is None:
         logging.error(
@@ -16,11 +93,7 @@ try:
         logging.warning(f"Database file {DB_PATH} does not exist, creating it")
         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
         DB_PATH.touch()
-    engine = sa.create_engine(
-        f"sqlite:///{DB_PATH}",
-        connect_args={"check_same_thread": False, "timeout": 30},
-        poolclass=NullPool,
-    )
+    engine = create_db_engine()
 except Exception as e:
     logging.error(f"Error creating engine: {e}")
     raise
@@ -32,10 +105,47 @@ except Exception as e:
     logging.error(f"Error creating engine: {e}")
     raise
 try:
+    # * journal_mode is stored in the database file, so once is enough.
+    # * The PRAGMA returns a row; it has to be read, or the statement stays open
+    # * on the pooled connection and every later COMMIT on it fails.
     with engine.connect() as conn:
-        _ = conn.execute(sa.text("PRAGMA journal_mode=WAL"))
+        _ = conn.execute(sa.text("PRAGMA journal_mode=WAL")).scalar()
 except Exception as e:
     logging.error(f"Error setting journal mode: {e}")
 
 
 Session = sa_orm.sessionmaker(bind=engine)
+
+
+# * Sessions are synchronous, so route handlers hand their database work to these
+# * threads instead of running it on the event loop. Sized like the pool, so a
+# * burst of slow queries queues here instead of waiting on pool checkouts.
+_db_executor: ThreadPoolExecutor | None = None
+
+
+def configure_db_executor(workers: int = env.DB_EXECUTOR_WORKERS) -> None:
+    """(Re)creates the executor behind run_db. workers=0 disables it."""
+    global _db_executor
+    old_executor = _db_executor
+    _db_executor = (
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        if workers > 0
+        else None
+    )
+    if old_executor is not None:
+        old_executor.shutdown(wait=False)
+
+
+configure_db_executor()
+
+
+async def run_db(func: Callable[_P, _T], *args: _P.args, **kwargs: _P.kwargs) -> _T:
+    """
+    Runs a synchronous data-access function (anything from queries or mutations)
+    on the database executor and waits for it without blocking the event loop.
+    With DB_EXECUTOR_WORKERS=0 it just calls the function.
+    """
+    if _db_executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
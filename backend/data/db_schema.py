@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import logging
+import random
 import sqlite3
 from datetime import datetime
 from typing import override
 
 import sqlalchemy as sa
 import sqlalchemy.orm as orm
-from pydantic import EmailStr
+from pydantic import EmailStr, ValidationError
 from sqlalchemy import Index
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
@@ -50,7 +52,10 @@ def init_db():
                 movie_db_id TEXT,
                 runtime INTEGER,
                 poster_path TEXT,
-                subtitle_position INTEGER
+                subtitle_position INTEGER,
+                is_short BOOLEAN,
+                is_multinom BOOLEAN NOT NULL DEFAULT 0,
+                num_noms INTEGER NOT NULL DEFAULT 0
             )
         """
         )
@@ -116,7 +121,18 @@ def init_db():
 # * # * # * # * # * # *
 
 
-class UserID_SQL(sa.TypeDecorator[UserID]):
+_ID_READ_MODES = {"validate", "sample", "trusted"}
+
+
+class _ID_SQL[T](sa.TypeDecorator[T]):
+    """
+    IDs are validated on the way in (api_schemas), so re-validating every one
+    we read back costs a pydantic model per row for nothing. DB_ID_READ_MODE
+    picks how much of that to keep:
+        validate  every value goes through process_result_value, as before
+        sample    about 1 in DB_ID_SAMPLE_EVERY is validated, mismatches are logged
+        trusted   values come back as stored
+    """
     impl = sa.String
     cache_ok = True
 
@@ -124,32 +140,56 @@ class UserID_SQL(sa.TypeDecorator[UserID]):
     def process_bind_param(self, value, dialect):
         return str(value) if value is not None else None
 
+    @override
+    def result_processor(self, dialect, coltype):
+        mode = env.DB_ID_READ_MODE
+        if mode not in _ID_READ_MODES:
+            raise ValueError(
+                f"DB_ID_READ_MODE must be one of {_ID_READ_MODES}, got {mode}")
+        if mode == "validate":
+            return super().result_processor(dialect, coltype)
+        # * What the plain String column would do (nothing, on SQLite)
+        impl_processor = self.impl_instance.result_processor(dialect, coltype)
+        if mode == "trusted":
+            return impl_processor
+
+        rate = 1 / max(1, env.DB_ID_SAMPLE_EVERY)
+        validate = self.process_result_value
+        type_name = type(self).__name__
+
+        def process(value):
+            if impl_processor is not None:
+                value = impl_processor(value)
+            if value is not None and random.random() < rate:
+                try:
+                    _ = validate(value, dialect)
+                except ValidationError as e:
+                    logging.error(
+                        f"{type_name} read an invalid value from the database: {value!r}\n{e}")
+            return value
+
+        return process
+
+
+class UserID_SQL(_ID_SQL[UserID]):
+    cache_ok = True
+
     @override
     def process_result_value(self, value, dialect):
         return AnnotatedValidator(user=value).user
 
 
-class MovieID_SQL(sa.TypeDecorator[MovieID]):
-    impl = sa.String
+class MovieID_SQL(_ID_SQL[MovieID]):
     cache_ok = True
 
-    @override
-    def process_bind_param(self, value, dialect):
-        return str(value) if value is not None else None
-
     @override
     def process_result_value(self, value, dialect):
         return AnnotatedValidator(movie=value).movie
 
 
-class CategoryID_SQL(sa.TypeDecorator[CategoryID]):
-    impl = sa.String
+class CategoryID_SQL(_ID_SQL[CategoryID]):
     cache_ok = True
 
-    @override
-    def process_bind_param(self, value, dialect):
-        return str(value) if value is not None else None
-
     @override
     def process_result_value(self, value, dialect):
         return AnnotatedValidator(category=value).category
@@ -192,8 +232,18 @@ class User(Base):
     username: Mapped[str] = mapped_column(sa.String)
     letterboxd: Mapped[str | None] = mapped_column(sa.String, nullable=True)
     email: Mapped[EmailStr | None] = mapped_column(Email_SQL, nullable=True)
+    # * When the RSS sync last read this user's feed (UTC), and the feed's
+    # * validators from then, for conditional requests (see check_rss)
     last_letterboxd_check: Mapped[datetime | None] = mapped_column(
         sa.DateTime, nullable=True)
+    rss_etag: Mapped[str | None] = mapped_column(sa.String, nullable=True)
+    rss_last_modified: Mapped[str | None] = mapped_column(sa.String, nullable=True)
+    # * Which TMDB index that check matched the feed against
+    rss_index_key: Mapped[str | None] = mapped_column(sa.String, nullable=True)
+    # * Letterboxd avatar URL, refreshed in the background (see backend.data.propics)
+    propic: Mapped[str | None] = mapped_column(sa.String, nullable=True)
+    propic_checked_at: Mapped[datetime | None] = mapped_column(
+        sa.DateTime, nullable=True)
 
     watchnotices = orm.relationship(
         "Watchnotice", back_populates="user", viewonly=True)
@@ -212,6 +262,14 @@ class Movie(Base):
     poster_path: Mapped[str | None] = mapped_column(sa.String, nullable=True)
     subtitle_position: Mapped[int | None] = mapped_column(
         sa.Integer, nullable=True)
+    # * Denormalized from the nominations table, kept in sync by mu.refresh_movie_flags()
+    # * The hybrid properties below read these in SQL
+    stored_is_short: Mapped[bool | None] = mapped_column(
+        "is_short", sa.Boolean, nullable=True)
+    stored_is_multinom: Mapped[bool] = mapped_column(
+        "is_multinom", sa.Boolean, nullable=False, server_default=sa.text("0"))
+    stored_num_noms: Mapped[int] = mapped_column(
+        "num_noms", sa.Integer, nullable=False, server_default=sa.text("0"))
 
     nominations = orm.relationship(
         "Nomination", back_populates="movie", viewonly=True)
@@ -231,13 +289,9 @@ class Movie(Base):
     @is_short.inplace.expression
     @classmethod
     def _is_short_expr(cls) -> sa.ColumnElement[bool]:
-        return (
-            sa.select(sa.func.max(Category.is_short))
-            .where(Nomination.movie_id == cls.movie_id)
-            .where(Nomination.category_id == Category.category_id)
-            .correlate(cls)
-            .scalar_subquery()
-        )
+        # * Still NULL for a movie without nominations, like the max() subquery
+        # * it replaced; type_coerce only changes the Python-side type
+        return sa.type_coerce(cls.stored_is_short, sa.Boolean)
 
     @hybrid_property
     def is_multinom(self) -> bool:
@@ -247,12 +301,7 @@ class Movie(Base):
     @is_multinom.inplace.expression
     @classmethod
     def _is_multinom_expr(cls) -> sa.ColumnElement[bool]:
-        return (
-            sa.select(sa.func.count() > 1)
-            .where(Nomination.movie_id == cls.movie_id)
-            .correlate(cls)
-            .scalar_subquery()
-        )
+        return cls.stored_is_multinom.expression
 
     @hybrid_property
     def num_noms(self) -> int:
@@ -262,12 +311,7 @@ class Movie(Base):
     @num_noms.inplace.expression
     @classmethod
     def _num_noms_expr(cls) -> sa.ColumnElement[int]:
-        return (
-            sa.select(sa.func.count())
-            .where(Nomination.movie_id == cls.movie_id)
-            .correlate(cls)
-            .scalar_subquery()
-        )
+        return cls.stored_num_noms.expression
 
     @hybrid_property
     def runtime_hours(self) -> str | None:
@@ -394,3 +438,82 @@ class KeyDates(Base):
 
     # Add index on timestamp column
     __table_args__ = (Index("idx_key_dates_timestamp", "timestamp"),)
+
+
+class DataVersion(Base):
+    """
+    A counter per (dataset, year), bumped in the same transaction as any write
+    that changes what the year-scoped GET routes return. The routes derive
+    their ETags from it. Datasets that aren't year-scoped (users) use year=0.
+    """
+    __tablename__ = "data_versions"
+    dataset: Mapped[str] = mapped_column(sa.String, primary_key=True)
+    year: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(
+        sa.Integer, nullable=False, server_default=sa.text("0"))
+
+
+class WatchlistChange(Base):
+    """
+    Append-only log of watchlist writes, one row per (user, movie) change,
+    written in the same transaction as the change itself. `seq` is the sync
+    cursor clients hold. A NULL status means the entry was removed from `year`.
+    No foreign keys: the log outlives the users and movies it mentions.
+    """
+    __tablename__ = "watchlist_changes"
+    seq: Mapped[int] = mapped_column(
+        sa.Integer, primary_key=True, autoincrement=True)
+    year: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    user_id: Mapped[UserID] = mapped_column(UserID_SQL, nullable=False)
+    movie_id: Mapped[MovieID] = mapped_column(MovieID_SQL, nullable=False)
+    status: Mapped[WatchStatus | None] = mapped_column(
+        WatchStatus_SQL, nullable=True)
+
+    __table_args__ = (Index("idx_watchlist_changes_year_seq", "year", "seq"),)
+
+
+class TmdbResponse(Base):
+    """
+    Cached TMDB API responses, one row per (path, part). `part` is "" for the
+    response itself and the append_to_response name (e.g. "credits") for
+    each appended section, so each can expire on its own schedule.
+    `body` is the JSON as TMDB sent it.
+    """
+    __tablename__ = "tmdb_responses"
+    path: Mapped[str] = mapped_column(sa.String, primary_key=True)
+    part: Mapped[str] = mapped_column(sa.String, primary_key=True)
+    body: Mapped[bytes] = mapped_column(sa.LargeBinary, nullable=False)
+    fetched_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+
+
+class Job(Base):
+    """
+    The background job queue (backend/scheduled_tasks/job_queue.py), one row
+    per job. `params` and `result` are JSON. A running job's worker touches
+    `heartbeat_at` every few seconds, so a job whose process died can be told
+    apart from one that's just slow.
+    """
+    __tablename__ = "jobs"
+    job_id: Mapped[int] = mapped_column(
+        sa.Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(sa.String, nullable=False)
+    params: Mapped[bytes] = mapped_column(sa.LargeBinary, nullable=False)
+    status: Mapped[str] = mapped_column(sa.String, nullable=False)
+    attempts: Mapped[int] = mapped_column(
+        sa.Integer, nullable=False, server_default=sa.text("0"))
+    max_attempts: Mapped[int] = mapped_column(sa.Integer, nullable=False)
+    run_after: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(sa.DateTime, nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(sa.DateTime)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(sa.DateTime)
+    finished_at: Mapped[datetime | None] = mapped_column(sa.DateTime)
+    progress_done: Mapped[int] = mapped_column(
+        sa.Integer, nullable=False, server_default=sa.text("0"))
+    progress_total: Mapped[int | None] = mapped_column(sa.Integer)
+    progress_note: Mapped[str | None] = mapped_column(sa.String)
+    cancel_requested: Mapped[bool] = mapped_column(
+        sa.Boolean, nullable=False, server_default=sa.text("0"))
+    result: Mapped[bytes | None] = mapped_column(sa.LargeBinary)
+    error: Mapped[str | None] = mapped_column(sa.String)
+
+    __table_args__ = (Index("idx_jobs_status_run_after", "status", "run_after"),)
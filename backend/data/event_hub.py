@@ -0,0 +1,162 @@
+"""
+In-process broadcast of "something changed" events, for the server-sent
+events stream (GET /api/events/stream).
+
+Writes publish from their after_commit hooks, so an event never goes out
+for something that didn't commit. publish() is called from the writer thread;
+each subscriber is an asyncio.Queue on the event loop that's serving its
+stream, and messages are handed over with call_soon_threadsafe.
+
+Each message is encoded into its SSE frame once, and the same bytes go to
+every subscriber. Buffers are bounded (SSE_CLIENT_BUFFER). A subscriber that
+falls that far behind doesn't hold anyone up: its backlog is thrown away and
+replaced with a single "resync" event, which tells the client to refetch.
+
+The last HISTORY messages are kept, so a client that reconnects with
+Last-Event-ID gets what it missed (or a resync, if that's too far back or
+from before a restart).
+
+Events:
+    watchlist   {"years": [...], "userId": ..., "cursor": ...}
+    users       {"userId": ..., "action": "added" | "updated" | "removed"}
+    keyDates    {"keyDateId": ...}
+    refreshed   {"userId": ..., "ok": ..., "newEntries": ...}  (a watchlist refresh finished)
+    resync      {}
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Literal
+
+import orjson
+
+import backend.utils.env_reader as env
+
+type HubEvent = Literal["watchlist", "users", "keyDates", "refreshed", "resync"]
+type HubCounter = Literal["published", "delivered", "overflows", "replayed", "resyncs"]
+
+# * Messages kept for clients that reconnect with Last-Event-ID
+HISTORY = 256
+
+# * Event IDs are "<boot>-<n>", so an ID from before a restart is recognizably stale
+_BOOT_ID = f"{time.time_ns():x}"
+
+
+def _frame(event_id: str | None, event: HubEvent, data: Any) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: ".encode() + orjson.dumps(data) + b"\n\n"
+
+
+# * Sent in place of whatever a client missed; it has no ID, so the client's
+# * Last-Event-ID stays where it was
+RESYNC_FRAME = _frame(None, "resync", {})
+
+
+class _Subscriber:
+    __slots__ = ("loop", "queue")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, buffer_size: int):
+        self.loop = loop
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=buffer_size)
+
+
+class EventHub:
+    def __init__(self, buffer_size: int = env.SSE_CLIENT_BUFFER):
+        self.buffer_size = max(1, buffer_size)
+        self._lock = threading.Lock()
+        self._subscribers: set[_Subscriber] = set()
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=HISTORY)
+        self._next_seq = 1
+        self.counters: Counter[HubCounter] = Counter()
+
+    def publish(self, event: HubEvent, data: dict[str, Any]) -> None:
+        """Safe to call from any thread."""
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            frame = _frame(f"{_BOOT_ID}-{seq}", event, data)
+            self._history.append((seq, frame))
+            self.counters["published"] += 1
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._offer, subscriber, frame)
+            except RuntimeError:
+                # * Its loop is closed (the server is shutting down)
+                self._remove(subscriber)
+
+    @asynccontextmanager
+    async def subscribe(self, last_event_id: str | None = None) -> AsyncIterator[asyncio.Queue[bytes]]:
+        """
+        Yields the queue of SSE frames for one client, until the block exits.
+        Pass the client's Last-Event-ID to replay what it missed.
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop(), self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            backlog = self._replay(last_event_id)
+        # * Queued before anything published from here on, which can only
+        # * arrive once this coroutine yields to the loop
+        for frame in backlog:
+            self._offer(subscriber, frame)
+        try:
+            yield subscriber.queue
+        finally:
+            self._remove(subscriber)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.counters["published"],
+                "delivered": self.counters["delivered"],
+                "overflows": self.counters["overflows"],
+                "replayed": self.counters["replayed"],
+                "resyncs": self.counters["resyncs"],
+                "buffer_size": self.buffer_size,
+            }
+
+    def _replay(self, last_event_id: str | None) -> list[bytes]:
+        """Call with the lock held."""
+        if not last_event_id:
+            return []
+        boot, _, seq_str = last_event_id.rpartition("-")
+        if boot != _BOOT_ID or not seq_str.isdigit():
+            self.counters["resyncs"] += 1
+            return [RESYNC_FRAME]
+        seq = int(seq_str)
+        oldest = self._history[0][0] if self._history else self._next_seq
+        if seq < oldest - 1:
+            self.counters["resyncs"] += 1
+            return [RESYNC_FRAME]
+        missed = [frame for frame_seq, frame in self._history if frame_seq > seq]
+        self.counters["replayed"] += len(missed)
+        return missed
+
+    def _offer(self, subscriber: _Subscriber, frame: bytes) -> None:
+        """Runs on the subscriber's event loop."""
+        try:
+            subscriber.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # * Too far behind to catch up one event at a time
+            while not subscriber.queue.empty():
+                _ = subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(RESYNC_FRAME)
+            with self._lock:
+                self.counters["overflows"] += 1
+            logging.debug("An event stream subscriber overflowed and was told to resync")
+            return
+        with self._lock:
+            self.counters["delivered"] += 1
+
+    def _remove(self, subscriber: _Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+
+event_hub = EventHub()
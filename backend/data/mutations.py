@@ -1,20 +1,26 @@
 import logging
-from contextlib import contextmanager
+from collections.abc import Iterable
 from typing import Any
 
-import pandas as pd
 import sqlalchemy as sa
+import sqlalchemy.orm as orm
 
+import backend.data.versions as versions
+import backend.data.watchlist_changes as watchlist_changes
+from backend.data.cache import reference_cache
 from backend.data.db_connections import Session
-from backend.data.db_schema import Movie, Nomination, User, Watchnotice
+from backend.data.db_schema import Category, Movie, Nomination, User, Watchnotice
+from backend.data.event_hub import event_hub
+from backend.data.user_index import user_index
+from backend.data.user_stats import user_stats
 from backend.data.utils import create_unique_movie_id, create_unique_user_id
-from backend.types.api_schemas import MovieID, UserID
+from backend.data.writer import writer
+from backend.types.api_schemas import MovieID, UserID, WatchlistOutcome
 from backend.types.api_validators import MovieValidator
 from backend.types.my_types import *
 
 
-def add_user(username: str, **kwargs) -> UserID:
-    user_id = create_unique_user_id()
+async def add_user(username: str, **kwargs) -> UserID:
     try:
         assert username is not None
         assert all(
@@ -23,104 +29,222 @@ def add_user(username: str, **kwargs) -> UserID:
     except Exception as e:
         logging.error(f"Tried to add new user with invalid columns: {e}")
         raise e
-    mutation = sa.insert(User).values(
-        user_id=user_id,
-        username=username,
-        **kwargs,
-    )
-    with Session() as session:
-        _ = session.execute(mutation)
-        session.commit()
-    return user_id
 
+    def work(session: orm.Session) -> UserID:
+        user_id = create_unique_user_id(session)
+        _ = session.execute(
+            sa.insert(User).values(
+                user_id=user_id,
+                username=username,
+                **kwargs,
+            )
+        )
+        versions.bump(session, None, "users")
+        return user_id
+
+    def after_commit(user_id: UserID) -> None:
+        user_index.add(user_id)
+        user_stats.add_user(user_id)
+        event_hub.publish("users", {"userId": user_id, "action": "added"})
+
+    return await writer.write(work, after_commit)
 
-def update_user(userId: UserID, new_data: dict[str, str]):
+
+async def update_user(userId: UserID, new_data: dict[str, str]):
 
     assert all(
         key in User.__table__.columns.keys() for key in new_data
     ), f"Invalid user column(s): {[k for k in new_data if k not in User.__table__.columns.keys()]}"
-    with Session() as session:
+    values: dict[str, Any] = dict(new_data)
+    if "letterboxd" in values:
+        # * A different account means a different picture and a different feed;
+        # * refetch the picture on next read, and the whole feed on the next sync
+        values.update(
+            propic=None,
+            propic_checked_at=None,
+            last_letterboxd_check=None,
+            rss_etag=None,
+            rss_last_modified=None,
+        )
+
+    def work(session: orm.Session) -> None:
         _ = session.execute(
-            sa.update(User).where(User.user_id == userId).values(**new_data)
+            sa.update(User).where(User.user_id == userId).values(**values)
         )
-        session.commit()
+        versions.bump(session, None, "users")
+
+    def after_commit(_) -> None:
+        user_index.invalidate()
+        event_hub.publish("users", {"userId": userId, "action": "updated"})
+
+    await writer.write(work, after_commit)
 
 
-def delete_user(userId: UserID):
-    with Session() as session:
+async def delete_user(userId: UserID):
+    def work(session: orm.Session) -> None:
         _ = session.execute(sa.delete(User).where(User.user_id == userId))
-        session.commit()
-
-
-@contextmanager
-def get_and_set_rss_timestamp(userId: UserID):
-    with Session() as session:
-        last_checked = session.execute(
-            sa.select(User.last_letterboxd_check).where(User.user_id == userId)
-        ).scalar()
-        last_checked = (
-            pd.Timestamp(
-                last_checked, tz="UTC") if last_checked else pd.Timestamp.min
-        )
-        new_time = pd.Timestamp.now(tz="UTC")
-        try:
-            yield last_checked
-        except Exception as e:
-            logging.error(
-                f"Error while checking rss, last_checked_time not updated: {e}"
-            )
-            raise e
-        else:
-            _ = session.execute(
-                sa.update(User)
-                .where(User.user_id == userId)
-                  .values(last_letterboxd_check=new_time)
-            )
-            session.commit()
+        versions.bump(session, None, "users")
+
+    def after_commit(_) -> None:
+        user_index.remove(userId)
+        user_stats.forget_user(userId)
+        event_hub.publish("users", {"userId": userId, "action": "removed"})
+
+    await writer.write(work, after_commit)
 
 
-# Deletes existing entry if it exists
-# returns True if the entry already existed, False if it didn't
-def add_watchlist_entry(
+async def record_rss_checks(checks: list[dict[str, Any]]) -> None:
+    """
+    Saves what the RSS sync learned about each feed, in one write.
+    Each check has user_id plus any of last_letterboxd_check, rss_etag,
+    rss_last_modified and rss_index_key.
+    """
+    if not checks:
+        return
+
+    def work(session: orm.Session) -> None:
+        # * A list of parameter sets makes this an update by primary key, per row
+        _ = session.execute(sa.update(User), checks)
+
+    await writer.write(work)
+
+
+async def add_watchlist_entry(
     year: int, userId: UserID, movieId: MovieID, status: WatchStatus
-):
-    with Session() as session:
-        if status == WatchStatus.BLANK:
+) -> WatchlistOutcome:
+    return (await set_watchlist_entries(year, userId, [(movieId, status)]))[movieId]
+
+
+async def set_watchlist_entries(
+    year: int, userId: UserID, entries: Iterable[tuple[MovieID, WatchStatus]]
+) -> dict[MovieID, WatchlistOutcome]:
+    """
+    Sets the status of many movies on a user's watchlist in one transaction.
+    BLANK removes the entry. If a movie is listed twice, the last status wins.
+    Movies that aren't in the database are skipped.
+    Returns what happened to each movie.
+    """
+    wanted = dict(entries)
+    if not wanted:
+        return {}
+    # * Filled in by work() for the live-update event
+    changed_years: set[int] = set()
+    changes: list[tuple[int, UserID, MovieID, WatchStatus | None]] = []
+    cursor: int | None = None
+
+    def work(session: orm.Session) -> dict[MovieID, WatchlistOutcome]:
+        nonlocal cursor
+        outcomes: dict[MovieID, WatchlistOutcome] = {}
+        known = set(
+            session.execute(
+                sa.select(Movie.movie_id).where(Movie.movie_id.in_(wanted))
+            ).scalars()
+        )
+        # * The watchlist is keyed on (user, movie), so look at every year
+        existing = {
+            movie_id: (entry_year, status)
+            for movie_id, entry_year, status in session.execute(
+                sa.select(Watchnotice.movie_id, Watchnotice.year, Watchnotice.status)
+                .where(Watchnotice.user_id == userId)
+                .where(Watchnotice.movie_id.in_(wanted))
+            ).tuples()
+        }
+        upserts: list[dict[str, Any]] = []
+        deletes: list[MovieID] = []
+        # * Re-marking a movie can move its entry over from another year
+        changed_years.clear()
+        changes.clear()
+        for movie_id, status in wanted.items():
+            old = existing.get(movie_id)
+            if movie_id not in known:
+                outcomes[movie_id] = "unknown_movie"
+            elif status == WatchStatus.BLANK:
+                if old is not None and old[0] == year:
+                    deletes.append(movie_id)
+                    changes.append((year, userId, movie_id, None))
+                    outcomes[movie_id] = "removed"
+                else:
+                    outcomes[movie_id] = "unchanged"
+            elif old == (year, status):
+                outcomes[movie_id] = "unchanged"
+            else:
+                upserts.append(
+                    {"year": year, "user_id": userId, "movie_id": movie_id, "status": status}
+                )
+                outcomes[movie_id] = "added" if old is None else "updated"
+                if old is not None and old[0] != year:
+                    changed_years.add(old[0])
+                    changes.append((old[0], userId, movie_id, None))
+                changes.append((year, userId, movie_id, status))
+        if upserts:
+            # * A list of parameter sets makes this one executemany
+            _ = session.execute(
+                sa.insert(Watchnotice).prefix_with("OR REPLACE"), upserts
+            )
+        if deletes:
             _ = session.execute(
                 sa.delete(Watchnotice)
                 .where(Watchnotice.year == year)
-                  .where(Watchnotice.user_id == userId)
-                  .where(Watchnotice.movie_id == movieId)
+                .where(Watchnotice.user_id == userId)
+                .where(Watchnotice.movie_id.in_(deletes))
             )
-            session.commit()
-        else:
-            # # * Delete any existing entry
-            # session.execute(
-            #     sa.delete(Watchnotice)
-            #     .where(Watchnotice.year == year)
-            #     .where(Watchnotice.user_id == userId)
-            #     .where(Watchnotice.movie_id == movieId)
-            # )
-            # * Add new entry
-            logging.debug(
-                f"Adding watchlist entry for {userId} in {year} for {movieId} with status {status}"
+        if upserts or deletes:
+            changed_years.add(year)
+            for changed_year in changed_years:
+                versions.bump(session, changed_year, "watchlist")
+            cursor = watchlist_changes.record(session, changes)
+        return outcomes
+
+    def after_commit(outcomes: dict[MovieID, WatchlistOutcome]) -> None:
+        logging.debug(f"Watchlist update for {userId} in {year}: {outcomes}")
+        # * A moved entry is a removal from its old year as well as an addition to this one
+        by_year: dict[int, list[tuple[MovieID, WatchStatus]]] = {}
+        for change_year, _, movie_id, status in changes:
+            by_year.setdefault(change_year, []).append(
+                (movie_id, status if status is not None else WatchStatus.BLANK)
             )
-            mutation = (
-                sa.insert(Watchnotice)
-                .prefix_with("OR REPLACE")
-                .values(
-                    year=year,
-                    user_id=userId,
-                    movie_id=movieId,
-                    status=status,
-                )
+        for change_year, year_changes in by_year.items():
+            user_stats.record_watches(change_year, userId, year_changes)
+        if cursor is not None:
+            event_hub.publish(
+                "watchlist",
+                {"years": sorted(changed_years), "userId": userId, "cursor": cursor},
             )
-            logging.debug(f"Mutation: {mutation}")
-            _ = session.execute(mutation)
-            session.commit()
+
+    return await writer.write(work, after_commit)
+
+
+def refresh_movie_flags(session: orm.Session, movie_ids: Iterable[MovieID]) -> None:
+    """
+    Recomputes the denormalized is_short / is_multinom / num_noms columns on movies.
+    Call it inside the same transaction as any change to the nominations table.
+    """
+    num_noms = (
+        sa.select(sa.func.count())
+        .where(Nomination.movie_id == Movie.movie_id)
+        .correlate(Movie)
+        .scalar_subquery()
+    )
+    is_short = (
+        sa.select(sa.func.max(Category.is_short))
+        .where(Nomination.movie_id == Movie.movie_id)
+        .where(Nomination.category_id == Category.category_id)
+        .correlate(Movie)
+        .scalar_subquery()
+    )
+    _ = session.execute(
+        sa.update(Movie)
+        .where(Movie.movie_id.in_(list(movie_ids)))
+        .values(
+            stored_num_noms=num_noms,
+            stored_is_multinom=num_noms > 1,
+            stored_is_short=is_short,
+        )
+        .execution_options(synchronize_session=False)
+    )
 
 
-def add_nomination(year, nomination: Nom):
+async def add_nomination(year, nomination: Nom):
     movie = nomination[NomColumns.MOVIE.value]
     category = nomination[NomColumns.CATEGORY.value]
     note = (
@@ -128,20 +252,27 @@ def add_nomination(year, nomination: Nom):
         if NomColumns.NOTE.value in nomination
         else None
     )
-    with Session() as session:
+    def work(session: orm.Session) -> None:
         _ = session.execute(
             sa.insert(Nomination)
             .prefix_with("OR REPLACE")
             .values(year=year, movie_id=movie, category_id=category, note=note)
         )
-        session.commit()
+        refresh_movie_flags(session, [movie])
+        versions.bump(session, year, "nominations", "movies")
+
+    def after_commit(_) -> None:
+        reference_cache.invalidate(year)
+        user_stats.refresh_movies(year, [movie])
+
+    await writer.write(work, after_commit)
 
 
 # `movie` is usually the id of the movie to update
 # If try_title_lookup, then `movie` is interpreted as the title of the movie
 # 		In that case, the id of the movie is returned (whether it was found or created)
 # `new_data` is a dictionary of new data to add or update
-def update_movie(
+async def update_movie(
     movie: MovieID,
     year: int,
     new_data: dict[str, Any] = {},
@@ -156,18 +287,29 @@ def update_movie(
     assert all(
         key in Movie.__table__.columns.keys() for key in new_data
     ), f"Invalid movie column(s): {[k for k in new_data if k not in Movie.__table__.columns.keys()]}"
-    with Session() as session:
+    def after_commit(_) -> None:
+        reference_cache.invalidate(year)
+        if "runtime" in new_data:
+            user_stats.refresh_movies(year, [movieId])
+
+    def work(session: orm.Session) -> None:
         _ = session.execute(
             sa.update(Movie).where(Movie.movie_id ==
                                    movieId).values(**new_data)
         )
-        session.commit()
+        versions.bump(session, year, "movies")
+
+    await writer.write(work, after_commit)
 
 
-def add_movie(year: int, title: str) -> MovieID:
-    id = create_unique_movie_id(year=year)
-    with Session() as session:
+async def add_movie(year: int, title: str) -> MovieID:
+    def work(session: orm.Session) -> MovieID:
+        id = create_unique_movie_id(year, session)
         _ = session.execute(sa.insert(Movie).values(
             year=year, movie_id=id, title=title))
-        session.commit()
-    return id
+        versions.bump(session, year, "movies")
+        return id
+
+    return await writer.write(
+        work, after_commit=lambda _: reference_cache.invalidate(year)
+    )
@@ -0,0 +1,201 @@
+"""
+Letterboxd profile pictures, cached on the users table.
+
+Letterboxd has no API for avatars, so getting one means fetching the user's
+profile page and pulling the <img> out of it. That used to happen on every
+/users/my_data and /users/profile request. Now the URL lives in users.propic
+and is served straight from there, however old it is. Anything older than
+PROPIC_TTL_HOURS gets refreshed in the background: by the scheduled job,
+or (for one user) when it's read.
+
+A failed fetch keeps the old picture and is retried after RETRY_AFTER rather
+than a whole TTL later.
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+import httpx
+import sqlalchemy as sa
+import sqlalchemy.orm as orm
+from bs4 import BeautifulSoup, Tag
+
+import backend.data.versions as versions
+import backend.utils.env_reader as env
+from backend.access_external.http_clients import http_clients
+from backend.data.db_connections import Session, run_db
+from backend.data.db_schema import User
+from backend.data.event_hub import event_hub
+from backend.data.writer import writer
+from backend.types.api_schemas import UserID
+
+TTL = timedelta(hours=env.PROPIC_TTL_HOURS)
+RETRY_AFTER = timedelta(minutes=10)
+
+# * Users with a refresh running, so a burst of reads starts only one
+_in_flight: set[UserID] = set()
+# * The event loop only keeps weak references to tasks
+_background: set[asyncio.Task[int]] = set()
+
+
+class _FetchFailed(Exception):
+    pass
+
+
+def is_stale(checked_at: datetime | None, now: datetime | None = None) -> bool:
+    return checked_at is None or checked_at < (now or datetime.now()) - TTL
+
+
+async def fetch_propic(client: httpx.AsyncClient, letterboxd_username: str) -> str | None:
+    """
+    The avatar URL from the user's Letterboxd profile page, or None if they
+    don't have one (or the account is gone). Raises _FetchFailed if we
+    couldn't tell.
+    """
+    url = f"/{letterboxd_username}/"
+    try:
+        response = await client.get(url)
+        if response.status_code == 404:
+            return None
+        _ = response.raise_for_status()
+    except httpx.HTTPError as e:
+        raise _FetchFailed(f"{url}: {e}") from e
+    soup = BeautifulSoup(response.text, "html.parser")
+    avatar = soup.find("div", class_="profile-avatar")
+    avatar = avatar.find("img") if avatar else None
+    if isinstance(avatar, Tag) and "src" in avatar.attrs:
+        return str(avatar.attrs["src"])
+    return None
+
+
+def _load_due(user_ids: list[UserID] | None) -> list[tuple[UserID, str | None]]:
+    """(user, letterboxd) for every user whose picture is stale."""
+    query = sa.select(User.user_id, User.letterboxd, User.propic_checked_at)
+    if user_ids is not None:
+        query = query.where(User.user_id.in_(user_ids))
+    with Session() as session:
+        rows = session.execute(query).tuples().all()
+    now = datetime.now()
+    return [
+        (user_id, letterboxd)
+        for user_id, letterboxd, checked_at in rows
+        if is_stale(checked_at, now)
+    ]
+
+
+async def refresh(user_ids: Iterable[UserID] | None = None) -> int:
+    """
+    Re-fetches the stale pictures (of `user_ids`, or of everyone), at most
+    PROPIC_REFRESH_CONCURRENCY at a time, and saves them in one write.
+    Returns how many pictures changed.
+    """
+    if user_ids is None:
+        return await _refresh(None, set())
+    claimed = _claim(user_ids)
+    return await _refresh(list(claimed), claimed) if claimed else 0
+
+
+def refresh_in_background(user_ids: Iterable[UserID]) -> None:
+    """For read paths: starts a refresh and returns right away."""
+    claimed = _claim(user_ids)
+    if not claimed:
+        return
+    task = asyncio.get_running_loop().create_task(_refresh(list(claimed), claimed))
+    _background.add(task)
+    task.add_done_callback(_background_done)
+
+
+def _background_done(task: asyncio.Task[int]) -> None:
+    _background.discard(task)
+    if not task.cancelled() and (e := task.exception()) is not None:
+        logging.error(f"Background propic refresh failed: {e}")
+
+
+def _claim(user_ids: Iterable[UserID]) -> set[UserID]:
+    """Marks the users as in flight, leaving out any that already were."""
+    claimed = set(user_ids) - _in_flight
+    _in_flight.update(claimed)
+    return claimed
+
+
+async def _refresh(wanted: list[UserID] | None, claimed: set[UserID]) -> int:
+    try:
+        due = [
+            (user_id, letterboxd)
+            for user_id, letterboxd in await run_db(_load_due, wanted)
+            if user_id in claimed or user_id not in _in_flight
+        ]
+        claimed.update(user_id for user_id, _ in due)
+        _in_flight.update(claimed)
+        if not due:
+            return 0
+        limit = asyncio.Semaphore(max(1, env.PROPIC_REFRESH_CONCURRENCY))
+        results: dict[UserID, str | None] = {}
+        failed: list[UserID] = []
+
+        client = http_clients.get("letterboxd")
+
+        async def one(user_id: UserID, letterboxd: str | None) -> None:
+            if not letterboxd:
+                results[user_id] = None
+                return
+            async with limit:
+                try:
+                    results[user_id] = await fetch_propic(client, letterboxd)
+                except _FetchFailed as e:
+                    logging.warning(f"Couldn't refresh the propic for {user_id}: {e}")
+                    failed.append(user_id)
+
+        _ = await asyncio.gather(*(one(user_id, letterboxd) for user_id, letterboxd in due))
+
+        changed = await writer.write(
+            lambda session: _save(session, results, failed),
+            after_commit=_publish,
+        )
+    finally:
+        _in_flight.difference_update(claimed)
+    logging.debug(
+        f"Refreshed {len(results)} propics ({len(changed)} changed, {len(failed)} failed)"
+    )
+    return len(changed)
+
+
+def _save(
+    session: orm.Session, results: dict[UserID, str | None], failed: list[UserID]
+) -> list[UserID]:
+    now = datetime.now()
+    current = dict(
+        session.execute(
+            sa.select(User.user_id, User.propic)
+            .where(User.user_id.in_(list(results)))
+        ).tuples().all()
+    )
+    changed = [
+        user_id for user_id, propic in results.items()
+        if user_id in current and current[user_id] != propic
+    ]
+    updates = [
+        {"user_id": user_id, "propic": propic, "propic_checked_at": now}
+        for user_id, propic in results.items()
+        if user_id in current
+    ]
+    if updates:
+        # * A list of parameter sets makes this an update by primary key, per row
+        _ = session.execute(sa.update(User), updates)
+    if failed:
+        # * Keep the old picture, and look again in RETRY_AFTER instead of a whole TTL
+        _ = session.execute(
+            sa.update(User)
+            .where(User.user_id.in_(failed))
+            .values(propic_checked_at=now - TTL + RETRY_AFTER)
+        )
+    if changed:
+        versions.bump(session, None, "users")
+    return changed
+
+
+def _publish(changed: list[UserID]) -> None:
+    for user_id in changed:
+        event_hub.publish("users", {"userId": user_id, "action": "updated"})
@@ -1,16 +1,18 @@
 import logging
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 from datetime import datetime
-from typing import Any, cast
+from typing import Any
 
-import httpx
 import sqlalchemy as sa
-from bs4 import BeautifulSoup, Tag
 from sqlalchemy.orm import selectinload
 from typing_extensions import Literal
 
+import backend.data.completion as completion
 import backend.data.derived_values as dv
-from backend.data.db_connections import Session
+import backend.data.propics as propics
+import backend.data.watchlist_changes as watchlist_changes
+from backend.data.cache import reference_cache
+from backend.data.db_connections import Session, run_db
 from backend.data.db_schema import (
     Category,
     KeyDates,
@@ -19,9 +21,18 @@ from backend.data.db_schema import (
     User,
     Watchnotice,
 )
+from backend.data.user_stats import user_stats
 from backend.data.utils import result_to_dict
-from backend.types.api_schemas import CategoryCompletionKey, MovieID, UserID, countTypes
-from backend.types.my_types import Grouping, WatchStatus
+from backend.types.api_schemas import (
+    CategoryCompletionKey,
+    MovieID,
+    UserID,
+    api_Movie,
+    api_NextKeyDate,
+    api_User,
+    countTypes,
+)
+from backend.types.my_types import MovieDbID, WatchStatus
 
 
 def get_number_of_movies(year: int, shortsIsOne: bool = False) -> int:
@@ -70,6 +81,39 @@ def get_movies(year: int, idList: list[MovieID] | None = None) -> list[Movie]:
         return movies
 
 
+def get_tmdb_index(year: int) -> dict[MovieDbID, MovieID]:
+    """
+    TMDB ID -> movie_id, for the year's movies that have a TMDB ID.
+    Served from the reference cache; don't mutate the result.
+    """
+    def load() -> dict[MovieDbID, MovieID]:
+        with Session() as session:
+            rows = session.execute(
+                sa.select(Movie.movie_db_id, Movie.movie_id)
+                .where(Movie.year == year, Movie.movie_db_id.isnot(None))
+            ).tuples()
+            index: dict[MovieDbID, MovieID] = {}
+            for movie_db_id, movie_id in rows:
+                if movie_db_id is None or not movie_db_id.isdigit():
+                    # * Hand-edited, most likely; one bad row shouldn't break every RSS sync
+                    logging.warning(f"Skipping {movie_id}'s TMDB ID {movie_db_id!r}: not a number")
+                    continue
+                index[int(movie_db_id)] = movie_id
+            return index
+
+    return reference_cache.get_or_compute("tmdb_index", year, load)
+
+
+def get_movie_models(year: int) -> list[api_Movie]:
+    """
+    Same movies as get_movies(year), already validated into API models.
+    Served from the reference cache; don't mutate the result.
+    """
+    return reference_cache.get_or_compute(
+        "movies", year, lambda: [api_Movie.model_validate(m) for m in get_movies(year)]
+    )
+
+
 def get_users(idList: list[UserID] | None = None) -> list[dict[str, Any]]:
     query = sa.select(User.user_id.label(
         "id"), User.username).select_from(User)
@@ -86,11 +130,16 @@ async def get_my_user_data(userId: UserID) -> dict[str, Any]:
         User.username,
         User.letterboxd,
         User.email,
+        User.propic,
+        User.propic_checked_at,
     ).select_from(User)
     query = query.where(User.user_id == userId)
-    with Session() as session:
-        result = session.execute(query)
-        data = result_to_dict(result)
+
+    def load() -> list[dict[str, Any]]:
+        with Session() as session:
+            return result_to_dict(session.execute(query))
+
+    data = await run_db(load)
     if data is None or len(data) == 0:
         logging.error(
             f"User with id {userId} not found @ qu.get_my_user_data({userId})"
@@ -99,59 +148,50 @@ async def get_my_user_data(userId: UserID) -> dict[str, Any]:
             f"User with id {userId} not found @ qu.get_my_user_data({userId})"
         )
     data = data[0]
-    data["propic"] = await get_user_propic(data["letterboxd"])
+    # * Served as stored, however old; a stale one is refreshed for next time
+    if propics.is_stale(data.pop("propic_checked_at")):
+        propics.refresh_in_background([userId])
     return data
 
 
 async def get_user_profile(userId: UserID) -> dict[str, Any]:
     """Get public profile data for any user, including profile picture."""
-    query = sa.select(
-        User.user_id.label("id"),
-        User.username,
-        User.letterboxd,
-    ).select_from(User)
-    query = query.where(User.user_id == userId)
-    with Session() as session:
-        result = session.execute(query)
-        data = result_to_dict(result)
-    if data is None or len(data) == 0:
+    profiles = await get_user_profiles([userId])
+    if not profiles:
         logging.error(
             f"User with id {userId} not found @ qu.get_user_profile({userId})"
         )
         raise Exception(
             f"User with id {userId} not found @ qu.get_user_profile({userId})"
         )
-    data = data[0]
-    letterboxd = data.pop("letterboxd")  # Don't expose letterboxd username
-    data["propic"] = await get_user_propic(letterboxd)
-    return data
+    return profiles[0]
 
 
-async def get_user_propic(letterboxd_username: str | None) -> str | None:
-    if letterboxd_username is None:
-        return None
-    try:
-        # Get the user's letterboxd profile page
-        url = f"https://letterboxd.com/{letterboxd_username}/"
-        async with httpx.AsyncClient() as client:
-            response = (await client.get(url)).raise_for_status()
-        # Parse the HTML
-        soup = BeautifulSoup(response.text, "html.parser")
-        # Find the avatar image
-        avatar = soup.find("div", class_="profile-avatar")
-        avatar = avatar.find("img") if avatar else None
-        if (
-            avatar
-            and isinstance(avatar, Tag)
-            and hasattr(avatar, "attrs")
-            and "src" in avatar.attrs
-        ):
-            return avatar.attrs["src"]
-        return None
-    except (httpx.HTTPStatusError, AttributeError) as e:
-        logging.error(
-            f"Error getting user propic for {letterboxd_username}", e)
-        return None
+async def get_user_profiles(idList: list[UserID] | None = None) -> list[dict[str, Any]]:
+    """
+    Public profile data (id, username, propic) for the given users, or all of
+    them. Pictures come from the users table; stale ones are refreshed in the
+    background (see backend.data.propics).
+    """
+    query = sa.select(
+        User.user_id, User.username, User.propic, User.propic_checked_at
+    ).select_from(User)
+    if idList is not None:
+        query = query.where(User.user_id.in_(idList))
+
+    def load() -> list[tuple[UserID, str, str | None, datetime | None]]:
+        with Session() as session:
+            return list(session.execute(query).tuples())
+
+    rows = await run_db(load)
+    now = datetime.now()
+    stale = [user_id for user_id, _, _, checked_at in rows if propics.is_stale(checked_at, now)]
+    if stale:
+        propics.refresh_in_background(stale)
+    return [
+        {"id": user_id, "username": username, "propic": propic}
+        for user_id, username, propic, _ in rows
+    ]
 
 
 def get_category_completion_dict(
@@ -162,155 +202,20 @@ def get_category_completion_dict(
     Returns a dict with keys as UserIDs and values as
             dicts with mapping category names + etc to ints
             representing the number of movies seen in that 'category'
+    The counting itself happens in backend.data.completion.
     """
-    all_groupings = [g.value for g in Grouping]
-
-    with Session() as session:
-        result = session.execute(sa.select(Category.category_id).where(sa.exists(
-            sa.select(Nomination.nomination_id)
-            .where(Nomination.category_id == Category.category_id)
-            .where(Nomination.year == year)
-        ))).scalars().all()
-    all_categories = [c for c in result]
-
-    seen_watchlist = (
-        sa.select(User.user_id.label("user_id"),
-                  Watchnotice.movie_id.label("movie_id"))
-        .select_from(User)
-        .outerjoin(
-            Watchnotice,
-            sa.and_(
-                User.user_id == Watchnotice.user_id,
-                Watchnotice.year == year,
-                Watchnotice.status == WatchStatus.SEEN,
-            ),
-        )
-        .subquery()
-    )
-    todo_watchlist = (
-        sa.select(User.user_id.label("user_id"),
-                  Watchnotice.movie_id.label("movie_id"))
-        .select_from(User)
-        .outerjoin(
-            Watchnotice,
-            sa.and_(
-                User.user_id == Watchnotice.user_id,
-                Watchnotice.year == year,
-                Watchnotice.status == WatchStatus.TODO,
-            ),
-        )
-        .subquery()
-    )
-    all_movies = (
-        sa.select(User.user_id.label("user_id"),
-                  Movie.movie_id.label("movie_id"))
-        .select_from(User)
-        .join(Movie, sa.true())  # * Cartesian product
-        .where(Movie.year == year)
-        .subquery()
-    )
-
-    relevant_movie_data = (
-        sa.select(
-            Nomination.movie_id.label("movie_id"),
-            Nomination.category_id.label("category_id"),
-            Category.grouping.label("grouping"),
-        )
-        .select_from(Nomination)
-        .outerjoin(Category)
-        .where(Nomination.year == year)
-        # .group_by(Nomination.movie_id)
-        .subquery()
-    )
-
-    def query(status: countTypes):
-        start = {
-            "seen": seen_watchlist,
-            "todo": todo_watchlist,
-            "total": all_movies,
-        }[status]
-        return (
-            sa.select(
-                start.c.user_id.label("id"),
-                *[
-                    sa.func.count(sa.func.distinct(start.c.movie_id))
-                    .filter(relevant_movie_data.c.category_id == cat)
-                    .label(str(cat))
-                    for cat in all_categories
-                ],
-                *[
-                    sa.func.count(sa.func.distinct(start.c.movie_id))
-                    .filter(relevant_movie_data.c.grouping == grp)
-                    .label(str(grp))
-                    for grp in all_groupings
-                ],
-            )
-            .select_from(start)
-            .outerjoin(
-                relevant_movie_data, start.c.movie_id == relevant_movie_data.c.movie_id
-            )
-            .group_by(start.c.user_id)
-        )
-
-    with Session() as session:
-        seen_result = session.execute(query("seen"))
-        todo_result = session.execute(query("todo"))
-        total_result = session.execute(query("total"))
-        seen_data = result_to_dict(seen_result)
-        todo_data = result_to_dict(todo_result)
-        total_data = result_to_dict(total_result)
-
-        # seen_intermediate = session.execute(seen_watchlist.select())
-        # todo_intermediate = session.execute(todo_watchlist.select())
-        # total_intermediate = session.execute(all_movies.select())
-        # relevant_movie_data_intermediate = session.execute(relevant_movie_data.select())
-    return format_category_completion_dict(seen_data, todo_data, total_data)
-    # return seen_data, todo_data, total_data
-
-
-type _CategoryCompletionDict = dict[CategoryCompletionKey | Literal["id"], int]
+    return completion.get_category_completion_dict(year)
 
 
-def format_category_completion_dict(
-    seen_data: list[_CategoryCompletionDict],
-    todo_data: list[_CategoryCompletionDict],
-    total_data: list[_CategoryCompletionDict],
-) -> dict[UserID, dict[CategoryCompletionKey, dict[countTypes, int]]]:
-    result: dict[UserID, dict[countTypes,
-                              dict[CategoryCompletionKey, int]]] = {}
-    for row in seen_data:
-        user_id = cast(UserID, row.pop("id"))
-        result[user_id] = {"seen": row}
-    for row in todo_data:
-        user_id = cast(UserID, row.pop("id"))
-        if user_id not in result:
-            result[user_id] = {}
-        result[user_id]["todo"] = row
-    for row in total_data:
-        user_id = cast(UserID, row.pop("id"))
-        if user_id not in result:
-            result[user_id] = {}
-        result[user_id]["total"] = row
-    output: dict[UserID, dict[CategoryCompletionKey,
-                              dict[countTypes, int]]] = {}
-    for user_id in result:
-        # Use "total" as the key source since it's always present (Cartesian product)
-        # "seen" and "todo" may be missing for new users with no watch data
-        total_keys = result[user_id].get("total", {})
-        seen_keys = result[user_id].get("seen", {})
-        todo_keys = result[user_id].get("todo", {})
-        output[user_id] = {
-            key: {
-                "seen": seen_keys.get(key, 0),
-                "todo": todo_keys.get(key, 0),
-                "total": total_keys.get(key, 0),
-            }
-            for key in total_keys
-        }
-    return output
+def get_user_stats(year: int) -> list[dict[str, Any]]:
+    """
+    Per-user stats for the 'by user' view (see compute_user_stats for the columns).
+    Served from the incrementally maintained store in backend.data.user_stats.
+    """
+    return user_stats.get(year)
 
 
-def get_user_stats(year: int) -> list[dict[str, Any]]:
+def compute_user_stats(year: int) -> list[dict[str, Any]]:
     """
     finds the total number of movies seen and todo by a user
     If the movie list has complete runtime data,
@@ -373,63 +278,160 @@ def get_user_stats(year: int) -> list[dict[str, Any]]:
 
 
 def get_noms(year: int) -> list[dict[str, Any]]:
-    with Session() as session:
-        result = session.execute(
-            sa.select(
-                Nomination.movie_id.label("movieId"),
-                Nomination.category_id.label("categoryId"),
-                Nomination.note.label("note"),
-            ).where(Nomination.year == year)
-        )
-        return result_to_dict(result)
+    """Served from the reference cache; don't mutate the result."""
+    def load() -> list[dict[str, Any]]:
+        with Session() as session:
+            result = session.execute(
+                sa.select(
+                    Nomination.movie_id.label("movieId"),
+                    Nomination.category_id.label("categoryId"),
+                    Nomination.note.label("note"),
+                ).where(Nomination.year == year)
+            )
+            return result_to_dict(result)
+
+    return reference_cache.get_or_compute("nominations", year, load)
+
+
+WATCHLIST_COLUMNS = ("userId", "movieId", "status")
+
+
+def _watchlist_query(year: int):
+    return sa.select(
+        Watchnotice.user_id.label("userId"),
+        Watchnotice.movie_id.label("movieId"),
+        Watchnotice.status.label("status"),
+    ).where(Watchnotice.year == year)
 
 
 def get_watchlist(year: int) -> list[dict[str, Any]]:
     with Session() as session:
-        result = session.execute(
-            sa.select(
-                Watchnotice.user_id.label("userId"),
-                Watchnotice.movie_id.label("movieId"),
-                Watchnotice.status.label("status"),
-            ).where(Watchnotice.year == year)
-        )
+        result = session.execute(_watchlist_query(year))
         return result_to_dict(result)
 
 
-def get_categories(year: int) -> list[dict[str, Any]]:
+def get_watchlist_rows(year: int) -> list[tuple[UserID, MovieID, WatchStatus]]:
+    """Same as get_watchlist, as plain tuples in WATCHLIST_COLUMNS order (no dict per row)."""
     with Session() as session:
-        result = session.execute(
-            sa.select(
-                Category.category_id.label("id"),
-                Category.short_name.label("shortName"),
-                Category.full_name.label("fullName"),
-                Category.max_nominations.label("maxNoms"),
-                Category.is_short.label("isShort"),
-                Category.has_note.label("hasNote"),
-                Category.grouping.label("grouping"),
-            ).where(
-                sa.exists(
-                    sa.select(Nomination.nomination_id)
-                    .where(Nomination.category_id == Category.category_id)
-                    .where(Nomination.year == year)
+        return list(session.execute(_watchlist_query(year)).tuples())
+
+
+def get_categories(year: int) -> list[dict[str, Any]]:
+    """Served from the reference cache; don't mutate the result."""
+    def load() -> list[dict[str, Any]]:
+        with Session() as session:
+            result = session.execute(
+                sa.select(
+                    Category.category_id.label("id"),
+                    Category.short_name.label("shortName"),
+                    Category.full_name.label("fullName"),
+                    Category.max_nominations.label("maxNoms"),
+                    Category.is_short.label("isShort"),
+                    Category.has_note.label("hasNote"),
+                    Category.grouping.label("grouping"),
+                ).where(
+                    sa.exists(
+                        sa.select(Nomination.nomination_id)
+                        .where(Nomination.category_id == Category.category_id)
+                        .where(Nomination.year == year)
+                    )
                 )
             )
-        )
-        return result_to_dict(result)
+            return result_to_dict(result)
+
+    return reference_cache.get_or_compute("categories", year, load)
 
 
 def get_years() -> list[int]:
-    with Session() as session:
-        result = session.execute(
-            sa.select(Nomination.year).distinct()
-        )
-        return [year for year, in result]
+    """Served from the reference cache; don't mutate the result."""
+    def load() -> list[int]:
+        with Session() as session:
+            result = session.execute(
+                sa.select(Nomination.year).distinct()
+            )
+            return [year for year, in result]
+
+    return reference_cache.get_or_compute("years", None, load)
+
+
+def _key_dates_query():
+    return sa.select(KeyDates.timestamp, KeyDates.description).order_by(KeyDates.timestamp)
 
 
 def get_key_dates() -> Sequence[tuple[datetime, str]]:
     with Session() as session:
-        result = session.execute(
-            sa.select(KeyDates.timestamp, KeyDates.description)
-            .order_by(KeyDates.timestamp)
-        )
+        result = session.execute(_key_dates_query())
         return [tuple(row) for row in result.all()]
+
+
+def next_key_date(
+    key_dates: Iterable[tuple[datetime, str]],
+) -> api_NextKeyDate | None:
+    """The first key date that's still in the future, if any."""
+    now = datetime.now()
+    for date, description in sorted(key_dates, key=lambda x: x[0]):
+        if date > now:
+            return api_NextKeyDate(timestamp=date, description=description)
+    return None
+
+
+def get_bootstrap(year: int | None = None) -> dict[str, Any]:
+    """
+    Everything the first page load asks for, in one go: the same data as
+    /years/default, /movies, /nominations, /categories, /users, /watchlist,
+    /by_user, /by_category and /next_key_date, keyed by camelCase name, plus
+    the watchlist sync cursor (see backend.data.watchlist_changes).
+
+    The uncached reads share one read transaction (one snapshot), and the
+    watchlist and nomination incidence are loaded once and used for both
+    the watchlist and the by-category counts.
+    If `year` is None, the default year is used.
+    """
+    years = get_years()
+    default_year = max(years) if years else None
+    if year is None:
+        if default_year is None:
+            raise ValueError("There are no years to bootstrap")
+        year = default_year
+    movies = get_movie_models(year)
+    noms = get_noms(year)
+    categories = get_categories(year)
+    by_user = get_user_stats(year)
+
+    with Session() as session:
+        # * pysqlite doesn't BEGIN before a SELECT, so without this every
+        # * statement would see whatever was committed at that moment
+        _ = session.connection().exec_driver_sql("BEGIN")
+        users = session.execute(
+            sa.select(User.user_id, User.username)
+        ).tuples().all()
+        watchlist_cursor = watchlist_changes.latest_cursor(session)
+        watchlist = session.execute(_watchlist_query(year)).tuples().all()
+        incidence = completion.load_incidence(session, year)
+        key_dates = session.execute(_key_dates_query()).tuples().all()
+
+    by_category = completion.compute_category_completion(
+        incidence,
+        [user_id for user_id, _ in users],
+        completion.watchlist_masks(watchlist, incidence),
+    )
+    next_date = next_key_date(key_dates)
+    return {
+        "year": year,
+        "years": years,
+        "defaultYear": default_year,
+        "movies": [movie.model_dump(mode="json") for movie in movies],
+        "nominations": noms,
+        "categories": categories,
+        "users": [
+            api_User(id=user_id, username=username).model_dump(mode="json")
+            for user_id, username in users
+        ],
+        "watchlist": [
+            dict(zip(WATCHLIST_COLUMNS, row)) for row in watchlist
+        ],
+        "watchlistCursor": watchlist_cursor,
+        "byUser": by_user,
+        "byCategory": by_category,
+        "nextKeyDate": None if next_date is None else next_date.model_dump(mode="json"),
+    }
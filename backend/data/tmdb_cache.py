@@ -0,0 +1,211 @@
+"""
+Persistent cache for TMDB API responses (the movie details behind the
+/forward/tmdb routes).
+
+Responses are stored in the tmdb_responses table, split into parts: the
+response itself, plus one row per append_to_response section. Each part has
+its own TTL (see TTLS): credits hardly ever change, watch providers do.
+
+A part that's past its TTL is still served, and refreshed in the background
+(stale-while-revalidate), for up to TMDB_CACHE_MAX_STALE_DAYS. After that,
+or if it was never fetched, the request waits for TMDB. If TMDB is down,
+whatever we have is served, however old.
+
+Parts are spliced back together as bytes, so a hit never parses the JSON.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from typing import Any, Literal
+
+import orjson
+import sqlalchemy as sa
+import sqlalchemy.orm as orm
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import backend.utils.env_reader as env
+from backend.access_external.http_clients import http_clients
+from backend.data.db_connections import Session, run_db
+from backend.data.db_schema import TmdbResponse
+from backend.data.writer import writer
+
+type CacheCounter = Literal["hits", "stale", "misses", "refreshes", "errors", "served_on_error"]
+
+# * The response itself (part "")
+BASE_PART = ""
+
+# * How long each part counts as fresh; parts not listed use the base TTL
+TTLS: dict[str, timedelta] = {
+    BASE_PART: timedelta(days=7),
+    "credits": timedelta(days=30),
+    "watch/providers": timedelta(hours=12),
+}
+
+MAX_STALE = timedelta(days=env.TMDB_CACHE_MAX_STALE_DAYS)
+
+type _Stored = dict[str, tuple[bytes, datetime]]
+
+
+def _ttl(part: str) -> timedelta:
+    return TTLS.get(part, TTLS[BASE_PART])
+
+
+def _splice(stored: _Stored, append: Sequence[str]) -> bytes:
+    """The base JSON object with each appended part added under its name."""
+    body = stored[BASE_PART][0]
+    extra = b",".join(
+        orjson.dumps(part) + b":" + stored[part][0] for part in append
+    )
+    if not extra:
+        return body
+    head = body.rstrip()[:-1].rstrip()  # * Everything before the closing brace
+    separator = b"" if head.endswith(b"{") else b","
+    return head + separator + extra + b"}"
+
+
+class TmdbResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Counter[CacheCounter] = Counter()
+        # * Paths with a background refresh running
+        self._in_flight: set[str] = set()
+        # * The event loop only keeps weak references to tasks
+        self._background: set[asyncio.Task[None]] = set()
+
+    async def get(self, path: str, append: Sequence[str] = ()) -> bytes:
+        """
+        The JSON for GET {TMDB_API_BASE}{path}?append_to_response=<append>,
+        from the cache if it can be. Raises httpx errors only if TMDB fails
+        and there's nothing cached to fall back on.
+        """
+        parts = [BASE_PART, *append]
+        stored = await run_db(self._load, path, parts)
+        now = datetime.now()
+        stale = [
+            part for part in parts
+            if part in stored and stored[part][1] < now - _ttl(part)
+        ]
+        missing = [
+            part for part in parts
+            if part not in stored or stored[part][1] < now - _ttl(part) - MAX_STALE
+        ]
+        if missing:
+            self._count("misses")
+            try:
+                fetched = await self._fetch(path, sorted(set(missing) | set(stale)))
+            except Exception as e:
+                if all(part in stored for part in parts):
+                    self._count("served_on_error")
+                    logging.warning(f"TMDB failed for {path}, serving the cached copy: {e}")
+                    return _splice(stored, append)
+                self._count("errors")
+                raise
+            stored.update(fetched)
+        elif stale:
+            self._count("stale")
+            self._refresh_in_background(path, stale)
+        else:
+            self._count("hits")
+        return _splice(stored, append)
+
+    async def purge(self, path: str | None = None) -> int:
+        """Drops the cached parts of `path` (or everything). Returns how many rows went."""
+        def work(session: orm.Session) -> int:
+            stmt = sa.delete(TmdbResponse)
+            if path is not None:
+                stmt = stmt.where(TmdbResponse.path == path)
+            return session.execute(stmt).rowcount
+
+        deleted = await writer.write(work)
+        logging.info(f"Purged {deleted} cached TMDB responses for {path or 'every path'}")
+        return deleted
+
+    def stats(self) -> dict[str, Any]:
+        with Session() as session:
+            rows, paths = session.execute(
+                sa.select(
+                    sa.func.count(),
+                    sa.func.count(sa.distinct(TmdbResponse.path)),
+                )
+            ).one()
+        with self._lock:
+            counters = dict(self.counters)
+            in_flight = len(self._in_flight)
+        served = counters.get("hits", 0) + counters.get("stale", 0) + counters.get("misses", 0)
+        return {
+            **counters,
+            "hit_rate": (counters.get("hits", 0) + counters.get("stale", 0)) / (served or 1),
+            "refreshing": in_flight,
+            "paths": paths,
+            "rows": rows,
+            "ttls": {part or "(response)": str(ttl) for part, ttl in TTLS.items()},
+            "max_stale": str(MAX_STALE),
+        }
+
+    def _count(self, counter: CacheCounter) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _load(self, path: str, parts: list[str]) -> _Stored:
+        with Session() as session:
+            rows = session.execute(
+                sa.select(TmdbResponse.part, TmdbResponse.body, TmdbResponse.fetched_at)
+                .where(TmdbResponse.path == path)
+                .where(TmdbResponse.part.in_(parts))
+            ).tuples().all()
+        return {part: (body, fetched_at) for part, body, fetched_at in rows}
+
+    async def _fetch(self, path: str, parts: list[str]) -> _Stored:
+        """Fetches `parts` from TMDB (the base always comes along) and stores them."""
+        append = [part for part in parts if part != BASE_PART]
+        params = {"append_to_response": ",".join(append)} if append else None
+        response = await http_clients.get("tmdb").get(path, params=params)
+        _ = response.raise_for_status()
+        data = response.json()
+        fetched_at = datetime.now()
+        fetched: _Stored = {
+            part: (orjson.dumps(data.pop(part, None)), fetched_at) for part in append
+        }
+        fetched[BASE_PART] = (orjson.dumps(data), fetched_at)
+        _ = await writer.write(lambda session: _save(session, path, fetched))
+        return fetched
+
+    def _refresh_in_background(self, path: str, parts: list[str]) -> None:
+        with self._lock:
+            if path in self._in_flight:
+                return
+            self._in_flight.add(path)
+        task = asyncio.get_running_loop().create_task(self._refresh(path, parts))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh(self, path: str, parts: list[str]) -> None:
+        try:
+            _ = await self._fetch(path, parts)
+            self._count("refreshes")
+        except Exception as e:
+            self._count("errors")
+            logging.warning(f"Couldn't refresh the cached TMDB response for {path}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(path)
+
+
+def _save(session: orm.Session, path: str, fetched: _Stored) -> None:
+    stmt = sqlite_insert(TmdbResponse).values([
+        {"path": path, "part": part, "body": body, "fetched_at": fetched_at}
+        for part, (body, fetched_at) in fetched.items()
+    ])
+    _ = session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["path", "part"],
+            set_={"body": stmt.excluded.body, "fetched_at": stmt.excluded.fetched_at},
+        )
+    )
+
+
+tmdb_cache = TmdbResponseCache()
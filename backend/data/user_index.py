@@ -0,0 +1,105 @@
+import logging
+import threading
+from collections import Counter
+from typing import Any, Literal
+
+import sqlalchemy as sa
+
+from backend.data.db_connections import Session
+from backend.data.db_schema import User
+from backend.types.api_schemas import UserID
+
+type UserIndexEvent = Literal["hits", "loads", "probes", "rejections"]
+
+
+class UserIndex:
+    """
+    In-process set of every user ID, for the "does the active user exist"
+    check that runs on every request with an ActiveUserID.
+
+    The set is loaded once (one query) and kept in step by the user mutations,
+    which call add() / remove() / invalidate() after they commit. An ID that
+    isn't in the set gets one primary key lookup before we say no, so a user
+    created behind the app's back (a script, another process) still works.
+
+    Counters (see stats()):
+        hits        answered from memory
+        loads       full reloads of the set
+        probes      single-row lookups for IDs the set didn't have
+        rejections  IDs that really don't exist
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: set[UserID] | None = None
+        # * Bumped on every change, so a load that raced with a write doesn't
+        # * store its (possibly stale) set
+        self._generation = 0
+        self.counters: Counter[UserIndexEvent] = Counter()
+
+    def exists(self, user_id: UserID) -> bool:
+        with self._lock:
+            ids = self._ids
+        if ids is None:
+            ids = self._load()
+        if user_id in ids:
+            with self._lock:
+                self.counters["hits"] += 1
+            return True
+        with self._lock:
+            generation = self._generation
+        with Session() as session:
+            found = session.execute(
+                sa.select(User.user_id).where(User.user_id == user_id)
+            ).first() is not None
+        with self._lock:
+            self.counters["probes"] += 1
+            if found:
+                if self._ids is not None and generation == self._generation:
+                    self._ids.add(user_id)
+            else:
+                self.counters["rejections"] += 1
+        return found
+
+    def add(self, user_id: UserID) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._ids is not None:
+                self._ids.add(user_id)
+
+    def remove(self, user_id: UserID) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._ids is not None:
+                self._ids.discard(user_id)
+
+    def invalidate(self) -> None:
+        """Drops the set; the next lookup reloads it."""
+        with self._lock:
+            self._generation += 1
+            self._ids = None
+        logging.debug("User index invalidated")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.counters["hits"],
+                "loads": self.counters["loads"],
+                "probes": self.counters["probes"],
+                "rejections": self.counters["rejections"],
+                "size": None if self._ids is None else len(self._ids),
+            }
+
+    def _load(self) -> set[UserID]:
+        with self._lock:
+            generation = self._generation
+        with Session() as session:
+            ids = set(session.execute(sa.select(User.user_id)).scalars())
+        with self._lock:
+            self.counters["loads"] += 1
+            if generation == self._generation:
+                self._ids = ids
+        return ids
+
+
+user_index = UserIndex()
@@ -0,0 +1,328 @@
+"""
+In-memory, incrementally maintained per-user statistics for the 'by user' view.
+
+The first read for a year loads that year's watchlist plus a few facts per
+movie (short?, multinom?, runtime, which categories) and builds every user's
+counters. After that, watchlist writes are applied as deltas, and nomination
+or runtime edits only re-derive the contributions of the movies involved.
+Reads are a dict lookup per user.
+
+Every update is state-based (we remember each user's status per movie), so
+applying the same change twice is harmless. That keeps a rebuild racing with
+a write from double-counting.
+
+`python -m backend.data.user_stats [year ...]` rebuilds the stats from scratch and
+checks them against the SQL query in qu.compute_user_stats.
+"""
+
+import logging
+import threading
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from typing import Any, Literal
+
+import sqlalchemy as sa
+
+from backend.data.db_connections import Session
+from backend.data.db_schema import Category, Movie, Nomination, User, Watchnotice
+from backend.types.api_schemas import CategoryID, MovieID, UserID
+from backend.types.my_types import WatchStatus
+
+
+class _MovieFacts:
+    __slots__ = ("is_short", "is_multinom", "runtime", "categories")
+
+    def __init__(
+        self,
+        is_short: bool | None = None,
+        is_multinom: bool = False,
+        runtime: int | None = None,
+        categories: Iterable[CategoryID] = (),
+    ):
+        # * is_short is None for a movie without nominations (it's neither short nor feature)
+        self.is_short = is_short
+        self.is_multinom = is_multinom
+        self.runtime = runtime
+        # * One entry per nomination, so a movie nominated twice in a category counts twice
+        self.categories = Counter(categories)
+
+
+class _UserCounters:
+    def __init__(self):
+        self.entries: Counter[Literal["seen", "todo"]] = Counter()
+        self.short: Counter[Literal["seen", "todo"]] = Counter()
+        self.feature: Counter[Literal["seen", "todo"]] = Counter()
+        self.multinom: Counter[Literal["seen", "todo"]] = Counter()
+        self.runtime_sum: Counter[Literal["seen", "todo"]] = Counter()
+        self.runtime_count: Counter[Literal["seen", "todo"]] = Counter()
+        # * Nominations watched per category. "both" counts seen and todo together.
+        self.category_counts: dict[Literal["seen", "both"], Counter[CategoryID]] = {
+            "seen": Counter(),
+            "both": Counter(),
+        }
+        self.completed: Counter[Literal["seen", "both"]] = Counter()
+
+
+def _label(status: WatchStatus) -> Literal["seen", "todo"] | None:
+    if status == WatchStatus.SEEN:
+        return "seen"
+    if status == WatchStatus.TODO:
+        return "todo"
+    return None
+
+
+class _YearStats:
+    def __init__(
+        self,
+        users: Iterable[UserID],
+        movies: dict[MovieID, _MovieFacts],
+        max_noms: Mapping[CategoryID, int | None],
+    ):
+        self.movies = movies
+        self.max_noms = max_noms
+        self.watchlist: dict[UserID, dict[MovieID, WatchStatus]] = {}
+        self.counters: dict[UserID, _UserCounters] = {
+            user_id: _UserCounters() for user_id in users
+        }
+
+    def set_status(self, user_id: UserID, movie_id: MovieID, status: WatchStatus) -> None:
+        user_watchlist = self.watchlist.setdefault(user_id, {})
+        old = user_watchlist.get(movie_id, WatchStatus.BLANK)
+        if old == status:
+            return
+        self._apply(user_id, movie_id, old, -1)
+        if status == WatchStatus.BLANK:
+            del user_watchlist[movie_id]
+        else:
+            user_watchlist[movie_id] = status
+        self._apply(user_id, movie_id, status, +1)
+
+    def replace_movie_facts(self, movie_id: MovieID, facts: _MovieFacts) -> None:
+        watchers = [
+            (user_id, user_watchlist[movie_id])
+            for user_id, user_watchlist in self.watchlist.items()
+            if movie_id in user_watchlist
+        ]
+        for user_id, status in watchers:
+            self._apply(user_id, movie_id, status, -1)
+        self.movies[movie_id] = facts
+        for user_id, status in watchers:
+            self._apply(user_id, movie_id, status, +1)
+
+    def _apply(self, user_id: UserID, movie_id: MovieID, status: WatchStatus, sign: int) -> None:
+        label = _label(status)
+        if label is None:
+            return
+        # * Watchlist rows can outlive their user; those never show up in the output
+        counters = self.counters.get(user_id)
+        if counters is None:
+            return
+        facts = self.movies.get(movie_id, _MovieFacts())
+        counters.entries[label] += sign
+        if facts.is_short is True:
+            counters.short[label] += sign
+        elif facts.is_short is False:
+            counters.feature[label] += sign
+        if facts.is_multinom:
+            counters.multinom[label] += sign
+        if facts.runtime is not None:
+            counters.runtime_sum[label] += sign * facts.runtime
+            counters.runtime_count[label] += sign
+        for kind in ("seen", "both") if label == "seen" else ("both",):
+            category_counts = counters.category_counts[kind]
+            for category_id, times in facts.categories.items():
+                max_noms = self.max_noms.get(category_id)
+                was_complete = category_counts[category_id] == max_noms
+                category_counts[category_id] += sign * times
+                is_complete = category_counts[category_id] == max_noms
+                counters.completed[kind] += int(is_complete) - int(was_complete)
+
+    def row(self, user_id: UserID) -> dict[str, Any]:
+        c = self.counters[user_id]
+
+        def by_label(label: Literal["seen", "todo"]) -> dict[str, Any]:
+            title = label.capitalize()
+            has_entries = c.entries[label] > 0
+            cats_kind = "seen" if label == "seen" else "both"
+            return {
+                f"num{title}Short": c.short[label],
+                f"num{title}Feature": c.feature[label],
+                f"num{title}Multinom": c.multinom[label],
+                # * These mirror the SQL, which yields NULL for users with no entries
+                f"numCats{title}": c.completed[cats_kind] if has_entries else None,
+                f"{label}Watchtime": (
+                    c.runtime_sum[label] if c.runtime_count[label] > 0 else None
+                ),
+            }
+
+        return {"id": user_id, **by_label("seen"), **by_label("todo")}
+
+
+class UserStatsStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._years: dict[int, _YearStats] = {}
+
+    def get(self, year: int) -> list[dict[str, Any]]:
+        with self._lock:
+            stats = self._years.get(year)
+            if stats is None:
+                stats = self._years[year] = _load_year(year)
+            return [stats.row(user_id) for user_id in sorted(stats.counters)]
+
+    def rebuild(self, year: int) -> list[dict[str, Any]]:
+        with self._lock:
+            self._years.pop(year, None)
+        return self.get(year)
+
+    def record_watch(
+        self, year: int, user_id: UserID, movie_id: MovieID, status: WatchStatus
+    ) -> None:
+        self.record_watches(year, user_id, [(movie_id, status)])
+
+    def record_watches(
+        self, year: int, user_id: UserID, entries: Iterable[tuple[MovieID, WatchStatus]]
+    ) -> None:
+        with self._lock:
+            stats = self._years.get(year)
+            if stats is None:
+                return
+            for movie_id, status in entries:
+                if movie_id not in stats.movies:
+                    stats.movies.update(_load_movie_facts([movie_id]))
+                stats.set_status(user_id, movie_id, status)
+
+    def add_user(self, user_id: UserID) -> None:
+        with self._lock:
+            for stats in self._years.values():
+                if user_id not in stats.counters:
+                    stats.counters[user_id] = _UserCounters()
+                    for movie_id, status in stats.watchlist.get(user_id, {}).items():
+                        stats._apply(user_id, movie_id, status, +1)
+
+    def forget_user(self, user_id: UserID) -> None:
+        with self._lock:
+            for stats in self._years.values():
+                _ = stats.counters.pop(user_id, None)
+
+    def refresh_movies(self, year: int, movie_ids: Iterable[MovieID]) -> None:
+        """Call after a movie's nominations or runtime change."""
+        with self._lock:
+            stats = self._years.get(year)
+            if stats is None:
+                return
+            for movie_id, facts in _load_movie_facts(movie_ids).items():
+                stats.replace_movie_facts(movie_id, facts)
+
+    def invalidate(self, year: int | None = None) -> None:
+        """For bulk edits where working out the affected movies isn't worth it."""
+        with self._lock:
+            if year is None:
+                self._years.clear()
+            else:
+                _ = self._years.pop(year, None)
+
+
+def _load_movie_facts(movie_ids: Iterable[MovieID] | None = None, year: int | None = None) -> dict[MovieID, _MovieFacts]:
+    """
+    Facts for the given movies, or for every movie in `year`
+    (plus any other movie on that year's watchlist).
+    """
+    if year is not None:
+        movie_filter = sa.or_(
+            Movie.year == year,
+            Movie.movie_id.in_(
+                sa.select(Watchnotice.movie_id).where(Watchnotice.year == year)
+            ),
+        )
+    else:
+        movie_filter = Movie.movie_id.in_(list(movie_ids or []))
+    with Session() as session:
+        movies = session.execute(
+            sa.select(Movie.movie_id, Movie.runtime).where(movie_filter)
+        ).all()
+        nominations = session.execute(
+            sa.select(Nomination.movie_id, Nomination.category_id, Category.is_short)
+            .join(Movie, Nomination.movie_id == Movie.movie_id)
+            .outerjoin(Category, Nomination.category_id == Category.category_id)
+            .where(movie_filter)
+        ).all()
+    categories: dict[MovieID, list[CategoryID]] = {}
+    is_short: dict[MovieID, bool] = {}
+    for movie_id, category_id, category_is_short in nominations:
+        categories.setdefault(movie_id, []).append(category_id)
+        if category_is_short is not None:
+            is_short[movie_id] = is_short.get(movie_id, False) or category_is_short
+    return {
+        movie_id: _MovieFacts(
+            is_short=is_short.get(movie_id),
+            is_multinom=len(categories.get(movie_id, [])) > 1,
+            runtime=runtime,
+            categories=categories.get(movie_id, []),
+        )
+        for movie_id, runtime in movies
+    }
+
+
+def _load_year(year: int) -> _YearStats:
+    logging.info(f"Building user stats for {year}")
+    movies = _load_movie_facts(year=year)
+    with Session() as session:
+        users = session.execute(sa.select(User.user_id)).scalars().all()
+        max_noms = dict(
+            session.execute(
+                sa.select(Category.category_id, Category.max_nominations)
+            ).tuples().all()
+        )
+        watchlist = session.execute(
+            sa.select(Watchnotice.user_id, Watchnotice.movie_id, Watchnotice.status)
+            .where(Watchnotice.year == year)
+        ).tuples().all()
+    stats = _YearStats(users, movies, max_noms)
+    for user_id, movie_id, status in watchlist:
+        stats.set_status(user_id, movie_id, status)
+    return stats
+
+
+user_stats = UserStatsStore()
+
+
+def verify(year: int) -> list[str]:
+    """
+    Rebuilds the stats for `year` and compares them with the SQL query.
+    Returns a description of every mismatch (so, empty means all good).
+    """
+    import backend.data.queries as qu
+
+    materialized = {row["id"]: row for row in user_stats.rebuild(year)}
+    expected = {row["id"]: row for row in qu.compute_user_stats(year)}
+    problems: list[str] = []
+    for user_id in sorted(materialized.keys() | expected.keys()):
+        if user_id not in expected:
+            problems.append(f"{user_id}: not in query result")
+            continue
+        if user_id not in materialized:
+            problems.append(f"{user_id}: missing from materialized stats")
+            continue
+        for key, value in materialized[user_id].items():
+            if expected[user_id].get(key) != value:
+                problems.append(
+                    f"{user_id}.{key}: materialized {value}, query {expected[user_id].get(key)}"
+                )
+    return problems
+
+
+if __name__ == "__main__":
+    import sys
+
+    import backend.data.queries as qu
+
+    years = [int(arg) for arg in sys.argv[1:]] or qu.get_years()
+    failed = False
+    for year in years:
+        problems = verify(year)
+        print(f"{year}: {'OK' if not problems else f'{len(problems)} mismatches'}")
+        for problem in problems:
+            print(f"    {problem}")
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
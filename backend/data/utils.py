@@ -4,6 +4,7 @@ from typing import Any, TypeVar, overload
 
 import pandas as pd
 import sqlalchemy as sa
+import sqlalchemy.orm as orm
 
 from backend.data.db_connections import Session
 from backend.data.db_schema import Category, Movie, Nomination, User
@@ -11,50 +12,107 @@ from backend.types.api_schemas import MovieID, UserID
 from backend.types.api_validators import MovieValidator, UserValidator
 
 
-def create_unique_movie_id(year: int | str) -> MovieID:
-    with Session() as session:
-        existing_ids = session.execute(
-            sa.select(Movie.movie_id)).scalars().all()
-    tries = 0
-    while tries < 100:
-        id = (
-            "mov_"
-            + (f"{(int(year)-1927) % 256:02x}" if str(year).isdigit() else "00")
-            + f"{random.randint(0, 0xFF_FF):04x}"
-        )
-        if id not in existing_ids:
+class IDSpaceExhausted(Exception):
+    """Raised when there aren't enough unused IDs left to hand out."""
 
-            validated_id = MovieValidator(movie=id).movie
-            return validated_id
-        tries += 1
-    logging.warning(
-        "Unable to create unique ID after 100 tries. Erroring out to avoid infinite loop."
-    )
-    raise Exception(
-        "Unable to create unique ID. Erroring out to avoid infinite loop.")
 
+# * Random candidates per round, as a multiple of what's still needed. Extra
+# * candidates cover collisions, so one IN probe is usually enough.
+_OVERDRAW = 2
+# * Past this fraction taken, guessing wastes probes; load the range and pick locally
+_DENSE = 0.5
+# * Keeps the IN list well under SQLite's bound parameter limit
+_MAX_PROBE = 500
 
-def create_unique_user_id() -> UserID:
-    with Session() as session:
-        existing_ids = session.execute(sa.select(User.user_id)).scalars().all()
-    tries = 0
-    while tries < 100:
-        id = "usr_" + f"{random.randint(0, 0xFFF_FFF):06x}"
-        if id not in existing_ids:
-            try:
-                validated_id = UserValidator(user=id).user
-            except Exception as e:
-                logging.error(
-                    f"I made a new user ID {id} and it failed validation somehow. Error: {e}"
-                )
-                raise
-            return validated_id
-        tries += 1
-    logging.warning(
-        "Unable to create unique ID after 100 tries. Erroring out to avoid infinite loop."
+
+def movie_id_prefix(year: int | str) -> str:
+    """Movie IDs are mov_ + one byte for the year + two random bytes."""
+    return "mov_" + (
+        f"{(int(year)-1927) % 256:02x}" if str(year).isdigit() else "00"
     )
-    raise Exception(
-        "Unable to create unique ID. Erroring out to avoid infinite loop.")
+
+
+def _reserve_ids(
+    session: orm.Session,
+    column: orm.InstrumentedAttribute[Any],
+    prefix: str,
+    hex_digits: int,
+    count: int,
+) -> list[str]:
+    """
+    Picks `count` random unused IDs of the form prefix + hex_digits hex digits.
+    Only touches the primary key index: a range COUNT to check there's room,
+    then an IN probe per round of candidates. Runs in the caller's session so
+    IDs inserted earlier in the same (uncommitted) transaction are seen.
+    """
+    if count <= 0:
+        return []
+    space = 16**hex_digits
+    low, high = prefix + "0" * hex_digits, prefix + "f" * hex_digits
+    in_range = sa.and_(column >= low, column <= high)
+    taken = session.execute(
+        sa.select(sa.func.count()).where(in_range)
+    ).scalar_one()
+    free = space - taken
+    if free < count:
+        logging.error(
+            f"Asked for {count} new IDs under {prefix}, but only {free} of {space} are left."
+        )
+        raise IDSpaceExhausted(
+            f"Only {free} unused IDs left under {prefix}; {count} needed."
+        )
+
+    if taken > space * _DENSE:
+        used = set(session.execute(sa.select(column).where(in_range)).scalars())
+        picked: set[str] = set()
+        while len(picked) < count:
+            id = f"{prefix}{random.randrange(space):0{hex_digits}x}"
+            if id not in used:
+                picked.add(id)
+        return list(picked)
+
+    reserved: list[str] = []
+    while len(reserved) < count:
+        needed = count - len(reserved)
+        candidates = {
+            f"{prefix}{n:0{hex_digits}x}"
+            for n in random.sample(range(space), min(space, needed * _OVERDRAW, _MAX_PROBE))
+        }
+        candidates.difference_update(reserved)
+        clashes = set(session.execute(
+            sa.select(column).where(column.in_(candidates))
+        ).scalars())
+        reserved.extend(list(candidates - clashes)[:needed])
+    return reserved
+
+
+def reserve_movie_ids(
+    session: orm.Session, year: int | str, count: int
+) -> list[MovieID]:
+    """`count` unused movie IDs for `year` (there are 65536 per year)."""
+    ids = _reserve_ids(session, Movie.movie_id, movie_id_prefix(year), 4, count)
+    return [MovieValidator(movie=id).movie for id in ids]
+
+
+def reserve_user_ids(session: orm.Session, count: int) -> list[UserID]:
+    ids = _reserve_ids(session, User.user_id, "usr_", 6, count)
+    return [UserValidator(user=id).user for id in ids]
+
+
+def create_unique_movie_id(
+    year: int | str, session: orm.Session | None = None
+) -> MovieID:
+    if session is None:
+        with Session() as session:
+            return reserve_movie_ids(session, year, 1)[0]
+    return reserve_movie_ids(session, year, 1)[0]
+
+
+def create_unique_user_id(session: orm.Session | None = None) -> UserID:
+    if session is None:
+        with Session() as session:
+            return reserve_user_ids(session, 1)[0]
+    return reserve_user_ids(session, 1)[0]
 
 
 _DictT = TypeVar("_DictT", bound=dict[str, Any])
@@ -0,0 +1,89 @@
+"""
+Data version counters, for ETags on the year-scoped GET routes.
+
+Every write bumps the counters for what it changed, inside its own
+transaction (see bump()), so a counter never moves without the data moving
+too. The new values are only published to the in-memory copy the ETags are
+built from once the write's after_commit hook has run: until then the caches
+(reference_cache, user_stats) may still hold the old data, and a new ETag on
+an old body would be kept by the client for good. A GET route reads the
+counters its response depends on from memory, and if the client already has
+that version it answers 304 without running the real query.
+
+Anything that writes to the database behind the app's back (a script, the
+sqlite shell) should bump the matching counters too. The server picks them up
+with its next write to the same dataset, or when it restarts.
+"""
+
+import hashlib
+import time
+from collections.abc import Iterable
+from typing import Literal
+
+import sqlalchemy.orm as orm
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.data.db_schema import DataVersion
+from backend.data.writer import publish_after_commit
+
+type VersionedDataset = Literal["movies", "nominations", "watchlist", "users"]
+
+# * Year used for datasets that aren't year-scoped
+GLOBAL_YEAR = 0
+
+# * Changes on every restart, so a deploy (or an edit made while the server
+# * was down) never gets a 304 for something older
+_BOOT_ID = f"{time.time_ns():x}"
+
+# * (dataset, year) -> version, as of the last write whose caches are updated.
+# * Only the writer thread assigns to it.
+_published: dict[tuple[str, int], int] = {}
+
+
+def bump(session: orm.Session, year: int | None, *datasets: VersionedDataset) -> None:
+    """
+    Call inside the write's transaction (i.e. from a writer job). ETags see
+    the new versions after the job's after_commit hook.
+    """
+    if not datasets:
+        return
+    key_year = GLOBAL_YEAR if year is None else int(year)
+    stmt = sqlite_insert(DataVersion).values(
+        [{"dataset": d, "year": key_year, "version": 1} for d in datasets]
+    )
+    rows = session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[DataVersion.dataset, DataVersion.year],
+            set_={"version": DataVersion.version + 1},
+        ).returning(DataVersion.dataset, DataVersion.year, DataVersion.version)
+    ).all()
+    bumped = {(dataset, row_year): version for dataset, row_year, version in rows}
+    publish_after_commit(session, lambda: _published.update(bumped))
+
+
+def get_versions(
+    year: int, datasets: Iterable[VersionedDataset]
+) -> dict[VersionedDataset, int]:
+    """
+    The published counters. Ones not bumped since the server started read as
+    0, which _BOOT_ID keeps apart from the last run's.
+    """
+    return {
+        d: _published.get((d, GLOBAL_YEAR if d == "users" else year), 0)
+        for d in datasets
+    }
+
+
+def etag(year: int, datasets: Iterable[VersionedDataset], *extra: object) -> str:
+    """
+    A strong ETag for a response built from `datasets` for `year`.
+    `extra` is anything else the body depends on (query params, the user for
+    per-user responses, the route).
+    """
+    versions = get_versions(year, datasets)
+    key = "|".join(
+        [_BOOT_ID, str(year)]
+        + [f"{d}={v}" for d, v in sorted(versions.items())]
+        + [repr(x) for x in extra]
+    )
+    return '"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
@@ -0,0 +1,111 @@
+"""
+Cursor-based sync for the watchlist.
+
+Every watchlist write also appends what it changed to the watchlist_changes
+table (see record()), in the same transaction. A client that holds a cursor
+(the seq of the last change it has seen) asks for the changes after it and
+gets back only those rows, with the newest state of each (user, movie):
+
+    {"year": 2024, "since": 812, "cursor": 815, "reset": false,
+     "upserts": [{"userId": ..., "movieId": ..., "status": "seen"}],
+     "deletions": [{"userId": ..., "movieId": ...}]}
+
+Replaying a delta is idempotent, so a cursor that's a little old is fine.
+If the cursor is older than the log goes back (it's trimmed to the last
+KEEP_CHANGES rows) or newer than anything in it (the database was replaced),
+the answer has reset=True and the client should fetch the whole watchlist.
+
+Like the version counters, anything that writes the watchlist behind the
+app's back has to record its changes here too.
+"""
+
+from collections.abc import Iterable
+from typing import Any
+
+import sqlalchemy as sa
+import sqlalchemy.orm as orm
+
+from backend.data.db_connections import Session
+from backend.data.db_schema import WatchlistChange
+from backend.types.api_schemas import MovieID, UserID
+from backend.types.my_types import WatchStatus
+
+# * Enough for weeks of normal use; older cursors just get a reset
+KEEP_CHANGES = 50_000
+
+
+def record(
+    session: orm.Session,
+    changes: Iterable[tuple[int, UserID, MovieID, WatchStatus | None]],
+) -> int | None:
+    """
+    Call inside the write's transaction (i.e. from a writer job).
+    Each change is (year, user, movie, new status); None means removed.
+    Returns the new cursor, or None if there was nothing to record.
+    """
+    rows = [
+        {"year": year, "user_id": user_id, "movie_id": movie_id, "status": status}
+        for year, user_id, movie_id, status in changes
+    ]
+    if not rows:
+        return None
+    _ = session.execute(sa.insert(WatchlistChange), rows)
+    cursor = latest_cursor(session)
+    # * A range on the primary key, so trimming as we go is cheap
+    _ = session.execute(
+        sa.delete(WatchlistChange).where(WatchlistChange.seq <= cursor - KEEP_CHANGES)
+    )
+    return cursor
+
+
+def latest_cursor(session: orm.Session | None = None) -> int:
+    """The seq of the newest change (0 if there are none)."""
+    if session is None:
+        with Session() as session:
+            return latest_cursor(session)
+    return session.execute(
+        sa.select(sa.func.coalesce(sa.func.max(WatchlistChange.seq), 0))
+    ).scalar_one()
+
+
+def get_changes(year: int, since: int) -> dict[str, Any]:
+    """The watchlist changes for `year` after cursor `since` (see module docstring)."""
+    with Session() as session:
+        # * One snapshot, so the cursor matches the rows
+        _ = session.connection().exec_driver_sql("BEGIN")
+        oldest, cursor = session.execute(
+            sa.select(
+                sa.func.coalesce(sa.func.min(WatchlistChange.seq), 0),
+                sa.func.coalesce(sa.func.max(WatchlistChange.seq), 0),
+            )
+        ).one()
+        delta: dict[str, Any] = {
+            "year": year,
+            "since": since,
+            "cursor": cursor,
+            "reset": since > cursor or (since < oldest - 1),
+            "upserts": [],
+            "deletions": [],
+        }
+        if delta["reset"] or since == cursor:
+            return delta
+        rows = session.execute(
+            sa.select(
+                WatchlistChange.user_id,
+                WatchlistChange.movie_id,
+                WatchlistChange.status,
+            )
+            .where(WatchlistChange.year == year)
+            .where(WatchlistChange.seq > since)
+            .order_by(WatchlistChange.seq)
+        ).tuples()
+        # * Later changes to the same entry overwrite earlier ones
+        latest = {(user_id, movie_id): status for user_id, movie_id, status in rows}
+    for (user_id, movie_id), status in latest.items():
+        if status is None:
+            delta["deletions"].append({"userId": user_id, "movieId": movie_id})
+        else:
+            delta["upserts"].append(
+                {"userId": user_id, "movieId": movie_id, "status": status.value}
+            )
+    return delta
@@ -0,0 +1,243 @@
+"""
+The single database writer.
+
+Every write in the app goes through here: one thread, one connection, one
+transaction at a time. SQLite only allows one writer anyway, so instead of
+letting request threads fight over the lock (and turning "database is locked"
+into 423s), writes queue up and the writer drains them.
+
+A write is a function that takes a Session and does its work (no commit!).
+Whatever is waiting in the queue when the writer picks up a job is committed
+along with it, up to WRITER_MAX_BATCH jobs. Each job runs inside its own
+savepoint, so one failing job is rolled back (and raises for its caller)
+without taking the rest of the batch with it.
+
+after_commit callbacks run on the writer thread, in commit order, before the
+caller is woken up. That's where cache invalidation and user_stats updates go.
+Anything the work itself registers with publish_after_commit() runs after
+that, once the caches match the new data (see versions.bump).
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, Generic, TypeVar
+
+import sqlalchemy as sa
+import sqlalchemy.orm as orm
+
+import backend.utils.env_reader as env
+from backend.data.db_connections import create_db_engine
+
+_T = TypeVar("_T")
+
+type WriteWork[T] = Callable[[orm.Session], T]
+
+# * session.info key for the current job's publish_after_commit() callbacks
+_PUBLISH = "writer_publish"
+
+
+def publish_after_commit(session: orm.Session, fn: Callable[[], None]) -> None:
+    """
+    Runs `fn` on the writer thread after this job's commit and its after_commit
+    hook. Dropped if the job rolls back, and outside the writer (a script's own
+    session), where there's nothing in this process to publish to.
+    """
+    callbacks = session.info.get(_PUBLISH)
+    if callbacks is not None:
+        callbacks.append(fn)
+
+
+class _Job(Generic[_T]):
+    __slots__ = ("work", "after_commit", "future", "enqueued_at")
+
+    def __init__(
+        self,
+        work: WriteWork[_T],
+        after_commit: Callable[[_T], None] | None,
+    ):
+        self.work = work
+        self.after_commit = after_commit
+        self.future: Future[_T] = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class DatabaseWriter:
+    def __init__(self, max_batch: int = env.WRITER_MAX_BATCH):
+        self.max_batch = max(1, max_batch)
+        self._queue: queue.SimpleQueue[_Job[Any] | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._engine: sa.Engine | None = None
+        self._counters = {
+            "jobs": 0,
+            "failed_jobs": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "largest_batch": 0,
+            "busy_seconds": 0.0,
+            "queued_seconds": 0.0,
+        }
+
+    # * Submitting work
+
+    def submit(
+        self, work: WriteWork[_T], after_commit: Callable[[_T], None] | None = None
+    ) -> Future[_T]:
+        if threading.current_thread() is self._thread:
+            raise RuntimeError(
+                "A write job tried to queue another write; do it in the same job instead"
+            )
+        self._ensure_started()
+        job = _Job(work, after_commit)
+        self._queue.put(job)
+        return job.future
+
+    async def write(
+        self, work: WriteWork[_T], after_commit: Callable[[_T], None] | None = None
+    ) -> _T:
+        """Queues `work` and waits (without blocking the event loop) until it's committed."""
+        return await asyncio.wrap_future(self.submit(work, after_commit))
+
+    def run(
+        self, work: WriteWork[_T], after_commit: Callable[[_T], None] | None = None
+    ) -> _T:
+        """Like write(), for synchronous code (scripts, tasks that aren't async)."""
+        return self.submit(work, after_commit).result()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        batches = counters["batches"] or 1
+        return {
+            **counters,
+            "mean_batch": counters["jobs"] / batches,
+            "queue_depth": self._queue.qsize(),
+            "max_batch": self.max_batch,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
+
+    def stop(self, timeout: float | None = 10) -> None:
+        """Finishes whatever is queued, then stops the thread. The next submit starts it again."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+            if self._engine is not None:
+                self._engine.dispose()
+                self._engine = None
+
+    # * The writer thread
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._engine is None:
+                # * One connection, kept open for as long as the writer runs
+                self._engine = _create_writer_engine()
+            self._thread = threading.Thread(
+                target=self._run_forever, name="db-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run_forever(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    next_job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if next_job is None:
+                    stopping = True
+                    break
+                batch.append(next_job)
+            self._run_batch(batch)
+            if stopping:
+                return
+
+    def _run_batch(self, batch: list[_Job[Any]]) -> None:
+        # * Skip jobs whose caller gave up before we got to them
+        batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        assert self._engine is not None
+        results: dict[int, Any] = {}
+        errors: dict[int, BaseException] = {}
+        published: dict[int, list[Callable[[], None]]] = {}
+        try:
+            with orm.Session(bind=self._engine) as session:
+                for i, job in enumerate(batch):
+                    session.info[_PUBLISH] = []
+                    try:
+                        with session.begin_nested():
+                            results[i] = job.work(session)
+                        published[i] = session.info[_PUBLISH]
+                    except Exception as e:
+                        errors[i] = e
+                _ = session.info.pop(_PUBLISH, None)
+                session.commit()
+        except Exception as e:
+            logging.error(f"Writer batch of {len(batch)} failed to commit: {e}")
+            with self._lock:
+                self._counters["failed_batches"] += 1
+            for i in range(len(batch)):
+                errors.setdefault(i, e)
+        for i, job in enumerate(batch):
+            if i in errors:
+                job.future.set_exception(errors[i])
+                continue
+            if job.after_commit is not None:
+                try:
+                    job.after_commit(results[i])
+                except Exception as e:
+                    # * The data is committed; a stale cache shouldn't fail the write
+                    logging.error(f"after_commit hook failed: {e}")
+            for fn in published.get(i, ()):
+                try:
+                    fn()
+                except Exception as e:
+                    logging.error(f"publish_after_commit callback failed: {e}")
+            job.future.set_result(results[i])
+        finished = time.perf_counter()
+        with self._lock:
+            c = self._counters
+            c["jobs"] += len(batch)
+            c["failed_jobs"] += len(errors)
+            c["batches"] += 1
+            c["largest_batch"] = max(c["largest_batch"], len(batch))
+            c["busy_seconds"] += finished - started
+            c["queued_seconds"] += sum(started - job.enqueued_at for job in batch)
+
+
+def _create_writer_engine() -> sa.Engine:
+    new_engine = create_db_engine("queue", pool_size=1, max_overflow=0)
+
+    # * pysqlite's own transaction handling gets in the way of SAVEPOINTs,
+    # * so take it over: no implicit BEGINs, and grab the write lock up front
+    @sa.event.listens_for(new_engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @sa.event.listens_for(new_engine, "begin")
+    def _begin_immediate(conn):
+        _ = conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return new_engine
+
+
+writer = DatabaseWriter()
@@ -14,10 +14,14 @@ from starlette.middleware.sessions import (
 )
 
 import backend.utils.env_reader as env
+from backend.access_external.http_clients import http_clients
 from backend.routes.admin_routes import page_router as admin_page_router
 from backend.routes.database_routes import router as oscars_router
 from backend.routing_lib.error_handling import apply_error_handling
 from backend.routing_lib.user_session import SessionMiddleware as MySessionMiddleware
+from backend.scheduled_tasks.job_kinds import JOB_KINDS
+from backend.scheduled_tasks.job_queue import job_queue
+from backend.scheduled_tasks.refresh_queue import refresh_queue
 from backend.scheduled_tasks.scheduling import register_jobs
 from backend.utils.logging_config import setup_logging
 
@@ -42,10 +46,15 @@ register_jobs(scheduler)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    http_clients.start()
+    await job_queue.start(JOB_KINDS)
     scheduler.start()
     yield
     # Shutdown
     scheduler.shutdown()
+    await job_queue.close()
+    await refresh_queue.close()
+    await http_clients.close()
 
 
 app = FastAPI(lifespan=lifespan, redirect_slashes=False)
@@ -1,9 +1,20 @@
+import asyncio
+from collections.abc import Callable
+from typing import Any
+
 import sqlalchemy as sa
+import sqlalchemy.orm as orm
 from fastapi import APIRouter
 
-from backend.data.db_connections import Session
+import backend.data.mutations as mu
+import backend.data.versions as versions
+import backend.utils.env_reader as env
+from backend.data.cache import reference_cache
+from backend.data.db_connections import Session, run_db
 from backend.data.db_schema import Movie, Nomination
-from backend.data.utils import create_unique_movie_id
+from backend.data.user_stats import user_stats
+from backend.data.utils import reserve_movie_ids
+from backend.data.writer import writer
 from backend.intake.schemas import (
     EnrichRequest,
     EnrichResponse,
@@ -27,6 +38,7 @@ from backend.intake.tmdb_enrichment import (
     get_tmdb_movie_details,
     search_movie_tmdb_id,
 )
+from backend.scheduled_tasks.job_queue import job_queue
 from backend.types.api_schemas import MovieID
 
 router = APIRouter()
@@ -91,21 +103,32 @@ async def preview_nominations(request: NominationPreviewRequest) -> NominationPr
     )
 
 
-@router.post("/nominations/import", response_model=NominationImportResponse)
-async def import_nominations(request: NominationPreviewRequest) -> NominationImportResponse:
+@router.post("/nominations/import", status_code=202)
+async def submit_nominations_import(request: NominationPreviewRequest) -> dict[str, Any]:
     """
     Import nominations - creates movies and nominations in the database.
 
+    Queues a "nominations_import" job and returns it; poll GET /api/admin/jobs/{job_id}
+    for its result (a NominationImportResponse).
+    """
+    return await job_queue.submit("nominations_import", request.model_dump(mode="json"))
+
+
+async def import_nominations(request: NominationPreviewRequest) -> NominationImportResponse:
+    """
+    What /nominations/import does, in the "nominations_import" job.
+
     Uses the same normalization logic as /preview, so the results are deterministic.
     """
     # Group rows by normalized title
     groups = group_by_normalized_title(request.rows)
 
-    movie_ids: list[MovieID] = []
-    nominations_created = 0
-
-    with Session() as session:
-        for normalized_title, row_indices in groups.items():
+    def apply(session: orm.Session) -> tuple[list[MovieID], int]:
+        movie_ids: list[MovieID] = []
+        nominations_created = 0
+        # * One probe for every new movie's ID, instead of a lookup per movie
+        new_ids = reserve_movie_ids(session, request.year, len(groups))
+        for (normalized_title, row_indices), movie_id in zip(groups.items(), new_ids):
             # Get the first original title to use as the movie title
             original_titles = get_original_titles_for_normalized(
                 request.rows, normalized_title
@@ -113,7 +136,6 @@ async def import_nominations(request: NominationPreviewRequest) -> NominationImp
             display_title = original_titles[0] if original_titles else normalized_title
 
             # Create the movie
-            movie_id = create_unique_movie_id(request.year)
             _ = session.execute(
                 sa.insert(Movie).values(
                     movie_id=movie_id,
@@ -136,7 +158,13 @@ async def import_nominations(request: NominationPreviewRequest) -> NominationImp
                 )
                 nominations_created += 1
 
-        session.commit()
+        mu.refresh_movie_flags(session, movie_ids)
+        versions.bump(session, request.year, "movies", "nominations")
+        return movie_ids, nominations_created
+
+    movie_ids, nominations_created = await writer.write(
+        apply, after_commit=lambda _: reference_cache.invalidate(request.year)
+    )
 
     return NominationImportResponse(
         movies_created=len(movie_ids),
@@ -145,8 +173,12 @@ async def import_nominations(request: NominationPreviewRequest) -> NominationImp
     )
 
 
-@router.post("/enrich", response_model=EnrichResponse)
-async def enrich_movies(request: EnrichRequest) -> EnrichResponse:
+# * Movie updates from /enrich committed together
+ENRICH_WRITE_BATCH = 25
+
+
+@router.post("/enrich", status_code=202)
+async def enrich_movies(request: EnrichRequest) -> dict[str, Any]:
     """
     Enrich movies with TMDB data. Two operations available:
 
@@ -155,33 +187,140 @@ async def enrich_movies(request: EnrichRequest) -> EnrichResponse:
 
     By default, both operations run and only process movies missing the relevant data.
     Use force_search/force_hydrate to reprocess all movies.
+
+    Each movie goes through search and then hydrate on its own, up to
+    TMDB_ENRICH_CONCURRENCY movies at once (the TMDB client keeps to its rate
+    limit), and the updates are written ENRICH_WRITE_BATCH movies at a time.
+
+    Queues an "enrich_year" job and returns it; poll GET /api/admin/jobs/{job_id}
+    for its progress and result (an EnrichResponse).
     """
-    response = EnrichResponse()
+    return await job_queue.submit("enrich_year", request.model_dump(mode="json"))
 
-    # Step 1: Search for TMDB IDs
-    if request.search:
+
+async def run_enrichment(
+    request: EnrichRequest, on_progress: Callable[[int, int], None] | None = None
+) -> EnrichResponse:
+    """
+    What /enrich does, in the "enrich_year" job; on_progress(done, total) is
+    called as each movie finishes.
+    A write that fails stops the run and raises, once what was found so far
+    has been written.
+    """
+    def load() -> list[sa.Row[tuple[MovieID, str, str | None, str | None]]]:
         with Session() as session:
-            query = sa.select(Movie.movie_id, Movie.title).where(
-                Movie.year == request.year
-            )
-            if not request.force_search:
-                query = query.where(Movie.movie_db_id.is_(None))
-            result = session.execute(query)
-            movies_to_search = result.fetchall()
+            return list(session.execute(
+                sa.select(Movie.movie_id, Movie.title, Movie.movie_db_id, Movie.poster_path)
+                .where(Movie.year == request.year)
+            ))
+
+    movies = await run_db(load)
+    finished = 0
+    limit = asyncio.Semaphore(max(1, env.TMDB_ENRICH_CONCURRENCY))
+    search_results: dict[MovieID, SearchResult] = {}
+    hydrate_results: dict[MovieID, HydrateResult] = {}
+    pending: dict[MovieID, dict[str, Any]] = {}
+
+    async def flush() -> None:
+        if not pending:
+            return
+        # * Taken out so that saves made while this write waits start the next
+        # * batch; put back if it doesn't commit, for the final flush to retry
+        taken = dict(pending)
+        pending.clear()
+        batch = [{"movie_id": movie_id, **values} for movie_id, values in taken.items()]
+        hydrated = [movie_id for movie_id, values in taken.items() if "runtime" in values]
+
+        def apply(session: orm.Session) -> None:
+            # * A list of parameter sets makes this an update by primary key, per row
+            _ = session.execute(sa.update(Movie), batch)
+            versions.bump(session, request.year, "movies")
+
+        def after_commit(_: None) -> None:
+            # * Found TMDB IDs are matched against RSS feeds straight away
+            reference_cache.invalidate(request.year)
+            if hydrated:
+                user_stats.refresh_movies(request.year, hydrated)
+
+        try:
+            _ = await writer.write(apply, after_commit)
+        except BaseException:
+            for movie_id, values in taken.items():
+                pending[movie_id] = {**values, **pending.get(movie_id, {})}
+            raise
+
+    async def save(movie_id: MovieID, values: dict[str, Any]) -> None:
+        pending.setdefault(movie_id, {}).update(values)
+        if len(pending) >= ENRICH_WRITE_BATCH:
+            await flush()
+
+    async def hydrate(movie_id: MovieID, title: str, movie_db_id: str) -> HydrateResult:
+        try:
+            tmdb_id = int(movie_db_id)
+            async with limit:
+                details = await get_tmdb_movie_details(tmdb_id)
 
-        for movie_id, title in movies_to_search:
-            search_result = await search_movie_tmdb_id(movie_id, title, request.year)
+            if not details:
+                return HydrateResult(
+                    movie_id=movie_id,
+                    title=title,
+                    status="error",
+                    error="Failed to fetch TMDB details",
+                )
+            update_data = extract_enrichment_data(details)
+            # Don't overwrite movie_db_id since it's already set
+            del update_data["movie_db_id"]
+
+        except Exception as e:
+            return HydrateResult(
+                movie_id=movie_id,
+                title=title,
+                status="error",
+                error=str(e),
+            )
+        # * Outside the try: a failed write fails the whole run, not this movie
+        await save(movie_id, update_data)
+        return HydrateResult(movie_id=movie_id, title=title, status="success")
+
+    async def enrich(movie_id: MovieID, title: str, movie_db_id: str | None, poster_path: str | None) -> None:
+        # Step 1: Search for the TMDB ID
+        if request.search and (request.force_search or movie_db_id is None):
+            async with limit:
+                search_result = await search_movie_tmdb_id(movie_id, title, request.year)
+            search_results[movie_id] = search_result
+            if search_result.status == "found" and search_result.tmdb_id:
+                movie_db_id = str(search_result.tmdb_id)
+                await save(movie_id, {"movie_db_id": movie_db_id})
+
+        # Step 2: Hydrate metadata (poster_path is the proxy for "missing metadata")
+        if request.hydrate and movie_db_id is not None and (
+            request.force_hydrate or poster_path is None
+        ):
+            hydrate_results[movie_id] = await hydrate(movie_id, title, movie_db_id)
+
+        nonlocal finished
+        finished += 1
+        if on_progress is not None:
+            on_progress(finished, len(movies))
+
+    try:
+        async with asyncio.TaskGroup() as tasks:
+            for movie in movies:
+                _ = tasks.create_task(enrich(*movie))
+    except ExceptionGroup as group:
+        # * Only a write fails an enrich(); the rest were cancelled
+        raise group.exceptions[0]
+    finally:
+        # * Whatever was found before a failure is still worth keeping. Every
+        # * task has stopped by now, so nothing is saved after this.
+        await flush()
+
+    # * Results in the movies' order, not the order they finished in
+    response = EnrichResponse()
+    for movie_id, *_ in movies:
+        if (search_result := search_results.get(movie_id)) is not None:
             response.search_results.append(search_result)
-
             if search_result.status == "found" and search_result.tmdb_id:
-                # Save the TMDB ID to database
-                with Session() as session:
-                    _ = session.execute(
-                        sa.update(Movie)
-                        .where(Movie.movie_id == movie_id)
-                        .values(movie_db_id=str(search_result.tmdb_id))
-                    )
-                    session.commit()
                 response.search_found += 1
             elif search_result.status == "not_found":
                 response.search_not_found += 1
@@ -189,66 +328,10 @@ async def enrich_movies(request: EnrichRequest) -> EnrichResponse:
                 response.search_errors += 1
             else:
                 response.search_skipped += 1
-
-    # Step 2: Hydrate metadata for movies with TMDB IDs
-    if request.hydrate:
-        with Session() as session:
-            query = sa.select(Movie.movie_id, Movie.title, Movie.movie_db_id).where(
-                Movie.year == request.year,
-                Movie.movie_db_id.isnot(None),
-            )
-            if not request.force_hydrate:
-                # Only hydrate movies missing metadata (poster_path as proxy)
-                query = query.where(Movie.poster_path.is_(None))
-            result = session.execute(query)
-            movies_to_hydrate = result.fetchall()
-
-        for movie_id, title, movie_db_id in movies_to_hydrate:
-            try:
-                tmdb_id = int(movie_db_id)
-                details = await get_tmdb_movie_details(tmdb_id)
-
-                if details:
-                    update_data = extract_enrichment_data(details)
-                    # Don't overwrite movie_db_id since it's already set
-                    del update_data["movie_db_id"]
-
-                    with Session() as session:
-                        _ = session.execute(
-                            sa.update(Movie)
-                            .where(Movie.movie_id == movie_id)
-                            .values(**update_data)
-                        )
-                        session.commit()
-
-                    response.hydrate_results.append(
-                        HydrateResult(
-                            movie_id=movie_id,
-                            title=title,
-                            status="success",
-                        )
-                    )
-                    response.hydrate_success += 1
-                else:
-                    response.hydrate_results.append(
-                        HydrateResult(
-                            movie_id=movie_id,
-                            title=title,
-                            status="error",
-                            error="Failed to fetch TMDB details",
-                        )
-                    )
-                    response.hydrate_errors += 1
-
-            except Exception as e:
-                response.hydrate_results.append(
-                    HydrateResult(
-                        movie_id=movie_id,
-                        title=title,
-                        status="error",
-                        error=str(e),
-                    )
-                )
+        if (hydrate_result := hydrate_results.get(movie_id)) is not None:
+            response.hydrate_results.append(hydrate_result)
+            if hydrate_result.status == "success":
+                response.hydrate_success += 1
+            else:
                 response.hydrate_errors += 1
-
     return response
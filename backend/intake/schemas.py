@@ -50,7 +50,7 @@ class NominationPreviewResponse(BaseModel):
 
 
 class NominationImportResponse(BaseModel):
-    """Response from the nominations import endpoint."""
+    """Result of a nominations_import job (see the nominations import endpoint)."""
     movies_created: int
     nominations_created: int
     movie_ids: list[MovieID]
@@ -93,7 +93,7 @@ class HydrateResult(BaseModel):
 
 
 class EnrichResponse(BaseModel):
-    """Response from the TMDB enrichment endpoint."""
+    """Result of an enrich_year job (see the TMDB enrichment endpoint)."""
     search_found: int = 0
     search_not_found: int = 0
     search_skipped: int = 0
@@ -1,19 +1,37 @@
+import asyncio
 import logging
+import random
 from typing import Any
 
 import httpx
 from rapidfuzz import fuzz
 
-import backend.utils.env_reader as env
+from backend.access_external.http_clients import http_clients
 from backend.intake.schemas import SearchResult
 from backend.types.api_schemas import MovieID
 
-TMDB_API_BASE = "https://api.themoviedb.org/3"
-TMDB_HEADERS = {
-    "Authorization": f"Bearer {env.TMDB_API_KEY}",
-    "accept": "application/json",
-}
-
+# * Retries after a 429, each waiting twice as long as the last (or as long
+# * as TMDB's Retry-After says)
+MAX_RETRIES = 4
+FIRST_BACKOFF = 0.5  # seconds
+
+
+async def _tmdb_get(endpoint: str, params: dict[str, Any] | None = None) -> httpx.Response:
+    """GET from the TMDB API, backing off and retrying while it answers 429."""
+    client = http_clients.get("tmdb")
+    attempt = 0
+    while True:
+        response = await client.get(endpoint, params=params)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+        retry_after = response.headers.get("Retry-After", "")
+        delay = (
+            float(retry_after) if retry_after.isdigit()
+            else FIRST_BACKOFF * 2 ** attempt * random.uniform(0.8, 1.2)
+        )
+        logging.warning(f"TMDB rate-limited {endpoint}, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        attempt += 1
 
 async def search_tmdb_movie(title: str, year: int) -> list[dict[str, Any]]:
     """
@@ -21,16 +39,18 @@ async def search_tmdb_movie(title: str, year: int) -> list[dict[str, Any]]:
 
     Returns list of search results.
     """
-    endpoint = f"{TMDB_API_BASE}/search/movie"
+    endpoint = "/search/movie"
     params: dict[str, str | int | bool] = {
         "query": title,
         "year": year,
         "include_adult": False,
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(endpoint, headers=TMDB_HEADERS, params=params)
+    response = await _tmdb_get(endpoint, params)
 
+    if response.status_code == 429:
+        # * Still rate-limited after every retry: an error, not "not found"
+        _ = response.raise_for_status()
     if response.status_code != 200:
         logging.error(f"TMDB search failed: {response.status_code} - {response.text}")
         return []
@@ -43,10 +63,9 @@ async def get_tmdb_movie_details(tmdb_id: int) -> dict[str, Any] | None:
     """
     Get detailed movie info from TMDB including imdb_id, runtime, poster_path.
     """
-    endpoint = f"{TMDB_API_BASE}/movie/{tmdb_id}"
+    endpoint = f"/movie/{tmdb_id}"
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(endpoint, headers=TMDB_HEADERS)
+    response = await _tmdb_get(endpoint)
 
     if response.status_code != 200:
         logging.error(f"TMDB details failed: {response.status_code} - {response.text}")
@@ -3,11 +3,24 @@ from pathlib import Path
 from typing import Any
 
 import sqlalchemy as sa
+import sqlalchemy.orm as orm
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import HTMLResponse
 
-from backend.data.db_connections import Session
+import backend.data.mutations as mu
+import backend.data.versions as versions
+from backend.access_external.http_clients import http_clients
+from backend.data.cache import reference_cache
+from backend.data.db_connections import Session, run_db
 from backend.data.db_schema import Category, KeyDates, Movie, Nomination
+from backend.data.event_hub import event_hub
+from backend.data.tmdb_cache import tmdb_cache
+from backend.data.user_index import user_index
+from backend.data.user_stats import user_stats
+from backend.data.user_stats import verify as verify_user_stats
+from backend.data.writer import writer
+from backend.scheduled_tasks.job_queue import JobStatus, job_queue
+from backend.scheduled_tasks.refresh_queue import refresh_queue
 from backend.types.api_schemas import MovieID
 
 router = APIRouter()
@@ -25,23 +38,26 @@ async def admin_page():
 @router.get("/movies")
 async def get_admin_movies(year: int) -> list[dict[str, Any]]:
     """Get all movies for a year with all fields for admin editing."""
-    with Session() as session:
-        movies = session.execute(
-            sa.select(Movie).where(Movie.year == year).order_by(Movie.title)
-        ).scalars().all()
-        return [
-            {
-                "movie_id": m.movie_id,
-                "year": m.year,
-                "title": m.title,
-                "imdb_id": m.imdb_id,
-                "movie_db_id": m.movie_db_id,
-                "runtime": m.runtime,
-                "poster_path": m.poster_path,
-                "subtitle_position": m.subtitle_position,
-            }
-            for m in movies
-        ]
+    def load() -> list[dict[str, Any]]:
+        with Session() as session:
+            movies = session.execute(
+                sa.select(Movie).where(Movie.year == year).order_by(Movie.title)
+            ).scalars().all()
+            return [
+                {
+                    "movie_id": m.movie_id,
+                    "year": m.year,
+                    "title": m.title,
+                    "imdb_id": m.imdb_id,
+                    "movie_db_id": m.movie_db_id,
+                    "runtime": m.runtime,
+                    "poster_path": m.poster_path,
+                    "subtitle_position": m.subtitle_position,
+                }
+                for m in movies
+            ]
+
+    return await run_db(load)
 
 
 @router.put("/movies/{movie_id}")
@@ -52,16 +68,15 @@ async def update_admin_movie(movie_id: MovieID, data: dict[str, Any]) -> dict[st
     }
     update_data = {k: v for k, v in data.items() if k in allowed_fields}
 
-    with Session() as session:
+    def apply(session: orm.Session) -> dict[str, Any]:
         _ = session.execute(
             sa.update(Movie).where(Movie.movie_id ==
                                    movie_id).values(**update_data)
         )
-        session.commit()
-
         movie = session.execute(
             sa.select(Movie).where(Movie.movie_id == movie_id)
         ).scalar_one()
+        versions.bump(session, movie.year, "movies")
         return {
             "movie_id": movie.movie_id,
             "year": movie.year,
@@ -73,30 +88,40 @@ async def update_admin_movie(movie_id: MovieID, data: dict[str, Any]) -> dict[st
             "subtitle_position": movie.subtitle_position,
         }
 
+    def after_commit(movie: dict[str, Any]) -> None:
+        reference_cache.invalidate(movie["year"])
+        if "runtime" in update_data:
+            user_stats.refresh_movies(movie["year"], [movie["movie_id"]])
+
+    return await writer.write(apply, after_commit)
+
 
 @router.get("/nominations")
 async def get_admin_nominations(year: int) -> list[dict[str, Any]]:
     """Get all nominations for a year with all fields for admin editing."""
-    with Session() as session:
-        nominations = session.execute(
-            sa.select(Nomination, Movie.title, Category.short_name)
-            .join(Movie, Nomination.movie_id == Movie.movie_id)
-            .join(Category, Nomination.category_id == Category.category_id)
-            .where(Nomination.year == year)
-            .order_by(Category.short_name, Movie.title)
-        ).all()
-        return [
-            {
-                "nomination_id": n.nomination_id,
-                "year": n.year,
-                "movie_id": n.movie_id,
-                "movie_title": title,
-                "category_id": n.category_id,
-                "category_name": cat_name,
-                "note": n.note,
-            }
-            for n, title, cat_name in nominations
-        ]
+    def load() -> list[dict[str, Any]]:
+        with Session() as session:
+            nominations = session.execute(
+                sa.select(Nomination, Movie.title, Category.short_name)
+                .join(Movie, Nomination.movie_id == Movie.movie_id)
+                .join(Category, Nomination.category_id == Category.category_id)
+                .where(Nomination.year == year)
+                .order_by(Category.short_name, Movie.title)
+            ).all()
+            return [
+                {
+                    "nomination_id": n.nomination_id,
+                    "year": n.year,
+                    "movie_id": n.movie_id,
+                    "movie_title": title,
+                    "category_id": n.category_id,
+                    "category_name": cat_name,
+                    "note": n.note,
+                }
+                for n, title, cat_name in nominations
+            ]
+
+    return await run_db(load)
 
 
 @router.put("/nominations/{nomination_id}")
@@ -107,13 +132,18 @@ async def update_admin_nomination(
     allowed_fields = {"movie_id", "category_id", "note"}
     update_data = {k: v for k, v in data.items() if k in allowed_fields}
 
-    with Session() as session:
+    def apply(session: orm.Session) -> tuple[dict[str, Any], MovieID]:
+        old_movie_id = session.execute(
+            sa.select(Nomination.movie_id)
+            .where(Nomination.nomination_id == nomination_id)
+        ).scalar_one()
         _ = session.execute(
             sa.update(Nomination)
             .where(Nomination.nomination_id == nomination_id)
             .values(**update_data)
         )
-        session.commit()
+        mu.refresh_movie_flags(
+            session, {old_movie_id, update_data.get("movie_id", old_movie_id)})
 
         result = session.execute(
             sa.select(Nomination, Movie.title, Category.short_name)
@@ -122,6 +152,7 @@ async def update_admin_nomination(
             .where(Nomination.nomination_id == nomination_id)
         ).one()
         n, title, cat_name = result
+        versions.bump(session, n.year, "nominations", "movies")
         return {
             "nomination_id": n.nomination_id,
             "year": n.year,
@@ -130,7 +161,16 @@ async def update_admin_nomination(
             "category_id": n.category_id,
             "category_name": cat_name,
             "note": n.note,
-        }
+        }, old_movie_id
+
+    def after_commit(result: tuple[dict[str, Any], MovieID]) -> None:
+        nomination, old_movie_id = result
+        reference_cache.invalidate(nomination["year"])
+        user_stats.refresh_movies(
+            nomination["year"], {old_movie_id, nomination["movie_id"]})
+
+    nomination, _ = await writer.write(apply, after_commit)
+    return nomination
 
 
 @router.post("/nominations")
@@ -146,13 +186,13 @@ async def create_admin_nomination(data: dict[str, Any]) -> dict[str, Any]:
             status_code=400, detail="year, movie_id, and category_id are required"
         )
 
-    with Session() as session:
+    def apply(session: orm.Session) -> dict[str, Any]:
         new_nom = Nomination(
             year=int(year), movie_id=movie_id, category_id=category_id, note=note
         )
         session.add(new_nom)
-        session.commit()
-        session.refresh(new_nom)
+        session.flush()
+        mu.refresh_movie_flags(session, [movie_id])
 
         result = session.execute(
             sa.select(Nomination, Movie.title, Category.short_name)
@@ -161,6 +201,7 @@ async def create_admin_nomination(data: dict[str, Any]) -> dict[str, Any]:
             .where(Nomination.nomination_id == new_nom.nomination_id)
         ).one()
         n, title, cat_name = result
+        versions.bump(session, n.year, "nominations", "movies")
         return {
             "nomination_id": n.nomination_id,
             "year": n.year,
@@ -171,32 +212,155 @@ async def create_admin_nomination(data: dict[str, Any]) -> dict[str, Any]:
             "note": n.note,
         }
 
+    def after_commit(nomination: dict[str, Any]) -> None:
+        reference_cache.invalidate(nomination["year"])
+        user_stats.refresh_movies(nomination["year"], [nomination["movie_id"]])
+
+    return await writer.write(apply, after_commit)
+
 
 @router.get("/categories")
 async def get_admin_categories() -> list[dict[str, Any]]:
     """Get all categories for dropdowns."""
-    with Session() as session:
-        categories = session.execute(
-            sa.select(Category).order_by(Category.short_name)
-        ).scalars().all()
-        return [
-            {"category_id": c.category_id, "short_name": c.short_name}
-            for c in categories
-        ]
+    def load() -> list[dict[str, Any]]:
+        with Session() as session:
+            categories = session.execute(
+                sa.select(Category).order_by(Category.short_name)
+            ).scalars().all()
+            return [
+                {"category_id": c.category_id, "short_name": c.short_name}
+                for c in categories
+            ]
+
+    return await run_db(load)
+
+
+@router.get("/cache-stats")
+async def get_cache_stats() -> dict[str, Any]:
+    """Hit/miss counters for the in-process reference data cache."""
+    return reference_cache.stats()
+
+
+@router.get("/user-index-stats")
+async def get_user_index_stats() -> dict[str, Any]:
+    """How often the active-user check was answered from memory vs the database."""
+    return user_index.stats()
+
+
+@router.get("/event-hub-stats")
+async def get_event_hub_stats() -> dict[str, Any]:
+    """Live-update subscribers, and how many events reached them or overflowed."""
+    return event_hub.stats()
+
+
+@router.get("/http-stats")
+async def get_http_stats() -> dict[str, Any]:
+    """Per-host request counts and latencies for outgoing HTTP calls."""
+    return http_clients.stats()
+
+
+@router.get("/tmdb-cache-stats")
+async def get_tmdb_cache_stats() -> dict[str, Any]:
+    """Hits, stale hits and misses for the TMDB response cache, and its size."""
+    return await run_db(tmdb_cache.stats)
+
+
+@router.delete("/tmdb-cache")
+async def purge_tmdb_cache(tmdbId: int | None = None) -> dict[str, Any]:
+    """Drop the cached TMDB responses for one movie (by TMDB ID), or all of them."""
+    path = f"/movie/{tmdbId}" if tmdbId is not None else None
+    return {"deleted": await tmdb_cache.purge(path)}
+
+
+@router.post("/rss-poll", status_code=202)
+async def run_rss_poll() -> dict[str, Any]:
+    """Queue the scheduled Letterboxd RSS sync now. Its summary is the job's result."""
+    return await job_queue.submit("rss_sync")
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(data: dict[str, Any]) -> dict[str, Any]:
+    """
+    Queue a background job ({"kind": ..., "params": {...}}; see job_kinds) and
+    return it. An identical job that's still queued or running is returned instead.
+    """
+    try:
+        return await job_queue.submit(data.get("kind", ""), data.get("params"))
+    except ValueError as e:
+        # * pydantic's ValidationError is a ValueError too
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/jobs")
+async def get_jobs(
+    status: JobStatus | None = None, kind: str | None = None, limit: int = 50
+) -> list[dict[str, Any]]:
+    """The most recent background jobs, optionally only those with a status or kind."""
+    return await run_db(job_queue.list_jobs, status, kind, min(limit, 500))
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: int) -> dict[str, Any]:
+    """A background job: its status, progress, and result or error."""
+    job = await run_db(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: int) -> dict[str, Any]:
+    """Cancel a queued or running background job. A finished one is returned as it is."""
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job
+
+
+@router.get("/job-stats")
+async def get_job_stats() -> dict[str, Any]:
+    """Background job counters, and how many jobs there are in each status."""
+    return await run_db(job_queue.stats)
+
+
+@router.get("/refresh-queue-stats")
+async def get_refresh_queue_stats() -> dict[str, Any]:
+    """Background watchlist refreshes: queued, deduplicated, cooling, and how long they waited."""
+    return refresh_queue.stats()
+
+
+@router.get("/writer-stats")
+async def get_writer_stats() -> dict[str, Any]:
+    """Counters for the single database writer (jobs, batches, time spent)."""
+    return writer.stats()
+
+
+@router.post("/user-stats/rebuild")
+async def rebuild_user_stats(year: int) -> dict[str, Any]:
+    """Rebuild the materialized per-user stats for a year and check them against the query."""
+    problems = await run_db(verify_user_stats, year)
+    return {"year": year, "ok": not problems, "mismatches": problems}
 
 
 @router.get("/key-dates")
 async def get_admin_key_dates() -> list[dict[str, Any]]:
     """Get all key dates for admin editing."""
-    with Session() as session:
-        key_dates = session.execute(
-            sa.select(KeyDates).order_by(KeyDates.timestamp)
-        ).scalars().all()
-        return [
-            {"key_date_id": k.key_date_id,
-                "timestamp": k.timestamp, "description": k.description}
-            for k in key_dates
-        ]
+    def load() -> list[dict[str, Any]]:
+        with Session() as session:
+            key_dates = session.execute(
+                sa.select(KeyDates).order_by(KeyDates.timestamp)
+            ).scalars().all()
+            return [
+                {"key_date_id": k.key_date_id,
+                    "timestamp": k.timestamp, "description": k.description}
+                for k in key_dates
+            ]
+
+    return await run_db(load)
+
+
+def _publish_key_date(key_date: dict[str, Any]) -> None:
+    event_hub.publish("keyDates", {"keyDateId": key_date["key_date_id"]})
 
 
 @router.post("/key-dates")
@@ -219,17 +383,18 @@ async def create_admin_key_date(data: dict[str, Any]) -> dict[str, Any]:
         except:
             raise HTTPException(status_code=400, detail="Invalid date format")
 
-    with Session() as session:
+    def apply(session: orm.Session) -> dict[str, Any]:
         new_kd = KeyDates(timestamp=timestamp, description=str(description))
         session.add(new_kd)
-        session.commit()
-        session.refresh(new_kd)
+        session.flush()
         return {
             "key_date_id": new_kd.key_date_id,
             "timestamp": new_kd.timestamp,
             "description": new_kd.description
         }
 
+    return await writer.write(apply, after_commit=_publish_key_date)
+
 
 @router.put("/key-dates/{key_date_id}")
 async def update_admin_key_date(
@@ -255,14 +420,12 @@ async def update_admin_key_date(
     if not updates:
         return {}  # or error
 
-    with Session() as session:
+    def apply(session: orm.Session) -> dict[str, Any]:
         _ = session.execute(
             sa.update(KeyDates)
             .where(KeyDates.key_date_id == key_date_id)
             .values(**updates)
         )
-        session.commit()
-
         kd = session.execute(
             sa.select(KeyDates).where(KeyDates.key_date_id == key_date_id)
         ).scalar_one()
@@ -271,3 +434,5 @@ async def update_admin_key_date(
             "timestamp": kd.timestamp,
             "description": kd.description
         }
+
+    return await writer.write(apply, after_commit=_publish_key_date)
@@ -1,16 +1,28 @@
+import json
 import logging
-from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 
 import backend.data.mutations as mu
 import backend.data.queries as qu
+import backend.data.watchlist_changes as watchlist_changes
 import backend.routing_lib.request_parser as parser
+from backend.data.db_connections import run_db
+from backend.data.versions import GLOBAL_YEAR, VersionedDataset
 from backend.intake.router import router as intake_router
 from backend.routes.admin_routes import router as admin_router
+from backend.routes.events import router as events_router
 from backend.routes.forwarding import router as forwarding_router
 from backend.routes.hooks import router as hooks_router
+from backend.routing_lib.conditional import check_etag, etag_headers
 from backend.routing_lib.error_handling import APIArgumentError
+from backend.routing_lib.fast_json import (
+    PayloadShape,
+    dicts_response,
+    gzipped_json_response,
+    json_response,
+    tuples_response,
+)
 from backend.routing_lib.user_session import UserSession
 from backend.types.api_schemas import (
     CategoryCompletionKey,
@@ -26,6 +38,7 @@ from backend.types.api_schemas import (
     api_Nom,
     api_User,
     api_UserStats,
+    api_WatchlistDelta,
     api_WatchNotice,
     countTypes,
 )
@@ -38,36 +51,50 @@ router.include_router(admin_router, prefix="/admin")
 router.include_router(intake_router, prefix="/admin/intake")
 router.include_router(forwarding_router, prefix="/forward")
 router.include_router(hooks_router, prefix="/hooks")
+router.include_router(events_router, prefix="/events")
 
 
 # Serve data
 @router.get("/years", response_model=list[int])
 async def serve_years() -> list[int]:
-    return qu.get_years()
+    return await run_db(qu.get_years)
 
 
 @router.get("/years/default", response_model=int)
 async def serve_default_year() -> int:
-    available_years = qu.get_years()
+    available_years = await run_db(qu.get_years)
     return max(available_years)
 
 
 @router.get("/nominations", response_model=list[api_Nom])
-async def serve_noms(year: parser.ActiveYear) -> list[dict[str, Primitive]]:
-    return qu.get_noms(year)
+async def serve_noms(
+    request: Request, year: parser.ActiveYear, shape: PayloadShape = "rows"
+) -> Response:
+    etag, not_modified = await check_etag(request, year, ("nominations",), shape)
+    if not_modified is not None:
+        return not_modified
+    noms = await run_db(qu.get_noms, year)
+    response = dicts_response(tuple(api_Nom.model_fields), noms, shape)
+    response.headers.update(etag_headers(etag))
+    return response
 
 
 @router.get("/movies", response_model=list[api_Movie])
 async def serve_movies(
+    request: Request,
+    response: Response,
     year: parser.ActiveYear,
-) -> list[api_Movie]:
-    movies = qu.get_movies(year)
-    return [api_Movie.model_validate(m) for m in movies]
+) -> list[api_Movie] | Response:
+    etag, not_modified = await check_etag(request, year, ("movies",))
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(etag_headers(etag))
+    return await run_db(qu.get_movie_models, year)
 
 
 @router.get("/users", response_model=list[api_User])
 async def serve_users_GET() -> list[dict[str, Primitive]]:
-    return qu.get_users()
+    return await run_db(qu.get_users)
 
 
 @router.get("/users/my_data", response_model=api_MyUserData)
@@ -75,6 +102,19 @@ async def serve_my_user_data(userId: parser.ActiveUserID) -> dict[str, Primitive
     return await qu.get_my_user_data(userId)
 
 
+@router.get("/users/profiles", response_model=list[api_User])
+async def serve_user_profiles(request: Request) -> Response:
+    """Every user's public profile (including profile picture), in one go."""
+    etag, not_modified = await check_etag(request, GLOBAL_YEAR, ("users",))
+    if not_modified is not None:
+        return not_modified
+    response = dicts_response(
+        tuple(api_User.model_fields), await qu.get_user_profiles()
+    )
+    response.headers.update(etag_headers(etag))
+    return response
+
+
 @router.get("/users/profile", response_model=api_User)
 async def serve_user_profile(userId: str) -> dict[str, Primitive]:
     """Get public profile data (including profile picture) for any user."""
@@ -98,7 +138,7 @@ async def serve_users_POST(
             [("body", "literally anything")],
         )
     username = body.get("username")
-    newUserReturn = mu.add_user(username)
+    newUserReturn = await mu.add_user(username)
     newUserId, code = validate_user_id(newUserReturn)
     if code != 0:
         logging.error(
@@ -108,8 +148,8 @@ async def serve_users_POST(
             status_code=500, detail="Ambiguous success state from user creation process"
         )
     UserSession(request).session_added_user()
-    mu.update_user(newUserId, body)
-    newState = qu.get_users()
+    await mu.update_user(newUserId, body)
+    newState = await run_db(qu.get_users)
     return {"userId": newUserId, "users": newState}
 
 
@@ -119,7 +159,7 @@ async def serve_users_PUT(
     userId: parser.ActiveUserID, body: api_MyUserData
 ) -> dict[str, Primitive]:
     # * Expects any dictionary of user data
-    mu.update_user(userId, body.model_dump())
+    await mu.update_user(userId, body.model_dump())
     newState = await qu.get_my_user_data(userId)
     return newState
 
@@ -130,7 +170,7 @@ async def serve_users_DELETE(request: Request) -> list[dict[str, Primitive]]:
     if body is None:
         raise APIArgumentError("No body provided", [
                                ("anythng json-y", "body")])
-    cookie_id = parser.get_active_user_id(request)
+    cookie_id = await run_db(parser.get_active_user_id, request)
     param_id = request.query_params.get("userId")
     body_id = body.get("userId")
     if not (body.get("forRealsies") and body.get("delete")):
@@ -144,50 +184,122 @@ async def serve_users_DELETE(request: Request) -> list[dict[str, Primitive]]:
             [("activeUserId", "cookie"), ("userId", "param"), ("userId", "body")],
         )
     real_id = cookie_id
-    mu.delete_user(real_id)
-    return qu.get_users()
+    await mu.delete_user(real_id)
+    return await run_db(qu.get_users)
 
 
 @router.get("/categories", response_model=list[api_Category])
-async def serve_categories(year: parser.ActiveYear) -> list[dict[str, Primitive]]:
-    return qu.get_categories(year)
+async def serve_categories(
+    request: Request, year: parser.ActiveYear, shape: PayloadShape = "rows"
+) -> Response:
+    # * Which categories are listed depends on the year's nominations
+    etag, not_modified = await check_etag(request, year, ("nominations",), shape)
+    if not_modified is not None:
+        return not_modified
+    categories = await run_db(qu.get_categories, year)
+    response = dicts_response(tuple(api_Category.model_fields), categories, shape)
+    response.headers.update(etag_headers(etag))
+    return response
 
 
 # Expect justMe = bool
 # If PUT, expect movieId and status
 @router.get("/watchlist", response_model=list[api_WatchNotice])
 async def serve_watchlist_GET(
-    request: Request, year: parser.ActiveYear, justMe: bool = False
-):
-    if justMe:
-        userId = parser.get_active_user_id(request)
-        data = qu.get_watchlist(year)
-        data = [row for row in data if row["userId"] == userId]
-        return data
-    else:
-        return qu.get_watchlist(year)
+    request: Request,
+    year: parser.ActiveYear,
+    justMe: bool = False,
+    shape: PayloadShape = "rows",
+) -> Response:
+    userId = await run_db(parser.get_active_user_id, request) if justMe else None
+    etag, not_modified = await check_etag(request, year, ("watchlist",), shape, userId)
+    if not_modified is not None:
+        return not_modified
+    # * Read before the rows: replaying a change the rows already have is harmless
+    cursor = await run_db(watchlist_changes.latest_cursor)
+    rows = await run_db(qu.get_watchlist_rows, year)
+    if userId is not None:
+        rows = [row for row in rows if row[0] == userId]
+    response = tuples_response(qu.WATCHLIST_COLUMNS, rows, shape)
+    response.headers.update(etag_headers(etag))
+    response.headers["X-Watchlist-Cursor"] = str(cursor)
+    return response
+
+
+@router.get("/watchlist/changes", response_model=api_WatchlistDelta)
+async def serve_watchlist_changes(year: parser.ActiveYear, since: int) -> Response:
+    if since < 0:
+        raise APIArgumentError(
+            "since must be a watchlist cursor (>= 0)", malformed_data=[("since", "query params")]
+        )
+    return json_response(await run_db(watchlist_changes.get_changes, year, since))
 
 
-@router.put("/watchlist", response_model=list[api_WatchNotice])
+@router.put("/watchlist", response_model=api_WatchlistDelta)
 async def serve_watchlist_PUT(
-    userId: parser.ActiveUserID, year: parser.BodyYear, body: api_NewWatchlistRequest
-):
+    userId: parser.ActiveUserID,
+    year: parser.BodyYear,
+    body: api_NewWatchlistRequest,
+) -> Response:
     status = body.status
-    for movieId in body.movieIds:
-        mu.add_watchlist_entry(year, userId, movieId, status)
-    return qu.get_watchlist(year)
+    outcomes = await mu.set_watchlist_entries(
+        year, userId, [(movieId, status) for movieId in body.movieIds]
+    )
+    if body.since is not None:
+        # * Everything since the client's cursor, other users' changes included
+        delta = await run_db(watchlist_changes.get_changes, year, body.since)
+    else:
+        # * No cursor to catch up from, so just what this request changed
+        delta = {
+            "year": year,
+            "since": None,
+            "cursor": await run_db(watchlist_changes.latest_cursor),
+            "reset": False,
+            "upserts": [
+                {"userId": userId, "movieId": movieId, "status": status.value}
+                for movieId, outcome in outcomes.items()
+                if outcome in ("added", "updated")
+            ],
+            "deletions": [
+                {"userId": userId, "movieId": movieId}
+                for movieId, outcome in outcomes.items()
+                if outcome == "removed"
+            ],
+        }
+    response = json_response(delta)
+    response.headers["X-Watchlist-Outcomes"] = json.dumps(outcomes)
+    return response
+
+
+# * The stats views are built from everything: who's watched what, the users,
+# * and the movies/nominations they're counted against
+STATS_DATASETS: tuple[VersionedDataset, ...] = (
+    "watchlist", "users", "movies", "nominations"
+)
 
 
 @router.get("/by_user", response_model=list[api_UserStats])
-async def serve_by_user(year: parser.ActiveYear) -> list[dict[str, Primitive]]:
-    return qu.get_user_stats(year)
+async def serve_by_user(
+    request: Request, response: Response, year: parser.ActiveYear
+) -> list[dict[str, Primitive]] | Response:
+    etag, not_modified = await check_etag(request, year, STATS_DATASETS)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(etag_headers(etag))
+    return await run_db(qu.get_user_stats, year)
 
 
 @router.get("/by_category", response_model=dict[UserID, api_CategoryCompletions])
 async def serve_by_category(
+    request: Request,
+    response: Response,
     year: parser.ActiveYear,
-) -> dict[UserID, dict[CategoryCompletionKey, dict[countTypes, int]]]:
-    return qu.get_category_completion_dict(year)
+) -> dict[UserID, dict[CategoryCompletionKey, dict[countTypes, int]]] | Response:
+    etag, not_modified = await check_etag(request, year, STATS_DATASETS)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(etag_headers(etag))
+    return await run_db(qu.get_category_completion_dict, year)
 
 
 @router.post("/log-error")
@@ -199,17 +311,21 @@ async def log_frontend_error(request: Request):
 
 @router.get("/next_key_date")
 async def serve_next_key_date() -> api_NextKeyDate | None:
-    key_dates = qu.get_key_dates()
-    key_dates = sorted(list(key_dates), key=lambda x: x[0])
-    next_date, next_description = None, None
-    for date, description in key_dates:
-        if date > datetime.now():
-            next_date = date
-            next_description = description
-            break
-    if next_date is None:
-        return None
-    return api_NextKeyDate(timestamp=next_date, description=next_description)
+    key_dates = await run_db(qu.get_key_dates)
+    return qu.next_key_date(key_dates)
+
+
+@router.get("/bootstrap")
+async def serve_bootstrap(request: Request, year: int | None = None) -> Response:
+    """
+    Everything the first page load needs in one response (see qu.get_bootstrap),
+    gzipped when the client accepts it. 404 when no year is given and there
+    are no years yet (the client then lets each query fetch for itself).
+    """
+    if year is None and not await run_db(qu.get_years):
+        raise HTTPException(status_code=404, detail="There are no years to bootstrap")
+    data = await run_db(qu.get_bootstrap, year)
+    return gzipped_json_response(request, data)
 
 
 if __name__ == "__main__":
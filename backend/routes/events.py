@@ -0,0 +1,38 @@
+import asyncio
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+import backend.utils.env_reader as env
+from backend.data.event_hub import event_hub
+
+router = APIRouter()
+
+# * How long the browser waits before reconnecting a dropped stream
+RETRY_MS = 5000
+
+
+@router.get("/stream")
+async def serve_event_stream(request: Request) -> StreamingResponse:
+    """
+    Server-sent events for live updates (see backend.data.event_hub).
+    An idle stream gets a comment every SSE_HEARTBEAT_SECONDS, so proxies
+    keep it open and a dead client is noticed.
+    """
+    last_event_id = request.headers.get("last-event-id")
+
+    async def stream():
+        async with event_hub.subscribe(last_event_id) as frames:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            while True:
+                try:
+                    yield await asyncio.wait_for(frames.get(), env.SSE_HEARTBEAT_SECONDS)
+                except TimeoutError:
+                    yield b": ping\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # * X-Accel-Buffering stops nginx from holding events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
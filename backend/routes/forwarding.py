@@ -1,24 +1,18 @@
 import asyncio
-from typing import Any, Literal
+from typing import Literal
 
 import cloudscraper
-import httpx
 from fastapi import APIRouter
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 
-import backend.utils.env_reader as env
 from backend.access_external.get_links import get_Imdb, get_justwatch
-from backend.data.db_connections import Session
+from backend.access_external.http_clients import http_clients
+from backend.data.db_connections import Session, run_db
 from backend.data.db_schema import Movie
+from backend.data.tmdb_cache import tmdb_cache
 from backend.routing_lib.error_handling import APIArgumentError
 from backend.types.api_schemas import MovieID, Primitive, api_MovieDbRequest
 
-TMDB_API_BASE = "https://api.themoviedb.org/3"
-TMDB_HEADERS = {
-    "Authorization": f"Bearer {env.TMDB_API_KEY}",
-    "accept": "application/json",
-}
-
 router = APIRouter()
 
 # Reusable cloudscraper instance for Cloudflare-protected sites
@@ -51,17 +45,20 @@ async def serve_get_link(id: MovieID, service: Literal["justwatch", "imdb"]) ->
     """
     Returns a link to the service for the given movie_id and service.
     """
-    with Session() as session:
-        movie = (
-            session.query(Movie.movie_db_id, Movie.movie_id)
-            .filter(Movie.movie_id == id)
-            .first()
-        )
-        if movie is None:
-            raise APIArgumentError(
-                f"Movie not found: {id}", [("movie_id", "query params")]
+    def load():
+        with Session() as session:
+            return (
+                session.query(Movie.movie_db_id, Movie.movie_id)
+                .filter(Movie.movie_id == id)
+                .first()
             )
-        id_number = int(movie[0])
+
+    movie = await run_db(load)
+    if movie is None:
+        raise APIArgumentError(
+            f"Movie not found: {id}", [("movie_id", "query params")]
+        )
+    id_number = int(movie[0])
     if service == "justwatch":
         url, code = await get_justwatch(id_number)
         if code == 1:
@@ -76,49 +73,44 @@ async def serve_moviedb(request: api_MovieDbRequest) -> HTMLResponse:
     """
     Just a proxy for moviedb.org
     """
-    url = "https://www.moviedb.org/"
-    async with httpx.AsyncClient() as client:
-        response = (
-            await client.get(f"{TMDB_API_BASE}/{request.endpoint}",
-                             params=request.params,
-                             headers=TMDB_HEADERS,
-                             )
-        ).raise_for_status()
+    response = (
+        await http_clients.get("tmdb").get(f"/{request.endpoint}", params=request.params)
+    ).raise_for_status()
     return HTMLResponse(content=response.json())
 
 
 @router.get("/tmdb/movie/{tmdb_id}")
-async def get_tmdb_movie(tmdb_id: int) -> dict[str, Any]:
+async def get_tmdb_movie(tmdb_id: int) -> Response:
     """
     Proxy for TMDB movie details API.
     Returns movie details including overview, genres, cast, crew, etc.
+    Served from the TMDB cache (see backend/data/tmdb_cache.py).
     """
-    endpoint = f"{TMDB_API_BASE}/movie/{tmdb_id}"
-    params = {"append_to_response": "credits,watch/providers"}
-    async with httpx.AsyncClient() as client:
-        response = (await client.get(endpoint, headers=TMDB_HEADERS, params=params)).\
-            raise_for_status()
-    return response.json()
+    body = await tmdb_cache.get(f"/movie/{tmdb_id}", ("credits", "watch/providers"))
+    return Response(body, media_type="application/json")
 
 
 @router.get("/tmdb/movie/by_movie_id/{movie_id}")
-async def get_tmdb_movie_by_movie_id(movie_id: MovieID) -> dict[str, Any]:
+async def get_tmdb_movie_by_movie_id(movie_id: MovieID) -> Response:
     """
     Proxy for TMDB movie details API, accepting our internal movie_id.
     Looks up the TMDB ID from the database, then fetches from TMDB.
     """
-    with Session() as session:
-        movie = (
-            session.query(Movie.movie_db_id)
-            .filter(Movie.movie_id == movie_id)
-            .first()
-        )
-        if movie is None:
-            raise APIArgumentError(f"Movie not found: {movie_id}", [
-                                   ("movie_id", "path")])
-        if movie[0] is None:
-            raise APIArgumentError(
-                f"Movie {movie_id} has no TMDB ID", [("movie_id", "path")]
+    def load():
+        with Session() as session:
+            return (
+                session.query(Movie.movie_db_id)
+                .filter(Movie.movie_id == movie_id)
+                .first()
             )
-        tmdb_id = int(movie[0])
+
+    movie = await run_db(load)
+    if movie is None:
+        raise APIArgumentError(f"Movie not found: {movie_id}", [
+                               ("movie_id", "path")])
+    if movie[0] is None:
+        raise APIArgumentError(
+            f"Movie {movie_id} has no TMDB ID", [("movie_id", "path")]
+        )
+    tmdb_id = int(movie[0])
     return await get_tmdb_movie(tmdb_id)
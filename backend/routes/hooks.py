@@ -2,28 +2,25 @@ import logging
 
 from fastapi import APIRouter
 
-import backend.data.mutations as mu
-import backend.utils.stuff as stuff
 from backend.routing_lib import request_parser as parser
-from backend.scheduled_tasks.check_rss import get_movie_list_from_rss
+from backend.scheduled_tasks.refresh_queue import refresh_queue
 from backend.types.api_schemas import Primitive
-from backend.types.my_types import *
 
 router = APIRouter()
 
+_MESSAGES = {
+    "queued": "Watchlist refresh started",
+    "pending": "Watchlist refresh already in progress",
+    "cooling": "Watchlist was refreshed moments ago",
+}
+
 
 @router.get("/force-refresh")
 async def force_refresh(user_id: parser.ActiveUserID) -> dict[str, Primitive]:
+    """
+    Queues a full read of the user's Letterboxd feed and returns right away.
+    A "refreshed" event on the event stream says when it's done.
+    """
     logging.info("got a force refresh")
-    year = stuff.current_year()
-    movie_list = await get_movie_list_from_rss(user_id, year)
-    for movie_id in movie_list:
-        logging.debug(f"Got {movie_id} from {user_id}'s letterboxd.")
-        mu.add_watchlist_entry(
-            year=year,
-            userId=user_id,
-            movieId=movie_id,
-            status=WatchStatus.SEEN,
-        )
-    total_new_entries = len(movie_list)
-    return {"message": "Watchlist updated", "foundEntries": total_new_entries}
+    status = refresh_queue.request(user_id, "forced")
+    return {"message": _MESSAGES[status], "status": status}
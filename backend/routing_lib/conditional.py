@@ -0,0 +1,48 @@
+"""
+Conditional GETs for the year-scoped routes, driven by backend.data.versions.
+
+    etag, not_modified = await check_etag(request, year, ("watchlist",), shape)
+    if not_modified is not None:
+        return not_modified
+    ...
+    response.headers.update(etag_headers(etag))
+"""
+
+from collections.abc import Iterable
+
+from fastapi import Request, Response
+
+import backend.data.versions as versions
+from backend.data.versions import VersionedDataset
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    # * no-cache means "revalidate every time", not "don't store"
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # * GET compares weakly, so W/"x" matches "x"
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+async def check_etag(
+    request: Request,
+    year: int,
+    datasets: Iterable[VersionedDataset],
+    *extra: object,
+) -> tuple[str, Response | None]:
+    """
+    Returns the ETag for this route's response, and a ready 304 if the client
+    already has it. `extra` is whatever else the body depends on.
+    """
+    # * From memory, no query; see backend.data.versions
+    etag = versions.etag(year, datasets, request.url.path, *extra)
+    if etag_matches(request, etag):
+        return etag, Response(status_code=304, headers=etag_headers(etag))
+    return etag, None
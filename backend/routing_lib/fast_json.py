@@ -0,0 +1,64 @@
+"""
+Fast JSON for the big list endpoints.
+
+Returning a list of dicts from a route makes FastAPI validate every row against
+response_model again and then run it through jsonable_encoder and json.dumps.
+For data that came straight out of our own database that's all overhead, so
+these helpers encode rows with orjson and hand back a finished Response.
+(Keep response_model on the route anyway; it still documents the shape.)
+
+Clients can ask for ?shape=columnar to get one array per field instead of one
+object per row: {"userId": [...], "movieId": [...], "status": [...]}.
+"""
+
+import gzip
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Any, Literal
+
+import orjson
+from fastapi import Request, Response
+
+type PayloadShape = Literal["rows", "columnar"]
+
+# * Level 6 gets nearly all of level 9's savings on JSON at a fraction of the CPU
+GZIP_LEVEL = 6
+
+
+def tuples_response(
+    columns: Sequence[str], rows: Iterable[Sequence[Any]], shape: PayloadShape = "rows"
+) -> Response:
+    """Rows as tuples (e.g. Result.tuples()), in the order of `columns`."""
+    if shape == "columnar":
+        rows = list(rows)
+        payload: Any = {
+            column: [row[i] for row in rows] for i, column in enumerate(columns)
+        }
+    else:
+        payload = [dict(zip(columns, row)) for row in rows]
+    return Response(orjson.dumps(payload), media_type="application/json")
+
+
+def dicts_response(
+    columns: Sequence[str], rows: Sequence[Mapping[str, Any]], shape: PayloadShape = "rows"
+) -> Response:
+    """Rows that are already dicts (e.g. from the reference cache)."""
+    if shape == "columnar":
+        payload: Any = {column: [row[column] for row in rows] for column in columns}
+    else:
+        payload = rows
+    return Response(orjson.dumps(payload), media_type="application/json")
+
+
+def json_response(payload: Any) -> Response:
+    """Any other JSON document (small ones; see gzipped_json_response for big ones)."""
+    return Response(orjson.dumps(payload), media_type="application/json")
+
+
+def gzipped_json_response(request: Request, payload: Any) -> Response:
+    """One JSON document, gzipped if the client says it can take it."""
+    body = orjson.dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
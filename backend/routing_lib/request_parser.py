@@ -3,7 +3,7 @@ from typing import Annotated, Type, TypeVar, cast
 
 from fastapi import Depends, HTTPException, Request
 
-import backend.data.queries as qu
+from backend.data.user_index import user_index
 from backend.routing_lib.error_handling import APIArgumentError, YearError
 from backend.types.api_schemas import UserID
 from backend.types.api_validators import validate_user_id
@@ -30,8 +30,7 @@ def get_active_user_id(request: Request) -> UserID:
             f"Got a request to {request.url}[{request.method}] that needs an active user, but value {active_user_id} is invalid"
         )
         raise APIArgumentError("Invalid active user id", [("activeUserId", "cookie")])
-    users = qu.get_users()
-    if id not in [user["id"] for user in users]:
+    if not user_index.exists(id):
         logging.error(
             f"Got a request to {request.url}[{request.method}] with active user {active_user_id}, which IS valid per se, but is NOT in my database"
         )
@@ -6,7 +6,7 @@ from typing import override
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 
-from backend.scheduled_tasks.check_rss import update_user_watchlist
+from backend.scheduled_tasks.refresh_queue import refresh_queue
 from backend.types.api_schemas import UserID
 from backend.types.api_validators import validate_user_id
 
@@ -83,7 +83,8 @@ class SessionMiddleware(BaseHTTPMiddleware):
             session.log_activity()
         else:
             session.start_new(id)
-        # Is it time to update the user's watchlist?
+        # Is it time to update the user's watchlist? It happens in the background;
+        # the client hears about new entries from the event stream
         if session.is_time_to_update():
-            _ = await update_user_watchlist(id)
+            _ = refresh_queue.request(id, "session")
         return await call_next(request)
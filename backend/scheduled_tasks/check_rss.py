@@ -1,73 +1,147 @@
+"""
+Syncing watchlists from Letterboxd RSS feeds.
+
+The sync is incremental. Each user row keeps the feed's ETag and
+Last-Modified from the last successful check, and when that was
+(last_letterboxd_check, UTC). The next check sends them back as
+If-None-Match / If-Modified-Since. A 304 costs one small response and no
+parsing or database work at all. A changed feed is streamed item by item
+(newest first) and reading stops at the first item published before the
+last check, so only what's new gets parsed, matched and written.
+
+Each check also stores a key for the TMDB index it matched items against
+(rss_index_key). Items whose movie wasn't in the index were skipped, and the
+cutoff would hide them for good, so when the index has changed since
+(enrichment finding TMDB IDs, an admin edit), the next check reads the whole
+feed unconditionally.
+
+The force-refresh route still reads the whole feed, unconditionally. Both
+single-user kinds of refresh run in the background, through refresh_queue.
+"""
+
+import asyncio
+import hashlib
 import logging
-from datetime import datetime
+import time
+from collections.abc import Callable, Mapping
+from datetime import UTC, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+from typing import Any, NamedTuple
 
-import httpx
-import pandas as pd
-from bs4 import BeautifulSoup
+import sqlalchemy as sa
+# * etree is a compiled module, so pyright can't see it without lxml-stubs
+from lxml import etree  # pyright: ignore[reportAttributeAccessIssue]
 
 import backend.data.mutations as mu
 import backend.data.queries as qu
+import backend.utils.env_reader as env
+from backend.access_external.http_clients import TokenBucket, http_clients
+from backend.data.db_connections import Session, run_db
+from backend.data.db_schema import User
 from backend.types.api_schemas import MovieID, UserID
 from backend.types.my_types import MovieDbID, WatchStatus
 
+_TMDB_NS = "https://themoviedb.org"
+
+# * Items published this long before the last check are read again, in case
+# * Letterboxd's clock and ours disagree; re-marking a movie seen is a no-op
+CUTOFF_SLACK = timedelta(minutes=10)
+
+# * One per host, spacing out the requests we send it by RSS_POLITENESS_MS
+_pacers: dict[str, TokenBucket] = {}
+
+
+class Feed(NamedTuple):
+    """An RSS response. body is None if the feed hasn't changed (a 304)."""
+    body: bytes | None
+    etag: str | None
+    last_modified: str | None
+
 
-async def update_user_watchlist(user_id: UserID) -> bool:
+def _watch_year() -> int:
+    """The year whose watchlist an RSS sync fills in."""
+    return datetime.now().year - 1
+
+
+def _index_key(by_tmdb_id: Mapping[MovieDbID, MovieID]) -> str:
+    """Changes whenever the index does, e.g. when a movie gets its TMDB ID."""
+    digest = hashlib.blake2b(digest_size=8)
+    for tmdb_id, movie_id in sorted(by_tmdb_id.items()):
+        digest.update(f"{tmdb_id}={movie_id},".encode())
+    return digest.hexdigest()
+
+
+def _utcnow() -> datetime:
+    """Naive UTC, the way last_letterboxd_check is stored."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+async def _pace(host: str) -> None:
+    if env.RSS_POLITENESS_MS <= 0:
+        return
+    if host not in _pacers:
+        _pacers[host] = TokenBucket(1000 / env.RSS_POLITENESS_MS, burst=1)
+    _ = await _pacers[host].acquire()
+
+
+async def fetch_rss(
+    account: str, etag: str | None = None, last_modified: str | None = None
+) -> Feed:
     """
-    For a given user, check their letterboxd rss for relevant movies
-    and update their watchlist.
-    Also updates the last_check timestamp to only check for new movies.
+    Fetches the account's RSS feed, conditionally if given the validators
+    from last time. Raises httpx errors if Letterboxd doesn't answer (within
+    RSS_TIMEOUT_SECONDS) or answers with an error.
+    """
+    client = http_clients.get("letterboxd")
+    headers: dict[str, str] = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    await _pace(client.base_url.host)
+    response = await client.get(
+        f"/{account}/rss/", headers=headers, timeout=env.RSS_TIMEOUT_SECONDS
+    )
+    if response.status_code == 304:
+        return Feed(None, etag, last_modified)
+    _ = response.raise_for_status()
+    return Feed(
+        response.content,
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+    )
 
-    Returns: True if new movies were found, False otherwise.
+
+def parse_rss(body: bytes, cutoff: datetime | None = None) -> list[MovieDbID]:
+    """
+    The TMDB IDs in the feed, newest first, streamed with iterparse.
+    With a cutoff (naive UTC), stops at the first item published before it;
+    Letterboxd lists items newest first, so everything after is older still.
     """
-    current_year = datetime.now().year - 1
-    idlist = await get_movie_list_from_rss(user_id, current_year)
-    # * add to watchlist
-    for id in idlist:
-        logging.debug(f"Adding {id} to watchlist for {user_id}")
-        mu.add_watchlist_entry(current_year, user_id, id,
-                               WatchStatus(WatchStatus.SEEN))
-    if len(idlist) > 0:
-        return True
-    return False
-
-
-async def fetch_rss(account: str) -> BeautifulSoup:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"https://letterboxd.com/{account}/rss/")
-    # * Uncomment for debugging
-    # with open(
-    #     pathlib.Path(__file__).parent.parent.parent / "fyi" / "rss_debug.xml",
-    #     "w",
-    #     encoding="utf-8",
-    # ) as f:
-    #     f.write(response.text)
-    soup = BeautifulSoup(response.text, "lxml-xml")
-    return soup
-
-
-def parse_rss(
-    soup: BeautifulSoup, cutoff: pd.Timestamp = pd.Timestamp.min
-) -> list[MovieDbID]:
-    items = soup.find_all("item")
-    logging.debug(f"Found {len(items)} items in the RSS feed.")
     movie_ids: list[MovieDbID] = []
-    for item in items:
-        # pubDate = pd.Timestamp(item.find("pubDate").text).tz_convert("UTC")
-        # if pubDate < pd.Timestamp(cutoff):
-        #     break
-        movie_id_block = item.find("tmdb:movieId")
-        if movie_id_block is None:
-            logging.warning(f"No movie ID found in item: {str(item)[:100]}")
-            continue
-        movie_id = movie_id_block.text
-        movie_ids.append(int(movie_id))
+    items = 0
+    for _, item in etree.iterparse(BytesIO(body), events=("end",), tag="item"):
+        items += 1
+        if cutoff is not None:
+            published = item.findtext("pubDate")
+            if published and parsedate_to_datetime(published).astimezone(UTC).replace(tzinfo=None) < cutoff:
+                break
+        movie_id = item.findtext(f"{{{_TMDB_NS}}}movieId")
+        if movie_id is None:
+            logging.warning(f"No movie ID found in item: {item.findtext('title')}")
+        else:
+            movie_ids.append(int(movie_id))
+        # * Nothing needs the item once it's read
+        item.clear()
+    logging.debug(f"Read {items} items from the RSS feed, {len(movie_ids)} with movie IDs.")
     return movie_ids
 
 
 async def get_movie_list_from_rss(user_id: UserID, year: int) -> list[MovieID]:
     """
     For a given user, check their letterboxd rss for relevant movies
-    and return a list of movies.
+    and return a list of movies. Reads the whole feed, ignoring the last check.
 
     Returns: A list of movies ids (e.g. mov_123aef).
     """
@@ -76,26 +150,140 @@ async def get_movie_list_from_rss(user_id: UserID, year: int) -> list[MovieID]:
     if account is None:
         return []
     # * fetch the data
-    soup = await fetch_rss(account)
-    mdb_id_list = parse_rss(soup)
-    logging.debug(
-        f"While checking RSS for {user_id}, found {len(mdb_id_list)} movie IDs listed on the page."
-        f"For example: {mdb_id_list[:3]}"
-    )
+    feed = await fetch_rss(account)
+    assert feed.body is not None
+    mdb_id_list = await asyncio.to_thread(parse_rss, feed.body)
     # * identify the movies
-    movies = qu.get_movies(year)
-    sample_data: list[list[MovieID | None]] = [
-        [m.movie_id, m.movie_db_id] for m in movies[:3]]
-    sample_strings = [f"{x[0]}: {type(x[1])} {x[1]}" for x in sample_data]
-    logging.debug(
-        f"The movie data has tmdb ids like {', '.join(sample_strings)}")
-    my_id_list = [
-        movie.movie_id
-        for movie in movies
-        if movie.movie_db_id is not None and int(movie.movie_db_id) in mdb_id_list
-    ]
+    by_tmdb_id = await run_db(qu.get_tmdb_index, year)
+    my_id_list = list(dict.fromkeys(
+        by_tmdb_id[tmdb_id] for tmdb_id in mdb_id_list if tmdb_id in by_tmdb_id
+    ))
     logging.debug(
         f"Of those {len(mdb_id_list)} movie IDs listed on the page, {len(my_id_list)} matched movies in my database."
     )
     # movie_id is already validated by the ORM TypeDecorator
     return my_id_list
+
+
+async def poll_all_users(
+    user_ids: list[UserID] | None = None,
+    year: int | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> dict[str, Any]:
+    """
+    The scheduled RSS sync: checks the feed of every user with a Letterboxd
+    handle (or just of `user_ids`), RSS_POLL_CONCURRENCY at a time, and marks
+    the movies they've logged since the last check as seen in `year` (by
+    default last year).
+    One user's feed failing doesn't stop the others; it's counted and logged,
+    and that user's last check stays where it was.
+    on_progress(done, total) is called as each user's check finishes.
+    Returns a summary of the run, which is also logged.
+    """
+    start = time.perf_counter()
+    year = year if year is not None else _watch_year()
+
+    def load_users() -> list[tuple[UserID, str | None, datetime | None, str | None, str | None, str | None]]:
+        with Session() as session:
+            query = sa.select(
+                User.user_id,
+                User.letterboxd,
+                User.last_letterboxd_check,
+                User.rss_etag,
+                User.rss_last_modified,
+                User.rss_index_key,
+            ).where(User.letterboxd.isnot(None), User.letterboxd != "")
+            if user_ids is not None:
+                query = query.where(User.user_id.in_(user_ids))
+            return list(session.execute(query).tuples())
+
+    users = await run_db(load_users)
+    # * One index for every feed in the run (and cached across runs)
+    by_tmdb_id = await run_db(qu.get_tmdb_index, year)
+    current_index_key = _index_key(by_tmdb_id)
+    limit = asyncio.Semaphore(max(1, env.RSS_POLL_CONCURRENCY))
+    # * Saved together at the end, in one write
+    checks: list[dict[str, Any]] = []
+    summary: dict[str, Any] = {
+        "year": year,
+        "users": len(users),
+        "checked": 0,
+        "unchanged": 0,
+        "new_entries": 0,
+        "failures": 0,
+        "failed_users": [],
+    }
+
+    async def poll(
+        user_id: UserID,
+        account: str | None,
+        last_check: datetime | None,
+        etag: str | None,
+        last_modified: str | None,
+        index_key: str | None,
+    ) -> None:
+        # * load_users only loads users with a handle
+        assert account is not None
+        try:
+            await check(user_id, account, last_check, etag, last_modified, index_key)
+        finally:
+            if on_progress is not None:
+                on_progress(summary["checked"] + summary["failures"], len(users))
+
+    async def check(
+        user_id: UserID,
+        account: str,
+        last_check: datetime | None,
+        etag: str | None,
+        last_modified: str | None,
+        index_key: str | None,
+    ) -> None:
+        checked_at = _utcnow()
+        if index_key != current_index_key:
+            # * What the last check couldn't match may match now; a 304 or the
+            # * cutoff would skip it
+            last_check, etag, last_modified = None, None, None
+        try:
+            async with limit:
+                feed = await fetch_rss(account, etag, last_modified)
+            if feed.body is None:
+                # * Nothing new since last_check, so there's nothing to move forward
+                summary["checked"] += 1
+                summary["unchanged"] += 1
+                return
+            cutoff = last_check - CUTOFF_SLACK if last_check is not None else None
+            tmdb_ids = await asyncio.to_thread(parse_rss, feed.body, cutoff)
+            movie_ids = {by_tmdb_id[tmdb_id] for tmdb_id in tmdb_ids if tmdb_id in by_tmdb_id}
+            outcomes = await mu.set_watchlist_entries(
+                year, user_id, [(movie_id, WatchStatus.SEEN) for movie_id in movie_ids]
+            )
+        except Exception as e:
+            logging.warning(f"RSS check failed for {user_id} ({account}): {e!r}")
+            summary["failures"] += 1
+            summary["failed_users"].append(user_id)
+            return
+        checks.append({
+            "user_id": user_id,
+            "last_letterboxd_check": checked_at,
+            "rss_etag": feed.etag,
+            "rss_last_modified": feed.last_modified,
+            "rss_index_key": current_index_key,
+        })
+        summary["checked"] += 1
+        if not tmdb_ids:
+            summary["unchanged"] += 1
+        summary["new_entries"] += sum(
+            outcome in ("added", "updated") for outcome in outcomes.values()
+        )
+
+    _ = await asyncio.gather(*(poll(*user) for user in users))
+    await mu.record_rss_checks(checks)
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    # * A single user's check happens at every session start; keep those quiet
+    log = logging.info if user_ids is None else logging.debug
+    log(
+        f"RSS poll for {year}: checked {summary['checked']}/{summary['users']} users "
+        f"({summary['unchanged']} unchanged), {summary['new_entries']} new entries, "
+        f"{summary['failures']} failures, in {summary['seconds']}s"
+    )
+    return summary
@@ -0,0 +1,76 @@
+"""
+The kinds of background job there are (see job_queue), with their params.
+
+    enrich_year         EnrichRequest: TMDB search + hydrate for a year's movies
+    rss_sync            a Letterboxd RSS sync, of everyone or of some users
+    backup              a copy of the database into BACKUPS_PATH
+    propic_refresh      Letterboxd profile pictures that are due a refresh
+    nominations_import  NominationPreviewRequest; run once only, since trying
+                        again after a commit would import everything twice
+"""
+
+import asyncio
+from typing import Any
+
+from pydantic import BaseModel
+
+import backend.data.propics as propics
+from backend.intake.router import import_nominations, run_enrichment
+from backend.intake.schemas import EnrichRequest, NominationPreviewRequest
+from backend.scheduled_tasks.check_rss import poll_all_users
+from backend.scheduled_tasks.job_queue import JobKind, Progress
+from backend.scheduled_tasks.scheduling import backup_database
+from backend.types.api_schemas import UserID
+
+
+class RssSyncParams(BaseModel):
+    """Everyone with a Letterboxd handle, unless user_ids is given."""
+    user_ids: list[UserID] | None = None
+    year: int | None = None
+
+
+class PropicRefreshParams(BaseModel):
+    """Everyone whose picture is stale, unless user_ids is given."""
+    user_ids: list[UserID] | None = None
+
+
+class NoParams(BaseModel):
+    pass
+
+
+async def enrich_year(params: EnrichRequest, progress: Progress) -> dict[str, Any]:
+    progress.set(0, note=f"Enriching {params.year}")
+    response = await run_enrichment(params, on_progress=progress.set)
+    return response.model_dump(mode="json")
+
+
+async def rss_sync(params: RssSyncParams, progress: Progress) -> dict[str, Any]:
+    summary = await poll_all_users(params.user_ids, params.year, on_progress=progress.set)
+    # * Some feeds failing is normal; all of them failing means Letterboxd is
+    # * down (or we are), which is worth another try
+    if summary["users"] and summary["failures"] == summary["users"]:
+        raise RuntimeError(f"Every RSS check failed ({summary['users']} users)")
+    return summary
+
+
+async def backup(params: NoParams, progress: Progress) -> dict[str, Any]:
+    path = await asyncio.to_thread(backup_database)
+    return {"path": str(path)}
+
+
+async def propic_refresh(params: PropicRefreshParams, progress: Progress) -> dict[str, Any]:
+    return {"changed": await propics.refresh(params.user_ids)}
+
+
+async def nominations_import(params: NominationPreviewRequest, progress: Progress) -> dict[str, Any]:
+    response = await import_nominations(params)
+    return response.model_dump(mode="json")
+
+
+JOB_KINDS: dict[str, JobKind] = {
+    "enrich_year": JobKind(EnrichRequest, enrich_year),
+    "rss_sync": JobKind(RssSyncParams, rss_sync),
+    "backup": JobKind(NoParams, backup),
+    "propic_refresh": JobKind(PropicRefreshParams, propic_refresh, max_attempts=2),
+    "nominations_import": JobKind(NominationPreviewRequest, nominations_import, max_attempts=1),
+}
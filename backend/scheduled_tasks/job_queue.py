@@ -0,0 +1,469 @@
+"""
+The background job queue, for slow work that shouldn't hold up a request or
+run as a bare APScheduler job: enriching a year from TMDB, RSS syncs,
+backups, propic refreshes, nomination imports (see job_kinds.JOB_KINDS).
+
+Jobs are rows in the jobs table, so they outlive a restart. submit() writes
+one and returns; JOB_WORKERS workers on the event loop claim them in order
+and run them. Submitting a job identical (same kind and params) to one still
+queued or running returns that one instead.
+
+    queued -> running -> succeeded | failed | cancelled
+                      -> queued, after a failure with attempts left, to run
+                         again in JOB_RETRY_BASE_SECONDS * 2^(attempts - 1)
+    queued -> cancelled
+
+A running job reports how far along it is through its Progress; that's
+written along with a heartbeat every JOB_HEARTBEAT_SECONDS. A running job
+whose heartbeat is more than STALE_HEARTBEATS beats old belongs to a process
+that's gone, and is picked up again (as a failed attempt). Jobs interrupted
+by a clean shutdown go back in the queue without losing an attempt, except
+kinds that only run once (max_attempts=1): they may have committed already,
+so they fail instead.
+
+Cancelling a running job cancels its task at the next await; work it has
+handed to a thread (the backup's copy) finishes anyway. Finished jobs are
+deleted after JOB_RETENTION_DAYS.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from typing import Any, Literal, NamedTuple
+
+import orjson
+import sqlalchemy as sa
+import sqlalchemy.orm as orm
+from pydantic import BaseModel
+
+import backend.utils.env_reader as env
+from backend.data.db_connections import Session
+from backend.data.db_schema import Job
+from backend.data.writer import writer
+
+type JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+type JobCounter = Literal[
+    "submitted", "deduplicated", "claimed", "succeeded", "retried", "failed",
+    "cancelled", "recovered", "requeued_on_shutdown", "purged", "worker_errors",
+]
+
+ACTIVE: tuple[JobStatus, ...] = ("queued", "running")
+
+# * Heartbeats a running job can miss before it's taken to be orphaned
+STALE_HEARTBEATS = 6
+MAX_BACKOFF = timedelta(hours=1)
+
+# * Tells this process's jobs apart in the logs
+_OWNER = f"{os.getpid()}"
+
+
+class Progress:
+    """
+    How far along a running job is. Cheap to update as often as you like;
+    it's saved with the next heartbeat.
+    """
+    __slots__ = ("done", "total", "note")
+
+    def __init__(self):
+        self.done = 0
+        self.total: int | None = None
+        self.note: str | None = None
+
+    def set(self, done: int, total: int | None = None, note: str | None = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+        if note is not None:
+            self.note = note
+
+
+class JobFailed(Exception):
+    """Raised by a job for a failure that trying again won't fix; it isn't retried."""
+
+
+class JobKind(NamedTuple):
+    """
+    A type of job: the model its params are validated with, and the coroutine
+    that runs it, which returns something JSON-serializable (saved as the
+    job's result) and raises to fail the attempt (JobFailed to fail the job).
+    """
+    params: type[BaseModel]
+    run: Callable[[Any, Progress], Awaitable[Any]]
+    max_attempts: int = 3
+
+
+def _dumps(value: Any) -> bytes:
+    # * Sorted, so identical params are identical bytes (that's how duplicates are found)
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+
+
+def _info(job: Job) -> dict[str, Any]:
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": orjson.loads(job.params),
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress": {
+            "done": job.progress_done,
+            "total": job.progress_total,
+            "note": job.progress_note,
+        },
+        "cancel_requested": job.cancel_requested,
+        "result": orjson.loads(job.result) if job.result is not None else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "run_after": job.run_after,
+        "started_at": job.started_at,
+        "heartbeat_at": job.heartbeat_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class JobQueue:
+    def __init__(self):
+        self.kinds: dict[str, JobKind] = {}
+        self._workers: list[asyncio.Task[None]] = []
+        self._wake: asyncio.Event | None = None
+        # * job_id -> the worker task running it, and which of those were cancelled on purpose
+        self._running: dict[int, asyncio.Task[None]] = {}
+        self._cancelling: set[int] = set()
+        self._closing = False
+        self._swept_at = 0.0
+        self.counters: Counter[JobCounter] = Counter()
+
+    # * Lifecycle
+
+    async def start(self, kinds: dict[str, JobKind]) -> None:
+        """Recovers what an earlier process left running, then starts the workers."""
+        self.kinds = kinds
+        self._closing = False
+        self._wake = asyncio.Event()
+        await self._sweep()
+        loop = asyncio.get_running_loop()
+        self._workers = [
+            loop.create_task(self._work(), name=f"job-worker-{n}")
+            for n in range(max(1, env.JOB_WORKERS))
+        ]
+
+    async def close(self) -> None:
+        """
+        Stops the workers. Jobs they were running go back in the queue, or
+        fail if they only run once.
+        """
+        self._closing = True
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            _ = worker.cancel()
+        _ = await asyncio.gather(*workers, return_exceptions=True)
+
+    # * Submitting and managing jobs
+
+    async def submit(self, kind: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        Queues a job and returns it (or the identical job that's already
+        queued or running). Raises ValueError for an unknown kind and
+        pydantic's ValidationError for bad params.
+        """
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind {kind!r}; expected one of {sorted(self.kinds)}")
+        job_kind = self.kinds[kind]
+        encoded = _dumps(job_kind.params.model_validate(params or {}).model_dump(mode="json"))
+
+        def work(session: orm.Session) -> tuple[dict[str, Any], bool]:
+            existing = session.execute(
+                sa.select(Job)
+                .where(Job.kind == kind, Job.params == encoded, Job.status.in_(ACTIVE))
+                .limit(1)
+            ).scalar_one_or_none()
+            if existing is not None:
+                return _info(existing), False
+            now = datetime.now()
+            job = Job(
+                kind=kind,
+                params=encoded,
+                status="queued",
+                attempts=0,
+                max_attempts=job_kind.max_attempts,
+                progress_done=0,
+                cancel_requested=False,
+                run_after=now,
+                created_at=now,
+            )
+            session.add(job)
+            session.flush()
+            return _info(job), True
+
+        info, created = await writer.write(work)
+        self.counters["submitted" if created else "deduplicated"] += 1
+        if created and self._wake is not None:
+            self._wake.set()
+        return info
+
+    def get(self, job_id: int) -> dict[str, Any] | None:
+        with Session() as session:
+            job = session.get(Job, job_id)
+            return _info(job) if job is not None else None
+
+    def list_jobs(self, status: JobStatus | None = None, kind: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+        """The most recent jobs first."""
+        query = sa.select(Job).order_by(Job.job_id.desc()).limit(limit)
+        if status is not None:
+            query = query.where(Job.status == status)
+        if kind is not None:
+            query = query.where(Job.kind == kind)
+        with Session() as session:
+            return [_info(job) for job in session.execute(query).scalars()]
+
+    async def cancel(self, job_id: int) -> dict[str, Any] | None:
+        """
+        Cancels a queued job straight away, and a running one as soon as its
+        worker gets the message (right away if it's this process's, else at
+        its next heartbeat). A finished job is returned unchanged.
+        """
+        def work(session: orm.Session) -> dict[str, Any] | None:
+            job = session.get(Job, job_id)
+            if job is None:
+                return None
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = datetime.now()
+            elif job.status == "running":
+                job.cancel_requested = True
+            return _info(job)
+
+        info = await writer.write(work)
+        if info is not None and info["status"] == "cancelled":
+            self.counters["cancelled"] += 1
+        if (task := self._running.get(job_id)) is not None:
+            self._cancelling.add(job_id)
+            _ = task.cancel()
+        return info
+
+    def stats(self) -> dict[str, Any]:
+        with Session() as session:
+            by_status = dict(
+                session.execute(
+                    sa.select(Job.status, sa.func.count()).group_by(Job.status)
+                ).tuples().all()
+            )
+            oldest_queued = session.execute(
+                sa.select(sa.func.min(Job.run_after)).where(Job.status == "queued")
+            ).scalar()
+        return {
+            **self.counters,
+            "workers": len(self._workers),
+            "running_here": sorted(self._running),
+            "jobs": by_status,
+            "oldest_queued": oldest_queued,
+            "kinds": sorted(self.kinds),
+        }
+
+    # * Workers
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                await self._work_once()
+            except Exception as e:
+                # * A failed claim, sweep or save (the database being locked, say)
+                # * mustn't take the worker with it. A job whose result wasn't
+                # * saved is picked up by the sweep once its heartbeat goes stale.
+                self.counters["worker_errors"] += 1
+                logging.error(f"Job worker error, carrying on in {env.JOB_POLL_SECONDS}s: {e!r}")
+                await asyncio.sleep(env.JOB_POLL_SECONDS)
+
+    async def _work_once(self) -> None:
+        """Runs the next due job, or waits (up to JOB_POLL_SECONDS) for one."""
+        assert self._wake is not None
+        # * Cleared before looking, so a submit from here on wakes us again
+        self._wake.clear()
+        job = await writer.write(_claim)
+        if job is None:
+            if time.monotonic() - self._swept_at > env.JOB_POLL_SECONDS:
+                await self._sweep()
+            try:
+                _ = await asyncio.wait_for(self._wake.wait(), env.JOB_POLL_SECONDS)
+            except TimeoutError:
+                pass
+            return
+        self.counters["claimed"] += 1
+        await self._run(job)
+
+    async def _run(self, job: dict[str, Any]) -> None:
+        job_id, kind = job["job_id"], self.kinds.get(job["kind"])
+        progress = Progress()
+        task = asyncio.current_task()
+        assert task is not None
+        self._running[job_id] = task
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job_id, progress, task))
+        logging.info(f"Job {job_id} ({job['kind']}) started, attempt {job['attempts']} (pid {_OWNER})")
+        outcome: tuple[JobStatus, Any, str | None]
+        retry = True
+        try:
+            if kind is None:
+                raise JobFailed(f"No such job kind as {job['kind']!r} any more")
+            params = kind.params.model_validate(job["params"])
+            result = await kind.run(params, progress)
+            outcome = ("succeeded", result, None)
+        except asyncio.CancelledError:
+            if job_id in self._cancelling:
+                _ = task.uncancel()
+                outcome = ("cancelled", None, "Cancelled")
+            elif self._closing:
+                outcome = ("queued", None, "Interrupted by a shutdown")
+            else:
+                raise
+        except JobFailed as e:
+            logging.warning(f"Job {job_id} ({job['kind']}) failed for good: {e}")
+            outcome = ("failed", None, str(e))
+            retry = False
+        except Exception as e:
+            logging.warning(f"Job {job_id} ({job['kind']}) failed: {e!r}")
+            outcome = ("failed", None, repr(e))
+        finally:
+            _ = heartbeat.cancel()
+            _ = self._running.pop(job_id, None)
+            self._cancelling.discard(job_id)
+
+        status, result, error = outcome
+        # * Saved even while the worker is being cancelled, so nothing is left "running"
+        final: JobStatus = await asyncio.shield(writer.write(
+            lambda session: _finish(session, job_id, status, result, error, progress, retry)
+        ))
+        if status == "queued":
+            self.counters["requeued_on_shutdown" if final == "queued" else "failed"] += 1
+        elif final == "queued":
+            self.counters["retried"] += 1
+        elif final != "running":
+            self.counters[final] += 1
+        logging.info(f"Job {job_id} ({job['kind']}) {final}")
+        if status == "queued":
+            # * The shutdown's cancellation, which we caught above
+            raise asyncio.CancelledError
+
+    async def _heartbeat(self, job_id: int, progress: Progress, task: asyncio.Task[None]) -> None:
+        while True:
+            await asyncio.sleep(env.JOB_HEARTBEAT_SECONDS)
+
+            def beat(session: orm.Session) -> bool:
+                _ = session.execute(
+                    sa.update(Job).where(Job.job_id == job_id).values(
+                        heartbeat_at=datetime.now(),
+                        progress_done=progress.done,
+                        progress_total=progress.total,
+                        progress_note=progress.note,
+                    )
+                )
+                return bool(session.execute(
+                    sa.select(Job.cancel_requested).where(Job.job_id == job_id)
+                ).scalar())
+
+            # * Cancelled from another process
+            if await writer.write(beat) and job_id not in self._cancelling:
+                self._cancelling.add(job_id)
+                _ = task.cancel()
+
+    async def _sweep(self) -> None:
+        self._swept_at = time.monotonic()
+        recovered, purged = await writer.write(_recover_and_purge)
+        self.counters["recovered"] += recovered
+        self.counters["purged"] += purged
+        if recovered:
+            logging.warning(f"Picked up {recovered} jobs orphaned by a process that's gone")
+
+
+def _claim(session: orm.Session) -> dict[str, Any] | None:
+    """Takes the job that's been waiting longest, if any is due."""
+    now = datetime.now()
+    job = session.execute(
+        sa.select(Job)
+        .where(Job.status == "queued", Job.run_after <= now)
+        .order_by(Job.run_after, Job.job_id)
+        .limit(1)
+    ).scalar_one_or_none()
+    if job is None:
+        return None
+    job.status = "running"
+    job.attempts += 1
+    job.started_at = now
+    job.heartbeat_at = now
+    job.error = None
+    return _info(job)
+
+
+def _retry_at(attempts: int, now: datetime) -> datetime:
+    backoff = timedelta(seconds=env.JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return now + min(backoff, MAX_BACKOFF)
+
+
+def _finish(
+    session: orm.Session, job_id: int, status: JobStatus, result: Any, error: str | None,
+    progress: Progress, retry: bool,
+) -> JobStatus:
+    """Records how an attempt ended, and returns the job's new status."""
+    job = session.get(Job, job_id)
+    if job is None:
+        return status
+    now = datetime.now()
+    job.progress_done = progress.done
+    job.progress_total = progress.total
+    job.progress_note = progress.note
+    job.error = error
+    job.cancel_requested = False
+    if status == "queued" and job.max_attempts == 1:
+        # * Interrupted by a shutdown, but it mustn't run twice (it may have
+        # * committed before the cancellation reached it)
+        job.status = "failed"
+        job.error = "Interrupted by a shutdown; not run again, since it only runs once"
+        job.finished_at = now
+        return "failed"
+    if status == "queued":
+        # * Interrupted by a shutdown: it gets its attempt back
+        job.status = "queued"
+        job.attempts -= 1
+        job.run_after = now
+        return "queued"
+    if status == "failed" and retry and job.attempts < job.max_attempts:
+        job.status = "queued"
+        job.run_after = _retry_at(job.attempts, now)
+        return "queued"
+    job.status = status
+    job.finished_at = now
+    if status == "succeeded":
+        job.result = _dumps(result)
+    return status
+
+
+def _recover_and_purge(session: orm.Session) -> tuple[int, int]:
+    now = datetime.now()
+    stale_before = now - timedelta(seconds=STALE_HEARTBEATS * env.JOB_HEARTBEAT_SECONDS)
+    orphans = session.execute(
+        sa.select(Job).where(Job.status == "running", Job.heartbeat_at < stale_before)
+    ).scalars().all()
+    for job in orphans:
+        job.error = "Orphaned: its process stopped sending heartbeats"
+        if job.cancel_requested:
+            job.status = "cancelled"
+            job.finished_at = now
+        elif job.attempts < job.max_attempts:
+            job.status = "queued"
+            job.run_after = _retry_at(job.attempts, now)
+        else:
+            job.status = "failed"
+            job.finished_at = now
+    purged = session.execute(
+        sa.delete(Job).where(
+            Job.status.not_in(ACTIVE),
+            Job.finished_at < now - timedelta(days=env.JOB_RETENTION_DAYS),
+        )
+    ).rowcount
+    return len(orphans), purged
+
+
+job_queue = JobQueue()
@@ -0,0 +1,166 @@
+"""
+Watchlist refreshes from Letterboxd, run in the background.
+
+A session start (after 20 minutes away) used to sync the user's RSS feed
+before answering the request, and /hooks/force-refresh held the button's
+request open for a whole feed read. Both now just ask this queue and return.
+A few workers (RSS_REFRESH_WORKERS) take the refreshes one user at a time.
+
+    - A user is in the queue at most once. Asking again while a refresh is
+      waiting or running changes nothing, except that a forced one turns a
+      waiting incremental sync into a full read.
+    - A user refreshed within the cooldown isn't refreshed again:
+      RSS_REFRESH_COOLDOWN_SECONDS for session starts, and the shorter
+      RSS_FORCED_REFRESH_COOLDOWN_SECONDS for the button.
+
+When a refresh finishes, a "refreshed" event goes out on the event hub
+({"userId", "ok", "newEntries"}). New entries also publish the usual
+"watchlist" event when they're written, so the client refetches either way.
+
+Everything here runs on the event loop, so none of it needs a lock.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Literal
+
+import backend.data.mutations as mu
+import backend.utils.env_reader as env
+import backend.utils.stuff as stuff
+from backend.data.event_hub import event_hub
+from backend.scheduled_tasks.check_rss import get_movie_list_from_rss, poll_all_users
+from backend.types.api_schemas import UserID
+from backend.types.my_types import WatchStatus
+
+type RefreshReason = Literal["session", "forced"]
+type RefreshOutcome = Literal["queued", "pending", "cooling"]
+type RefreshCounter = Literal[
+    "requested", "queued", "deduplicated", "upgraded", "cooling",
+    "completed", "failed", "new_entries",
+]
+
+
+class WatchlistRefreshQueue:
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[UserID] | None = None
+        self._workers: list[asyncio.Task[None]] = []
+        # * Waiting or running -> whether it reads the whole feed
+        self._pending: dict[UserID, bool] = {}
+        self._running: set[UserID] = set()
+        # * user -> time.monotonic() of their last finished refresh
+        self._finished_at: dict[UserID, float] = {}
+        # * Seconds from being queued to starting, for the last few refreshes
+        self._waits: deque[float] = deque(maxlen=256)
+        self._queued_at: dict[UserID, float] = {}
+        self.counters: Counter[RefreshCounter] = Counter()
+
+    def request(self, user_id: UserID, reason: RefreshReason = "session") -> RefreshOutcome:
+        """
+        Asks for a refresh of the user's watchlist and returns right away.
+        "queued" if one was started, "pending" if one was already waiting or
+        running, "cooling" if they were refreshed too recently.
+        """
+        self._ensure_workers()
+        assert self._queue is not None
+        self.counters["requested"] += 1
+        full = reason == "forced"
+        if user_id in self._pending:
+            if full and not self._pending[user_id] and user_id not in self._running:
+                self._pending[user_id] = True
+                self.counters["upgraded"] += 1
+            self.counters["deduplicated"] += 1
+            return "pending"
+        cooldown = (
+            env.RSS_FORCED_REFRESH_COOLDOWN_SECONDS if full else env.RSS_REFRESH_COOLDOWN_SECONDS
+        )
+        finished_at = self._finished_at.get(user_id)
+        if finished_at is not None and time.monotonic() - finished_at < cooldown:
+            self.counters["cooling"] += 1
+            return "cooling"
+        self._pending[user_id] = full
+        self._queued_at[user_id] = time.monotonic()
+        self._queue.put_nowait(user_id)
+        self.counters["queued"] += 1
+        return "queued"
+
+    async def close(self) -> None:
+        """Stops the workers. Refreshes still waiting are dropped."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            _ = worker.cancel()
+        _ = await asyncio.gather(*workers, return_exceptions=True)
+        self._loop = None
+        self._queue = None
+        self._pending.clear()
+        self._running.clear()
+        self._queued_at.clear()
+
+    def stats(self) -> dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            **self.counters,
+            "workers": len(self._workers),
+            "waiting": len(self._pending) - len(self._running),
+            "running": len(self._running),
+            "cooling_users": len(self._finished_at),
+            "p50_wait_ms": round(1000 * waits[len(waits) // 2], 1) if waits else None,
+            "max_wait_ms": round(1000 * waits[-1], 1) if waits else None,
+        }
+
+    def _ensure_workers(self) -> None:
+        """Starts the workers on the running loop, the first time they're needed."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # * A new loop (only in tests and benchmarks): what the old one held is gone
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._pending.clear()
+        self._running.clear()
+        self._queued_at.clear()
+        self._workers = [
+            loop.create_task(self._work(), name=f"watchlist-refresh-{n}")
+            for n in range(max(1, env.RSS_REFRESH_WORKERS))
+        ]
+
+    async def _work(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            user_id = await queue.get()
+            self._running.add(user_id)
+            self._waits.append(time.monotonic() - self._queued_at.pop(user_id, time.monotonic()))
+            ok, new_entries = False, 0
+            try:
+                ok, new_entries = await self._refresh(user_id, self._pending[user_id])
+            except Exception as e:
+                logging.warning(f"Watchlist refresh failed for {user_id}: {e!r}")
+            finally:
+                _ = self._pending.pop(user_id, None)
+                self._running.discard(user_id)
+                self._finished_at[user_id] = time.monotonic()
+                queue.task_done()
+            self.counters["completed" if ok else "failed"] += 1
+            self.counters["new_entries"] += new_entries
+            event_hub.publish(
+                "refreshed", {"userId": user_id, "ok": ok, "newEntries": new_entries}
+            )
+
+    async def _refresh(self, user_id: UserID, full: bool) -> tuple[bool, int]:
+        """Returns whether it worked, and how many entries it added or changed."""
+        if not full:
+            summary = await poll_all_users([user_id])
+            return summary["failures"] == 0, summary["new_entries"]
+        year = stuff.current_year()
+        movie_list = await get_movie_list_from_rss(user_id, year)
+        logging.debug(f"Got {movie_list} from {user_id}'s letterboxd.")
+        outcomes = await mu.set_watchlist_entries(
+            year, user_id, [(movie_id, WatchStatus.SEEN) for movie_id in movie_list]
+        )
+        return True, sum(outcome in ("added", "updated") for outcome in outcomes.values())
+
+
+refresh_queue = WatchlistRefreshQueue()
@@ -1,46 +1,55 @@
 import logging
 import sqlite3
 from datetime import datetime
+from pathlib import Path
 
-import sqlalchemy as sa
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 import backend.utils.env_reader as env
-from backend.data.db_connections import Session
-from backend.data.db_schema import User
-from backend.scheduled_tasks.check_rss import update_user_watchlist
+from backend.scheduled_tasks.job_queue import job_queue
 
 
 def register_jobs(scheduler: AsyncIOScheduler) -> None:
-    """Register all scheduled jobs with the scheduler."""
+    """
+    Register all scheduled jobs with the scheduler. Each one only queues a
+    background job (see job_queue and job_kinds), which does the work with
+    retries and progress.
+    """
+    # * Syncs every user's watchlist from their Letterboxd RSS (see poll_all_users)
     scheduler.add_job(
-        check_letterboxd,
+        submit_job,
+        args=["rss_sync"],
         trigger="interval",
         id="check_letterboxd",
         hours=18,
     )
+    # * Hourly, so a picture is never much older than PROPIC_TTL_HOURS;
+    # * the first run is at startup, which fills in any that were never fetched
+    scheduler.add_job(
+        submit_job,
+        args=["propic_refresh"],
+        trigger="interval",
+        id="refresh_propics",
+        hours=1,
+        next_run_time=datetime.now(),
+    )
     scheduler.add_job(
-        backup_database,
+        submit_job,
+        args=["backup"],
         trigger="interval",
         id="backup_database",
         days=2,
     )
 
 
-def check_letterboxd():
-    with Session() as session:
-        users = list(session.execute(sa.select(User.user_id)).scalars().all())
-    for user_id in users:
-        had_update = update_user_watchlist(user_id)
-        if had_update:
-            logging.info(f"Updated watchlist for user {user_id}")
-        else:
-            logging.info(f"No new movies found for user {user_id}")
+async def submit_job(kind: str) -> None:
+    _ = await job_queue.submit(kind)
 
 
-def backup_database():
+def backup_database() -> Path:
     """
     Creates a backup of the database files by copying them to a backup directory.
+    Returns the backup's path.
     """
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     main_db_filepath = env.DATABASE_PATH / env.SQLITE_FILE_NAME
@@ -69,3 +78,4 @@ def backup_database():
     #         shutil.copy2(file, backup_path)
 
     logging.info(f"Database backed up to {backup_db_filepath}")
+    return backup_db_filepath
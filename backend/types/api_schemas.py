@@ -148,6 +148,26 @@ class api_NewWatchlistRequest(BaseModel):
     year: int
     movieIds: list[MovieID]
     status: my_types.WatchStatus
+    # * The client's watchlist cursor; the response then carries every change since it
+    since: Optional[int] = None
+
+
+class api_WatchlistKey(BaseModel):
+    userId: UserID
+    movieId: MovieID
+
+
+class api_WatchlistDelta(BaseModel):
+    """See backend.data.watchlist_changes"""
+    year: int
+    since: Optional[int]
+    cursor: int
+    reset: bool
+    upserts: list[api_WatchNotice]
+    deletions: list[api_WatchlistKey]
+
+
+WatchlistOutcome = Literal["added", "updated", "removed", "unchanged", "unknown_movie"]
 
 
 class api_NextKeyDate(BaseModel):
@@ -77,6 +77,58 @@ try:
     LOG_PATH = get_path_env_var("LOG_PATH", project_root_directory, default_path=project_root_directory / "var" / "logs")
     SQLITE_FILE_NAME = get_str_env_var("SQLITE_FILE_NAME", optional=True, default="db.sqlite")
     LOG_ENDPOINT = get_str_env_var("LOG_ENDPOINT", optional=True, default="http://example.com")
+    # * Database connection pool ("queue" keeps connections open, "null" opens one per session)
+    DB_POOL_MODE = get_str_env_var("DB_POOL_MODE", optional=True, default="queue")
+    DB_POOL_SIZE = get_int_env_var("DB_POOL_SIZE", optional=True, default=5)
+    DB_MAX_OVERFLOW = get_int_env_var("DB_MAX_OVERFLOW", optional=True, default=10)
+    # * Threads that run database work off the event loop (0 runs it on the loop, the old behaviour)
+    DB_EXECUTOR_WORKERS = get_int_env_var("DB_EXECUTOR_WORKERS", optional=True, default=5)
+    # * Most writes the single writer thread will commit together
+    WRITER_MAX_BATCH = get_int_env_var("WRITER_MAX_BATCH", optional=True, default=64)
+    # * How IDs read back from the database are checked: "validate" (every row), "sample" or "trusted"
+    DB_ID_READ_MODE = get_str_env_var("DB_ID_READ_MODE", optional=True, default="sample")
+    DB_ID_SAMPLE_EVERY = get_int_env_var("DB_ID_SAMPLE_EVERY", optional=True, default=100)  # "sample" checks ~1 in N
+    # * Server-sent events: events buffered per client before it's told to resync, and
+    # * seconds between keep-alive comments on an idle stream
+    SSE_CLIENT_BUFFER = get_int_env_var("SSE_CLIENT_BUFFER", optional=True, default=64)
+    SSE_HEARTBEAT_SECONDS = get_int_env_var("SSE_HEARTBEAT_SECONDS", optional=True, default=20)
+    # * Letterboxd profile pictures: how old a cached one can get, and how many to fetch at once
+    PROPIC_TTL_HOURS = get_int_env_var("PROPIC_TTL_HOURS", optional=True, default=24)
+    PROPIC_REFRESH_CONCURRENCY = get_int_env_var("PROPIC_REFRESH_CONCURRENCY", optional=True, default=4)
+    # * Outgoing HTTP (TMDB, Letterboxd): seconds before a request gives up, and
+    # * pooled connections per service
+    HTTP_TIMEOUT_SECONDS = get_int_env_var("HTTP_TIMEOUT_SECONDS", optional=True, default=10)
+    HTTP_MAX_CONNECTIONS_PER_HOST = get_int_env_var("HTTP_MAX_CONNECTIONS_PER_HOST", optional=True, default=10)
+    # * TMDB requests per second (theirs is ~50), and movies enriched at once by an enrich_year job
+    TMDB_RATE_LIMIT = get_int_env_var("TMDB_RATE_LIMIT", optional=True, default=40)
+    TMDB_ENRICH_CONCURRENCY = get_int_env_var("TMDB_ENRICH_CONCURRENCY", optional=True, default=8)
+    # * Letterboxd RSS sync: feeds fetched at once, gap between requests to the
+    # * same host, and how long to wait for a feed
+    RSS_POLL_CONCURRENCY = get_int_env_var("RSS_POLL_CONCURRENCY", optional=True, default=4)
+    RSS_POLITENESS_MS = get_int_env_var("RSS_POLITENESS_MS", optional=True, default=200)
+    RSS_TIMEOUT_SECONDS = get_int_env_var("RSS_TIMEOUT_SECONDS", optional=True, default=15)
+    # * Background watchlist refreshes (session starts, the refresh button): workers, and
+    # * how soon the same user can be refreshed again by each
+    RSS_REFRESH_WORKERS = get_int_env_var("RSS_REFRESH_WORKERS", optional=True, default=2)
+    RSS_REFRESH_COOLDOWN_SECONDS = get_int_env_var("RSS_REFRESH_COOLDOWN_SECONDS", optional=True, default=600)
+    RSS_FORCED_REFRESH_COOLDOWN_SECONDS = get_int_env_var("RSS_FORCED_REFRESH_COOLDOWN_SECONDS", optional=True, default=30)
+    # * Background jobs: workers, seconds between looks at the queue when it's idle,
+    # * seconds between a running job's heartbeats, first retry delay (doubling
+    # * after that), and days finished jobs are kept
+    JOB_WORKERS = get_int_env_var("JOB_WORKERS", optional=True, default=2)
+    JOB_POLL_SECONDS = get_int_env_var("JOB_POLL_SECONDS", optional=True, default=5)
+    JOB_HEARTBEAT_SECONDS = get_int_env_var("JOB_HEARTBEAT_SECONDS", optional=True, default=5)
+    JOB_RETRY_BASE_SECONDS = get_int_env_var("JOB_RETRY_BASE_SECONDS", optional=True, default=30)
+    JOB_RETENTION_DAYS = get_int_env_var("JOB_RETENTION_DAYS", optional=True, default=14)
+    # * Days a cached TMDB response can be served past its TTL while it's refreshed
+    TMDB_CACHE_MAX_STALE_DAYS = get_int_env_var("TMDB_CACHE_MAX_STALE_DAYS", optional=True, default=30)
+    # * PRAGMAs applied to every new SQLite connection
+    SQLITE_SYNCHRONOUS = get_str_env_var("SQLITE_SYNCHRONOUS", optional=True, default="NORMAL")
+    SQLITE_CACHE_SIZE = get_int_env_var("SQLITE_CACHE_SIZE", optional=True, default=-32_000)  # negative means KiB
+    SQLITE_MMAP_SIZE = get_int_env_var("SQLITE_MMAP_SIZE", optional=True, default=134_217_728)
+    SQLITE_TEMP_STORE = get_str_env_var("SQLITE_TEMP_STORE", optional=True, default="MEMORY")
+    SQLITE_BUSY_TIMEOUT = get_int_env_var("SQLITE_BUSY_TIMEOUT", optional=True, default=30_000)  # milliseconds
+    SQLITE_FOREIGN_KEYS = get_bool_env_var("SQLITE_FOREIGN_KEYS", optional=True, default=False)
 except Exception as e:
     raise ValueError(
         f"A variable from the .env file is missing or improperly formatted: {e}"
@@ -2,29 +2,51 @@
 import {CssBaseline} from '@mui/material';
 import {ThemeProvider, createTheme} from '@mui/material/styles';
 import {QueryClient, QueryClientProvider} from '@tanstack/react-query';
+import {useEffect, useState} from 'react';
+import {InvisibleFallback} from '../components/LoadScreen';
 import QueryClientConfig from '../config/QueryClientConfig';
 import ThemeConfig from '../config/ThemeConfig';
+import {seedFromBootstrap} from '../hooks/dataOptions';
+import useLiveUpdates from '../hooks/useLiveUpdates';
 import AppContextProvider from '../providers/AppContextProvider';
 import NotificationsContextProvider from '../providers/NotificationContextProvider';
 
 const theme = createTheme(ThemeConfig);
 const queryClient = new QueryClient(QueryClientConfig);
 
+// * Started as soon as the bundle loads; the year comes from the URL if it has one
+const urlYear = parseInt(window.location.pathname.match(/(\d{4})/)?.[0] ?? '');
+const bootstrapped = seedFromBootstrap(
+  queryClient,
+  Number.isNaN(urlYear) ? undefined : urlYear,
+).catch(() => {});
+
 export default function AppProvider({
   children,
 }: {
   children: React.ReactNode;
 }): React.ReactElement {
+  const [seeded, setSeeded] = useState(false);
+  useEffect(() => {
+    void bootstrapped.then(() => setSeeded(true));
+  }, []);
+
   return (
     <ThemeProvider theme={theme}>
       <CssBaseline />
       <QueryClientProvider client={queryClient}>
+        <LiveUpdates />
         <AppContextProvider>
           <NotificationsContextProvider>
-            {children}
+            {seeded ? children : <InvisibleFallback />}
           </NotificationsContextProvider>
         </AppContextProvider>
       </QueryClientProvider>
     </ThemeProvider>
   );
 }
+
+function LiveUpdates(): null {
+  useLiveUpdates();
+  return null;
+}
@@ -35,7 +35,7 @@ export function UserAvatar({
   username: string;
 }) {
   const response = useSuspenseQuery(userProfileOptions(userId));
-  const propic = response.data.propic;
+  const propic = response.data?.propic;
   if (!propic) {
     return <Avatar>{username.charAt(0).toUpperCase()}</Avatar>;
   }
@@ -18,13 +18,12 @@ import {
 } from '../../config/StyleChoices';
 import {watchlistOptions} from '../../hooks/dataOptions';
 import {
+  applyWatchlistDeltaOnSuccess,
   onMutateError,
-  updateCacheOnSuccess,
   updateWatchlistMutationFn,
 } from '../../hooks/mutationOptions';
 import {useOscarAppContext} from '../../providers/AppContext';
 import {useNotifications} from '../../providers/NotificationContext';
-import {WatchListSchema} from '../../types/APIDataSchema';
 import {WatchStatus} from '../../types/Enums';
 
 type Props = {
@@ -43,11 +42,7 @@ export function WatchlistCell({movieId, userId}: Props): React.ReactElement {
 
   const mutation = useMutation({
     mutationFn: updateWatchlistMutationFn(idList, year),
-    onSuccess: updateCacheOnSuccess(
-      watchlistOptions(year).queryKey,
-      WatchListSchema.parse,
-      queryClient,
-    ),
+    onSuccess: applyWatchlistDeltaOnSuccess(year, queryClient),
     onError: onMutateError('Failed to update watch status.', notifications),
   });
 
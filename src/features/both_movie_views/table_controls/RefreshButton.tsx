@@ -1,14 +1,21 @@
 import {Sync as RefreshIcon} from '@mui/icons-material';
 import {CircularProgress} from '@mui/material';
 import {useQueryClient} from '@tanstack/react-query';
-import {useState} from 'react';
+import {useEffect, useState} from 'react';
 import {NoAccountBlocker} from '../../../components/NoAccountBlocker';
 import {API_BASE_URL} from '../../../config/GlobalConstants';
 import {watchlistOptions} from '../../../hooks/dataOptions';
+import {
+  REFRESHED_EVENT,
+  RefreshedEvent,
+} from '../../../hooks/useLiveUpdates';
 import {useOscarAppContext} from '../../../providers/AppContext';
 import {useNotifications} from '../../../providers/NotificationContext';
 import {DisplayedSettingsButton} from './Common';
 
+// * How long to wait for the background refresh before giving up on hearing back
+const REFRESH_WAIT_MS = 60_000;
+
 export default function RefreshWidget({
   isMobile,
 }: {
@@ -20,21 +27,49 @@ export default function RefreshWidget({
   const canRefresh = activeUserId !== null;
   const [isFetching, setIsFetching] = useState(false);
 
+  // * The refresh runs in the background; wait for the event that says it's done
+  useEffect(() => {
+    if (!isFetching) return;
+    const finish = (ok: boolean) => {
+      setIsFetching(false);
+      void queryClient.invalidateQueries({
+        queryKey: watchlistOptions(year).queryKey,
+      });
+      notifications.show(
+        ok
+          ? {
+              type: 'success',
+              message: `Your watchlist is up to date with recently entered Letterboxd data.`,
+            }
+          : {type: 'error', message: 'Failed to update watchlist'},
+      );
+    };
+    const onRefreshed = (event: Event) => {
+      const {userId, ok} = (event as CustomEvent<RefreshedEvent>).detail;
+      if (userId === activeUserId) finish(ok);
+    };
+    // * In case the event stream is down
+    const fallback = setTimeout(() => finish(true), REFRESH_WAIT_MS);
+    window.addEventListener(REFRESHED_EVENT, onRefreshed);
+    return () => {
+      clearTimeout(fallback);
+      window.removeEventListener(REFRESHED_EVENT, onRefreshed);
+    };
+  }, [isFetching, activeUserId, year, queryClient, notifications]);
+
   const handleRefresh = () => {
     setIsFetching(true);
 
     fetch(`${API_BASE_URL}/hooks/force-refresh`)
-      .then(() => {
-        setIsFetching(false);
-        notifications.show({
-          type: 'success',
-          message: `Your watchlist is up to date with recently entered Letterboxd data.`,
-        });
-      })
-      .then(() => {
-        void queryClient.invalidateQueries({
-          queryKey: watchlistOptions(year).queryKey,
-        });
+      .then(response => response.json())
+      .then(({status}: {status: string}) => {
+        if (status === 'cooling') {
+          setIsFetching(false);
+          notifications.show({
+            type: 'success',
+            message: `Your watchlist was refreshed moments ago.`,
+          });
+        }
       })
       .catch(() => {
         setIsFetching(false);
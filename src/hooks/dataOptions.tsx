@@ -1,9 +1,10 @@
-import {queryOptions} from '@tanstack/react-query';
+import {QueryClient, queryOptions} from '@tanstack/react-query';
 import {z} from 'zod';
 import {API_BASE_URL} from '../config/GlobalConstants';
 import {
   CategoryCompletionSchema,
   CategoryListSchema,
+  ColumnarWatchListSchema,
   MovieId,
   MovieListSchema,
   MyUserDataSchema,
@@ -11,9 +12,13 @@ import {
   NomListSchema,
   UserId,
   UserListSchema,
+  UserProfile,
   UserProfileSchema,
   UserStatsListSchema,
+  WatchList,
   WatchListSchema,
+  WatchlistDelta,
+  WatchlistDeltaSchema,
 } from '../types/APIDataSchema';
 import {Endpoints} from '../types/Enums';
 import LockError from '../types/LockErorr';
@@ -74,18 +79,24 @@ export function myUserDataOptions(userId: UserId) {
   });
 }
 
-export function userProfileOptions(userId: UserId) {
+// * Every user's profile comes from one request; each avatar picks its own out
+const UserProfileListSchema = z.array(UserProfileSchema);
+export function userProfilesOptions() {
   return queryOptions({
-    queryKey: ['userProfile', userId],
-    queryFn: qFunction(
-      Endpoints.userProfile,
-      {userId: userId.toString()},
-      UserProfileSchema.parse,
-    ),
+    queryKey: ['userProfiles'],
+    queryFn: qFunction(Endpoints.userProfiles, {}, UserProfileListSchema.parse),
     retry: retryFunction,
   });
 }
 
+export function userProfileOptions(userId: UserId) {
+  return queryOptions({
+    ...userProfilesOptions(),
+    // * Undefined for a user added since the list was fetched
+    select: (profiles: UserProfile[]) => profiles.find(p => p.id === userId),
+  });
+}
+
 // * Movies // *
 export function movieOptions(year: number) {
   return queryOptions({
@@ -115,18 +126,79 @@ export function categoryOptions(year: number) {
 }
 
 // * Watchlist // *
+// * The rows and cursor each year was last synced to
+// * (see backend/data/watchlist_changes.py). Once a year has been fetched,
+// * refetches only ask for what changed since its cursor.
+const watchlistSync = new Map<number, {cursor: number; watchlist: WatchList}>();
+
+export function watchlistCursor(year: number): number | undefined {
+  return watchlistSync.get(year)?.cursor;
+}
+
 export function watchlistOptions(year: number) {
   return queryOptions({
     queryKey: ['watchlist', year],
-    queryFn: qFunction(
-      Endpoints.watchlist,
-      {year: year.toString(), justMe: 'false'},
-      WatchListSchema.parse,
-    ),
+    queryFn: async (): Promise<WatchList> => {
+      const since = watchlistCursor(year);
+      if (since !== undefined) {
+        const delta = await qFunction(
+          Endpoints.watchlistChanges,
+          {year: year.toString(), since: since.toString()},
+          WatchlistDeltaSchema.parse,
+        )();
+        const watchlist = applyWatchlistDelta(year, delta);
+        if (watchlist !== undefined) {
+          return watchlist;
+        }
+      }
+      let cursor: number | undefined;
+      const watchlist = await qFunction(
+        Endpoints.watchlist,
+        {year: year.toString(), justMe: 'false', shape: 'columnar'},
+        ColumnarWatchListSchema.parse,
+        response => {
+          cursor = parseInt(response.headers.get('X-Watchlist-Cursor') ?? '');
+        },
+      )();
+      if (cursor === undefined || Number.isNaN(cursor)) {
+        watchlistSync.delete(year);
+      } else {
+        watchlistSync.set(year, {cursor, watchlist});
+      }
+      return watchlist;
+    },
     retry: retryFunction,
   });
 }
 
+// * Returns the year's watchlist with the delta applied, or undefined if it
+// * can't be applied (reset, or a gap since our cursor) and a full fetch is needed
+export function applyWatchlistDelta(
+  year: number,
+  delta: WatchlistDelta,
+): WatchList | undefined {
+  const synced = watchlistSync.get(year);
+  if (
+    synced === undefined ||
+    delta.reset ||
+    delta.since === null ||
+    delta.since > synced.cursor
+  ) {
+    return undefined;
+  }
+  if (delta.cursor <= synced.cursor) {
+    return synced.watchlist;
+  }
+  const key = (w: {userId: UserId; movieId: MovieId}) =>
+    `${w.userId}|${w.movieId}`;
+  const entries = new Map(synced.watchlist.map(w => [key(w), w]));
+  delta.deletions.forEach(w => entries.delete(key(w)));
+  delta.upserts.forEach(w => entries.set(key(w), w));
+  const watchlist = Array.from(entries.values());
+  watchlistSync.set(year, {cursor: delta.cursor, watchlist});
+  return watchlist;
+}
+
 // * Other // *
 export function userStatsOptions(year: number | string) {
   return queryOptions({
@@ -167,6 +239,61 @@ export function nextKeyDateOptions() {
   });
 }
 
+// * Bootstrap // *
+const BootstrapSchema = z.object({
+  year: zYear,
+  years: z.array(zYear),
+  defaultYear: zYear,
+  movies: MovieListSchema,
+  nominations: NomListSchema,
+  categories: CategoryListSchema,
+  users: UserListSchema,
+  watchlist: WatchListSchema,
+  watchlistCursor: z.number().int(),
+  byUser: UserStatsListSchema,
+  byCategory: CategoryCompletionSchema,
+  nextKeyDate: NullableNextKeyDateSchema,
+});
+
+// * Fetches everything the first page load needs in one request and seeds
+// * the individual queries with it, so they don't each go to the server.
+// * If it fails, nothing is seeded and the queries fetch for themselves.
+export async function seedFromBootstrap(
+  queryClient: QueryClient,
+  year?: number,
+): Promise<void> {
+  const params = new URLSearchParams(
+    year === undefined ? {} : {year: year.toString()},
+  );
+  const response = await fetch(
+    `${API_BASE_URL}/${Endpoints.bootstrap}?${params.toString()}`,
+  );
+  if (!response.ok) {
+    return;
+  }
+  const data = BootstrapSchema.parse(await response.json());
+  queryClient.setQueryData(yearsOptions().queryKey, data.years);
+  queryClient.setQueryData(defaultYearOptions().queryKey, data.defaultYear);
+  queryClient.setQueryData(movieOptions(data.year).queryKey, data.movies);
+  queryClient.setQueryData(nomOptions(data.year).queryKey, data.nominations);
+  queryClient.setQueryData(
+    categoryOptions(data.year).queryKey,
+    data.categories,
+  );
+  queryClient.setQueryData(userOptions().queryKey, data.users);
+  watchlistSync.set(data.year, {
+    cursor: data.watchlistCursor,
+    watchlist: data.watchlist,
+  });
+  queryClient.setQueryData(watchlistOptions(data.year).queryKey, data.watchlist);
+  queryClient.setQueryData(userStatsOptions(data.year).queryKey, data.byUser);
+  queryClient.setQueryData(
+    categoryCompletionOptions(data.year).queryKey,
+    data.byCategory,
+  );
+  queryClient.setQueryData(nextKeyDateOptions().queryKey, data.nextKeyDate);
+}
+
 // * TMDB // *
 export function tmdbMovieOptions(movieId: MovieId) {
   return queryOptions({
@@ -193,6 +320,7 @@ function qFunction<T>(
   endpoint: Endpoints,
   qParams: Record<string, string>,
   parser: (data: unknown) => T,
+  onResponse?: (response: Response) => void,
 ): () => Promise<T> {
   return async () => {
     const params = new URLSearchParams(qParams);
@@ -212,6 +340,7 @@ function qFunction<T>(
         )}`,
       );
     }
+    onResponse?.(response);
     try {
       return parser(await response.json());
     } catch (error) {
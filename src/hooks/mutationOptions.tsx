@@ -6,9 +6,15 @@ import {
   MyUserDataSchema,
   UserIdSchema,
   UserListSchema,
+  WatchlistDeltaSchema,
 } from '../types/APIDataSchema';
 import {errorToConsole} from '../utils/Logger';
-import {userOptions} from './dataOptions';
+import {
+  applyWatchlistDelta,
+  userOptions,
+  watchlistCursor,
+  watchlistOptions,
+} from './dataOptions';
 
 // *
 // * Genera Stuff // *
@@ -24,6 +30,22 @@ export function updateCacheOnSuccess<T>(
   };
 }
 
+// * The PUT answers with the changes since our cursor, not the whole watchlist
+export function applyWatchlistDeltaOnSuccess(
+  year: number,
+  queryClient: QueryClient,
+) {
+  return async (response: Response) => {
+    const delta = WatchlistDeltaSchema.parse(await response.json());
+    const queryKey = watchlistOptions(year).queryKey;
+    const watchlist = applyWatchlistDelta(year, delta);
+    if (watchlist === undefined) {
+      return queryClient.invalidateQueries({queryKey});
+    }
+    return queryClient.setQueryData(queryKey, watchlist);
+  };
+}
+
 export function onMutateError(
   message: string,
   notifications: NotificationsDispatch,
@@ -43,7 +65,8 @@ export function onMutateError(
 
 export function updateWatchlistMutationFn(movieIds: MovieId[], year: number) {
   return async (newState: WatchStatus) => {
-    const body = JSON.stringify({movieIds, status: newState, year});
+    const since = watchlistCursor(year);
+    const body = JSON.stringify({movieIds, status: newState, year, since});
     return await fetch(`${API_BASE_URL}/watchlist`, {
       method: 'PUT',
       body,
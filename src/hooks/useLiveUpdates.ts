@@ -0,0 +1,83 @@
+import {QueryClient, QueryKey, useQueryClient} from '@tanstack/react-query';
+import {useEffect} from 'react';
+import {z} from 'zod';
+import {API_BASE_URL} from '../config/GlobalConstants';
+import QueryClientConfig from '../config/QueryClientConfig';
+import {Endpoints} from '../types/Enums';
+
+// * The queries the event stream keeps fresh. While it's connected they don't
+// * go stale on a timer; the events invalidate them instead.
+const LIVE_KEYS: QueryKey[] = [
+  ['watchlist'],
+  ['userStats'],
+  ['categoryCompletion'],
+  ['users'],
+  ['userProfiles'],
+  ['nextKeyDate'],
+];
+
+const WatchlistEventSchema = z.object({years: z.array(z.number().int())});
+
+export const RefreshedEventSchema = z.object({
+  userId: z.string(),
+  ok: z.boolean(),
+  newEntries: z.number().int(),
+});
+export type RefreshedEvent = z.infer<typeof RefreshedEventSchema>;
+
+// * Re-dispatched on window, for whoever is waiting on a watchlist refresh
+// * (the refresh button); the data itself arrives as 'watchlist' events
+export const REFRESHED_EVENT = 'watchlistRefreshed';
+
+// * Subscribes to the server's live updates (backend/data/event_hub.py) for
+// * as long as the calling component is mounted
+export default function useLiveUpdates(): void {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    const source = new EventSource(
+      `${API_BASE_URL}/${Endpoints.eventStream}`,
+    );
+    const invalidate = (queryKey: QueryKey) =>
+      void queryClient.invalidateQueries({queryKey});
+
+    source.onopen = () => setLive(queryClient, true);
+    // * The browser reconnects by itself (and the server replays what we
+    // * missed), so until then just fall back to polling
+    source.onerror = () => setLive(queryClient, false);
+    source.addEventListener('watchlist', event => {
+      const {years} = WatchlistEventSchema.parse(JSON.parse(event.data));
+      years.forEach(year => {
+        invalidate(['watchlist', year]);
+        invalidate(['userStats', year.toString()]);
+        invalidate(['categoryCompletion', year.toString()]);
+      });
+    });
+    source.addEventListener('users', () => {
+      invalidate(['users']);
+      invalidate(['userProfiles']);
+      invalidate(['userStats']);
+      invalidate(['categoryCompletion']);
+    });
+    source.addEventListener('keyDates', () => invalidate(['nextKeyDate']));
+    source.addEventListener('refreshed', event => {
+      const detail = RefreshedEventSchema.parse(JSON.parse(event.data));
+      window.dispatchEvent(new CustomEvent(REFRESHED_EVENT, {detail}));
+    });
+    source.addEventListener('resync', () => LIVE_KEYS.forEach(invalidate));
+
+    return () => {
+      source.close();
+      setLive(queryClient, false);
+    };
+  }, [queryClient]);
+}
+
+function setLive(queryClient: QueryClient, live: boolean) {
+  const staleTime = live
+    ? Infinity
+    : QueryClientConfig.defaultOptions.queries.staleTime;
+  LIVE_KEYS.forEach(queryKey =>
+    queryClient.setQueryDefaults(queryKey, {staleTime}),
+  );
+}
@@ -103,9 +103,39 @@ export const CategoryListSchema = z
 export const WatchListSchema = z
   .array(WatchNoticeSchema)
   .describe('A watchlist');
+// * /watchlist?shape=columnar sends one array per field; turn it back into rows
+export const ColumnarWatchListSchema = z
+  .object({
+    userId: z.array(z.unknown()),
+    movieId: z.array(z.unknown()),
+    status: z.array(z.unknown()),
+  })
+  .transform(({userId, movieId, status}) =>
+    userId.map((id, i) => ({
+      userId: id,
+      movieId: movieId[i],
+      status: status[i],
+    })),
+  )
+  .pipe(WatchListSchema)
+  .describe('A watchlist, sent column by column');
+// * /watchlist/changes and PUT /watchlist: what changed after a sync cursor
+export const WatchlistDeltaSchema = z
+  .object({
+    year: z.number().int(),
+    since: z.number().int().nullable(),
+    cursor: z.number().int(),
+    reset: z.boolean(),
+    upserts: WatchListSchema,
+    deletions: z.array(
+      z.object({userId: UserIdSchema, movieId: MovieIdSchema}),
+    ),
+  })
+  .describe('The watchlist changes after a cursor');
 
 // * Collection Types
 export type WatchList = z.infer<typeof WatchListSchema>;
+export type WatchlistDelta = z.infer<typeof WatchlistDeltaSchema>;
 export type UserList = z.infer<typeof UserListSchema>;
 export type MovieList = z.infer<typeof MovieListSchema>;
 export type NomList = z.infer<typeof NomListSchema>;
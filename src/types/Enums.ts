@@ -29,13 +29,17 @@ export enum Endpoints {
   users = 'users',
   myUserData = 'users/my_data',
   userProfile = 'users/profile',
+  userProfiles = 'users/profiles',
   nominations = 'nominations',
   categories = 'categories',
   watchlist = 'watchlist',
+  watchlistChanges = 'watchlist/changes',
   byUser = 'by_user',
   byCategory = 'by_category',
   letterboxdSearch = 'forward/letterboxd/search',
   nextKeyDate = 'next_key_date',
+  bootstrap = 'bootstrap',
+  eventStream = 'events/stream',
   moviedbForward = 'forward/moviedb',
 }
 